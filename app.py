@@ -13,15 +13,22 @@ from aws_cdk import (
     aws_logs as _logs,
     aws_events as _events,
     aws_events_targets as _event_targets,
-    aws_s3 as _s3
+    aws_s3 as _s3,
+    aws_sqs as _sqs
 )
 
 
+# 조회 응답을 결정하는 query parameter
+API_CACHE_QUERY_PARAMETERS = ["limit", "offset", "properties", "fields", "window", "period", "consistent", "cursor", "boards"]
+
+
 class LeaderBoardStack(core.Stack):
 
     def __init__(self, scope: core.Construct, id: str, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
+        profile = self.deploy_profile()
+
         vpc = _ec2.Vpc.from_lookup(
             self, id="vpc", vpc_id=environment.AWS_VPC_ID)
         subnet_group = _elasticache.CfnSubnetGroup(self,
@@ -34,47 +41,131 @@ class LeaderBoardStack(core.Stack):
 
         # define s3 bucket for redis data backup
         # do not use RemovalPolicy.DESTORY on production, use RemovalPolicy.RETAIN instead
-        # bucket: s3.Bucket = _s3.Bucket(self, "RankingDataBackup", removal_policy=core.RemovalPolicy.DESTROY)
+        backup_bucket = _s3.Bucket(self, "RankingDataBackup", removal_policy=core.RemovalPolicy.RETAIN)
 
         # define elasticache for ranking
-        elasticache = _elasticache.CfnCacheCluster(
-            self,
-            id="LeaderBoardElasticache",
-            cache_node_type="cache.t2.micro",
-            num_cache_nodes=1,
-            engine="redis",
-            engine_version="5.0.6",
-            cache_parameter_group_name="default.redis5.0",
-            cache_subnet_group_name=subnet_group.cache_subnet_group_name,
-            vpc_security_group_ids=[security_group.security_group_id])
+        if environment.REDIS_CLUSTER_MODE:
+            # cluster mode에서는 샤드 리더보드의 샤드들이 여러 node group으로 분산됨
+            elasticache = _elasticache.CfnReplicationGroup(
+                self,
+                id="LeaderBoardElasticache",
+                replication_group_description="leaderboard redis cluster",
+                cache_node_type=profile["redis_node_type"],
+                num_node_groups=environment.REDIS_NODE_GROUPS,
+                replicas_per_node_group=profile["redis_replicas"],
+                automatic_failover_enabled=profile["redis_replicas"] > 0,
+                engine="redis",
+                engine_version="5.0.6",
+                cache_parameter_group_name="default.redis5.0.cluster.on",
+                cache_subnet_group_name=subnet_group.cache_subnet_group_name,
+                security_group_ids=[security_group.security_group_id])
+
+            elasticache_host = elasticache.attr_configuration_end_point_address
+            elasticache_port = elasticache.attr_configuration_end_point_port
+            elasticache_reader_hosts = ""
+        elif profile["redis_replicas"] > 0:
+            # primary 하나와 읽기 전용 replica로 구성된 replication group, 읽기 전용 endpoint는 replica에서 처리
+            elasticache = _elasticache.CfnReplicationGroup(
+                self,
+                id="LeaderBoardElasticache",
+                replication_group_description="leaderboard redis with read replicas",
+                cache_node_type=profile["redis_node_type"],
+                num_cache_clusters=1 + profile["redis_replicas"],
+                automatic_failover_enabled=True,
+                engine="redis",
+                engine_version="5.0.6",
+                cache_parameter_group_name="default.redis5.0",
+                cache_subnet_group_name=subnet_group.cache_subnet_group_name,
+                security_group_ids=[security_group.security_group_id])
+
+            elasticache_host = elasticache.attr_primary_end_point_address
+            elasticache_port = elasticache.attr_primary_end_point_port
+            elasticache_reader_hosts = elasticache.attr_read_end_point_addresses
+        else:
+            elasticache = _elasticache.CfnCacheCluster(
+                self,
+                id="LeaderBoardElasticache",
+                cache_node_type=profile["redis_node_type"],
+                num_cache_nodes=1,
+                engine="redis",
+                engine_version="5.0.6",
+                cache_parameter_group_name="default.redis5.0",
+                cache_subnet_group_name=subnet_group.cache_subnet_group_name,
+                vpc_security_group_ids=[security_group.security_group_id])
+
+            elasticache_host = elasticache.attr_redis_endpoint_address
+            elasticache_port = elasticache.attr_redis_endpoint_port
+            elasticache_reader_hosts = ""
 
         elasticache.apply_removal_policy(core.RemovalPolicy.DESTROY)
         elasticache.add_depends_on(subnet_group)
 
-        elasticache_host = elasticache.attr_redis_endpoint_address
-        elasticache_port = elasticache.attr_redis_endpoint_port
-
         lambda_function = _lambda.Function(self, "LeaderBoardFunction",
                                            handler='lambda_handler.handler',
                                            runtime=_lambda.Runtime.PYTHON_3_8,
                                            code=_lambda.Code.from_asset('lambda'),
-                                           memory_size=128,
+                                           memory_size=profile["lambda_memory"],
                                            vpc=vpc,
                                            security_group=security_group,
-                                           timeout=core.Duration.seconds(10),
+                                           timeout=core.Duration.seconds(profile["lambda_timeout_seconds"]),
+                                           reserved_concurrent_executions=profile["reserved_concurrency"],
                                            log_retention=_logs.RetentionDays.ONE_WEEK,
-                                           layers=[self.create_dependencies_layer("leaderboard", "lambda")])
+                                           layers=[self.create_dependencies_layer("leaderboard", "lambda", profile["lambda_architecture"])])
+        if profile["lambda_architecture"] == "arm64":
+            # 사용중인 CDK 버전의 Function에는 architecture 설정이 없으므로 CloudFormation 속성을 직접 지정
+            lambda_function.node.default_child.add_property_override("Architectures", ["arm64"])
 
         lambda_function.add_environment("REDIS_HOST", elasticache_host)
         lambda_function.add_environment("REDIS_PORT", elasticache_port)
+        lambda_function.add_environment("REDIS_READER_HOSTS", elasticache_reader_hosts)
+        lambda_function.add_environment("REDIS_READ_FROM_REPLICAS",
+                                        str(environment.REDIS_CLUSTER_MODE and profile["redis_replicas"] > 0).lower())
+        lambda_function.add_environment("REDIS_CONNECT_TIMEOUT_SECONDS", str(environment.REDIS_CONNECT_TIMEOUT_SECONDS))
+        lambda_function.add_environment("REDIS_SOCKET_TIMEOUT_SECONDS", str(environment.REDIS_SOCKET_TIMEOUT_SECONDS))
+        lambda_function.add_environment("REDIS_HEALTH_CHECK_INTERVAL_SECONDS", str(environment.REDIS_HEALTH_CHECK_INTERVAL_SECONDS))
+        lambda_function.add_environment("REDIS_READ_RETRIES", str(environment.REDIS_READ_RETRIES))
         lambda_function.add_environment("ADMIN_SECRET_TOKEN", environment.ADMIN_SECRET_TOKEN)
         lambda_function.add_environment("DEFAULT_FETCH_COUNT", str(environment.DEFAULT_FETCH_COUNT))
         lambda_function.add_environment("MAX_FETCH_COUNT", str(environment.MAX_FETCH_COUNT))
+        lambda_function.add_environment("MAX_BATCH_COUNT", str(environment.MAX_BATCH_COUNT))
+        lambda_function.add_environment("MAX_SUMMARY_BOARD_COUNT", str(environment.MAX_SUMMARY_BOARD_COUNT))
+        lambda_function.add_environment("STORAGE_MODE", environment.STORAGE_MODE)
+        lambda_function.add_environment("TOP_CACHE_MAX_ENTRIES", str(environment.TOP_CACHE_MAX_ENTRIES))
+        lambda_function.add_environment("TOP_CACHE_TTL_SECONDS", str(environment.TOP_CACHE_TTL_SECONDS))
+        lambda_function.add_environment("REDIS_CLUSTER_MODE", str(environment.REDIS_CLUSTER_MODE).lower())
+        lambda_function.add_environment("MAX_SHARD_COUNT", str(environment.MAX_SHARD_COUNT))
+        lambda_function.add_environment("MAX_SHARDED_TOP_OFFSET", str(environment.MAX_SHARDED_TOP_OFFSET))
+        lambda_function.add_environment("BOARD_CONFIG_TTL_SECONDS", str(environment.BOARD_CONFIG_TTL_SECONDS))
+        lambda_function.add_environment("WINDOW_UTC_OFFSET_HOURS", str(environment.WINDOW_UTC_OFFSET_HOURS))
+        lambda_function.add_environment("WINDOW_RETENTION_PERIODS", str(environment.WINDOW_RETENTION_PERIODS))
+        lambda_function.add_environment("ARCHIVE_TOP_COUNT", str(environment.ARCHIVE_TOP_COUNT))
+        lambda_function.add_environment("ARCHIVE_RETENTION_SECONDS", str(environment.ARCHIVE_RETENTION_SECONDS))
+        lambda_function.add_environment("HISTOGRAM_ERROR", str(environment.HISTOGRAM_ERROR))
+        lambda_function.add_environment("HISTOGRAM_REBUILD_SECONDS", str(environment.HISTOGRAM_REBUILD_SECONDS))
+        lambda_function.add_environment("HISTOGRAM_REBUILD_INTERVAL_SECONDS", str(environment.HISTOGRAM_REBUILD_INTERVAL_SECONDS))
+        lambda_function.add_environment("CLEANUP_SECONDS", str(environment.CLEANUP_SECONDS))
+        lambda_function.add_environment("CLEANUP_INTERVAL_SECONDS", str(environment.CLEANUP_INTERVAL_SECONDS))
+        lambda_function.add_environment("ACTIVITY_INTERVAL_SECONDS", str(environment.ACTIVITY_INTERVAL_SECONDS))
+        lambda_function.add_environment("COLD_BOARD_DAYS", str(environment.COLD_BOARD_DAYS))
+        lambda_function.add_environment("COLD_BOARD_MAX_MEMBERS", str(environment.COLD_BOARD_MAX_MEMBERS))
+        lambda_function.add_environment("SCORE_QUEUE", environment.SCORE_QUEUE)
+        lambda_function.add_environment("BACKUP_LOCATION", f"s3://{backup_bucket.bucket_name}")
+        backup_bucket.grant_read_write(lambda_function)
+        lambda_function.add_environment("METRICS_SAMPLE_RATE", str(environment.METRICS_SAMPLE_RATE))
+        lambda_function.add_environment("SLOW_REQUEST_MS", str(environment.SLOW_REQUEST_MS))
 
-        base_api = _apigw.RestApi(self, 'LeaderBoardApi', rest_api_name='LeaderBoardApi')
+        # API Gateway, queue, cron은 provisioned concurrency가 설정된 alias를 호출
+        lambda_target = self.enable_provisioned_concurrency(lambda_function, profile)
+
+        if environment.SCORE_QUEUE == "sqs":
+            self.enable_score_queue(lambda_function, lambda_target)
+
+        base_api = _apigw.RestApi(self, 'LeaderBoardApi', rest_api_name='LeaderBoardApi',
+                                  minimum_compression_size=environment.API_COMPRESSION_MIN_BYTES,
+                                  deploy_options=self.api_stage_options())
 
         root_api = base_api.root
-        entity_lambda_integration = _apigw.LambdaIntegration(lambda_function, proxy=True, integration_responses=[
+        entity_lambda_integration = _apigw.LambdaIntegration(lambda_target, proxy=True, integration_responses=[
             {
                 'statusCode': '200',
                 "responseParameters": {
@@ -92,12 +183,52 @@ class LeaderBoardStack(core.Stack):
                             }])
 
         entity = root_api.add_resource("{proxy+}")
-        entity.add_method("ANY", _apigw.LambdaIntegration(lambda_function))
+        if environment.API_CACHE_ENABLED:
+            # 같은 경로라도 query parameter와 If-None-Match에 따라 응답이 다르므로 모두 cache key에 포함
+            # 관리자 조회 응답이 인증하지 않은 요청에 재사용되지 않도록 X-Auth header도 cache key에 포함
+            cache_parameters = ["method.request.path.proxy", "method.request.header.If-None-Match", "method.request.header.X-Auth",
+                                *[f"method.request.querystring.{name}" for name in API_CACHE_QUERY_PARAMETERS]]
+            entity.add_method("ANY", _apigw.LambdaIntegration(lambda_target, cache_key_parameters=cache_parameters),
+                              request_parameters={parameter: parameter == "method.request.path.proxy" for parameter in cache_parameters})
+        else:
+            entity.add_method("ANY", _apigw.LambdaIntegration(lambda_target))
 
         self.add_cors_options(root_api)
-        # self.enable_cron(lambda_function)
+        self.enable_cron(lambda_target)
+        core.CfnOutput(self, "DeployProfile", value=self.node.try_get_context("profile") or environment.DEPLOY_PROFILE)
+
+    # `cdk deploy -c profile=<name>` 으로 지정한 성능 profile, 지정하지 않으면 environment.DEPLOY_PROFILE
+    def deploy_profile(self):
+        name = self.node.try_get_context("profile") or environment.DEPLOY_PROFILE
+        if name not in environment.DEPLOY_PROFILES:
+            raise ValueError(f"unknown deploy profile '{name}', one of {', '.join(environment.DEPLOY_PROFILES)}")
+        return environment.DEPLOY_PROFILES[name]
+
+    # 최신 version을 가리키는 alias에 provisioned concurrency를 설정하고, 사용률에 따라 min ~ max 사이에서 조정
+    def enable_provisioned_concurrency(self, lambda_function, profile):
+        if profile["provisioned_concurrency_min"] <= 0:
+            return lambda_function
 
-    def create_dependencies_layer(self, project_name, function_name: str) -> _lambda.LayerVersion:
+        alias = _lambda.Alias(self, "LeaderBoardFunctionLive",
+                              alias_name="live",
+                              version=lambda_function.current_version,
+                              provisioned_concurrent_executions=profile["provisioned_concurrency_min"])
+        scaling = alias.add_auto_scaling(min_capacity=profile["provisioned_concurrency_min"],
+                                         max_capacity=profile["provisioned_concurrency_max"])
+        scaling.scale_on_utilization(utilization_target=profile["provisioned_utilization_target"])
+        return alias
+
+    # API Gateway stage cache는 GET 요청에만 적용
+    def api_stage_options(self):
+        if not environment.API_CACHE_ENABLED:
+            return None
+        return _apigw.StageOptions(
+            cache_cluster_enabled=True,
+            cache_cluster_size=environment.API_CACHE_SIZE,
+            caching_enabled=True,
+            cache_ttl=core.Duration.seconds(environment.API_CACHE_TTL_SECONDS))
+
+    def create_dependencies_layer(self, project_name, function_name: str, architecture: str) -> _lambda.LayerVersion:
         requirements_file = function_name + "/" + "requirements.txt"
         output_dir = ".lambda_dependencies/" + function_name
 
@@ -107,11 +238,22 @@ class LeaderBoardStack(core.Stack):
             subprocess.check_call(
                 f"pip install -r {requirements_file} -t {output_dir}/python".split()
             )
-        return _lambda.LayerVersion(
+            if environment.REDIS_HIREDIS:
+                # compiled module이므로 배포 환경과 관계없이 lambda runtime(linux, python 3.8)과 architecture에 맞는 wheel을 설치
+                # arm64 wheel은 hiredis 2.0 부터 제공됨
+                hiredis, platform = ("hiredis==2.0.0", "manylinux2014_aarch64") if architecture == "arm64" \
+                    else ("hiredis==1.1.0", "manylinux2010_x86_64")
+                subprocess.check_call(
+                    f"pip install {hiredis} -t {output_dir}/python --platform {platform} "
+                    f"--implementation cp --python-version 3.8 --only-binary=:all: --upgrade".split()
+                )
+        layer = _lambda.LayerVersion(
             self,
             project_name + "-" + function_name + "-dependencies",
             code=_lambda.Code.from_asset(output_dir)
         )
+        layer.node.default_child.add_property_override("CompatibleArchitectures", [architecture])
+        return layer
 
     def add_cors_options(self, apigw_resource):
         apigw_resource.add_method('OPTIONS', _apigw.MockIntegration(
@@ -136,23 +278,40 @@ class LeaderBoardStack(core.Stack):
             }]
         )
 
+    # 비동기 점수 갱신을 위한 SQS queue, 같은 lambda가 queue의 메세지를 batch로 전달받아 기록
+    # lambda가 VPC 안에서 실행되므로 SQS에 접근하기 위한 NAT gateway나 VPC endpoint가 필요
+    # lambda_target은 queue의 메세지를 전달받을 function 또는 alias
+    def enable_score_queue(self, lambda_fn, lambda_target):
+        queue = _sqs.Queue(self, "ScoreQueue",
+                           visibility_timeout=core.Duration.seconds(60),
+                           retention_period=core.Duration.days(1))
+
+        queue.grant_send_messages(lambda_fn)
+        queue.grant_consume_messages(lambda_fn)
+        lambda_fn.add_environment("SCORE_QUEUE_URL", queue.queue_url)
+        mapping = lambda_target.add_event_source_mapping("ScoreQueueSource",
+                                                         event_source_arn=queue.queue_arn,
+                                                         batch_size=environment.SCORE_QUEUE_BATCH_SIZE)
+        # 기록에 실패한 메세지만 다시 전달되도록 handler가 응답하는 batchItemFailures를 사용
+        mapping.node.default_child.add_property_override("FunctionResponseTypes", ["ReportBatchItemFailures"])
+
     # cron job을 위해서 이벤트 발생기 추가하는 함수
     def enable_cron(self, lambda_fn):
-        # Schedule @ lambda_fn every minute
+        # 기간별 리더보드의 기간 경계가 UTC 정각이 아닐 수 있으므로 매 시간 실행
         rule = _events.Rule(
             self, "Rule",
             schedule=_events.Schedule.cron(
-                minute='*',
+                minute='5',
                 hour='*',
                 month='*',
                 week_day='*',
                 year='*'),
         )
 
-        # A toy input event.  You can add multiple inputs/targets, for example
-        # scheduling many servers to be scanned by a scheduled lambda in parallel
-        input_event = _events.RuleTargetInput.from_object(dict(foo="bar"))
-        rule.add_target(_event_targets.LambdaFunction(lambda_fn, event=input_event))
+        # 기간별 리더보드 archive, 점수 분포 histogram 재생성, 남은 timestamp 항목 정리, 오래 사용되지 않은 리더보드 이동
+        for job in ("rollover", "rebuild_histograms", "cleanup_timestamps", "offload_cold_boards"):
+            input_event = _events.RuleTargetInput.from_object(dict(job=job, services=[environment.SERVICE_ID]))
+            rule.add_target(_event_targets.LambdaFunction(lambda_fn, event=input_event))
 
 
 app = core.App()
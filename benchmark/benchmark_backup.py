@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# 리더보드 backup(export) / 복원(import) 처리량 측정
+#
+# benchmark_handler.py와 같은 방식으로 리더보드를 만든 뒤 로컬 디렉토리(또는 --location으로 지정한 S3)에 export하고,
+# 다른 리더보드 id로 import 하면서 초당 처리한 유저 수와 backup 크기를 측정합니다.
+#
+#   $ python benchmark/benchmark_backup.py --host localhost --board-sizes 1000000,5000000
+import time
+import shutil
+import argparse
+import tempfile
+from benchmark_handler import load_handler, seed_board
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure export and import throughput of leaderboard backups")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--service", default="benchmark", help="service id used for benchmark data")
+    parser.add_argument("--board-sizes", default="1000000", help="comma separated leaderboard sizes")
+    parser.add_argument("--location", help="backup location, a temporary directory if omitted")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    handler_module = load_handler(args)
+    import board_backup
+    from backup_storage import create_backup_storage
+
+    location = args.location or tempfile.mkdtemp(prefix="leaderboard-backup-")
+    storage = create_backup_storage(location)
+    client = handler_module.redis_client
+
+    print(f"{'size':>10} {'export/s':>12} {'import/s':>12} {'backup MB':>10} {'bytes/user':>11}")
+    try:
+        for size in [int(size) for size in args.board_sizes.split(",")]:
+            leader_board_id = f"bench-{size}"
+            seed_board(handler_module, args.service, leader_board_id, size, 0)
+
+            started = time.perf_counter()
+            exported = board_backup.export_board(client, storage, args.service, leader_board_id, board_backup.backup_id_now(), args.chunk_size)
+            export_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            imported = board_backup.import_board(client, storage, exported["backup"], args.service, f"{leader_board_id}-restored", args.batch_size)
+            import_seconds = time.perf_counter() - started
+
+            print(f"{size:>10} {exported['members'] / export_seconds:>12.0f} {imported['members'] / import_seconds:>12.0f} "
+                  f"{exported['bytes'] / 1024 / 1024:>10.1f} {exported['bytes'] / exported['members']:>11.1f}")
+    finally:
+        if not args.location:
+            shutil.rmtree(location)
+
+
+if __name__ == "__main__":
+    main()
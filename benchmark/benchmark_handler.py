@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# lambda handler 성능 측정 명령
+#
+# API Gateway proxy 이벤트를 만들어 lambda_handler.handler를 직접 호출하고, 리더보드 크기와 동시 요청 수 별로
+# route마다 p50/p95/p99 latency와 초당 처리량을 측정합니다. 결과는 json으로 저장되므로 --compare 옵션으로
+# 다른 commit에서 측정한 결과와 비교할 수 있습니다.
+#
+#   $ python benchmark/benchmark_handler.py --host localhost --board-sizes 10000,1000000 --concurrency 1,16 --output result.json
+#
+# 측정 대상 redis의 데이터는 --service 로 지정한 서비스 범위 안에서만 생성/삭제됩니다.
+# --backend memory 로 지정하면 redis 대신 process 안의 memory 저장소를 측정합니다.
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import subprocess
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+ROUTES = ["put", "top", "top_properties", "around", "my_rank", "delete", "list"]
+DEFAULT_ENVIRONMENT = {
+    "ADMIN_SECRET_TOKEN": "benchmark-token",
+    "DEFAULT_FETCH_COUNT": "100",
+    "MAX_FETCH_COUNT": "1000",
+    "MAX_BATCH_COUNT": "1000"
+}
+SEED_BATCH_SIZE = 1000
+SEED_PIPELINE_SIZE = 20
+# score 저장 방식에서도 기록할 수 있는 최대 점수
+MAX_SCORE = 2 ** 21 - 1
+
+
+# --backend 옵션이 없는 다른 benchmark 명령은 redis 저장소를 사용
+def load_handler(args):
+    os.environ.update({"REDIS_HOST": args.host, "REDIS_PORT": str(args.port), "LEADERBOARD_BACKEND": getattr(args, "backend", "redis")})
+    # 그 밖의 설정은 환경 변수로 지정한 값을 우선하여 배포 설정과 같은 조건으로 측정할 수 있도록 함
+    for key, value in DEFAULT_ENVIRONMENT.items():
+        os.environ.setdefault(key, value)
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda"))
+    import lambda_handler
+    return lambda_handler
+
+
+def proxy_event(method: str, path: str, query: dict = None, body: dict = None, headers: dict = None):
+    return {
+        "resource": "/{proxy+}",
+        "path": path,
+        "httpMethod": method,
+        "headers": headers or {},
+        "queryStringParameters": query,
+        "pathParameters": {"proxy": path.lstrip("/")},
+        "requestContext": {"stage": "benchmark"},
+        "body": json.dumps(body) if body is not None else None,
+        "isBase64Encoded": False
+    }
+
+
+def seed_board(handler_module, service_id: str, leader_board_id: str, size: int, property_users: int):
+    current = handler_module.backend.cardinality(service_id, leader_board_id)
+    if current >= size:
+        print(f"[{leader_board_id}] reuse {current} users")
+        return
+
+    if handler_module.LEADERBOARD_BACKEND == "memory":
+        seed_memory_board(handler_module.backend, service_id, leader_board_id, current, size, property_users, handler_module.get_reverse_timestamp())
+        return
+
+    from script_registry import script_put_scores
+    from leaderboard_keys import user_properties_key_str
+    from user_properties import encode_properties
+
+    client = handler_module.redis_client
+    script = script_put_scores
+    script.registry.load(client)
+    keys = [handler_module.leaderboard_str(service_id, leader_board_id),
+            handler_module.leaderboard_timestamp_str(service_id, leader_board_id),
+            handler_module.leaderboard_index_str(service_id)]
+    timestamp = handler_module.get_reverse_timestamp()
+
+    # batch 갱신 script를 pipeline으로 묶어서 적은 왕복으로 대량의 유저를 기록
+    pipe = client.pipeline(transaction=False)
+    for start in range(current, size, SEED_BATCH_SIZE):
+        args = []
+        for i in range(start, min(start + SEED_BATCH_SIZE, size)):
+            args += [f"user-{i}", random.randint(1, MAX_SCORE)]
+            if i < property_users:
+                pipe.hset(user_properties_key_str(service_id, f"user-{i}"), mapping=encode_properties({"nickname": f"user {i}"}))
+        pipe.evalsha(script.sha, len(keys), *keys, timestamp, handler_module.STORAGE_MODE, leader_board_id, "max", 0, *args)
+
+        if len(pipe) >= SEED_PIPELINE_SIZE:
+            pipe.execute()
+            print(f"[{leader_board_id}] seeded {min(start + SEED_BATCH_SIZE, size)}/{size} users", end="\r")
+    pipe.execute()
+    print(f"[{leader_board_id}] seeded {size} users")
+
+
+# memory 저장소는 같은 프로세스 안에 있으므로 backend에 바로 기록
+def seed_memory_board(backend, service_id: str, leader_board_id: str, current: int, size: int, property_users: int, timestamp: int):
+    for start in range(current, size, SEED_BATCH_SIZE):
+        users = range(start, min(start + SEED_BATCH_SIZE, size))
+        backend.put_scores(service_id, leader_board_id, [{"userId": f"user-{i}", "score": random.randint(1, MAX_SCORE)} for i in users], timestamp, "max")
+        for i in users:
+            if i < property_users:
+                backend.put_properties(service_id, f"user-{i}", {"nickname": f"user {i}"})
+    print(f"[{leader_board_id}] seeded {size} users")
+
+
+def route_events(route: str, service_id: str, leader_board_id: str, size: int, count: int):
+    base = f"/{service_id}/leaderboards/{leader_board_id}"
+    if route == "put":
+        return [proxy_event("PUT", f"{base}/user-{random.randrange(size)}", body={"score": random.randint(1, MAX_SCORE)}) for _ in range(count)]
+    if route == "top":
+        return [proxy_event("GET", f"{base}/top", query={"offset": str(random.randrange(1000)), "limit": "100"}) for _ in range(count)]
+    if route == "top_properties":
+        return [proxy_event("GET", f"{base}/top", query={"limit": "100", "properties": "true"}) for _ in range(count)]
+    if route == "around":
+        return [proxy_event("GET", f"{base}/user-{random.randrange(size)}/around", query={"limit": "10"}) for _ in range(count)]
+    if route == "my_rank":
+        return [proxy_event("GET", f"{base}/user-{random.randrange(size)}") for _ in range(count)]
+    if route == "delete":
+        return [proxy_event("DELETE", f"{base}/delete-{i}") for i in range(count)]
+    return [proxy_event("GET", f"/{service_id}/leaderboards", query={"limit": "100"}, headers={"X-Auth": os.environ["ADMIN_SECRET_TOKEN"]}) for _ in range(count)]
+
+
+def prepare_route(handler_module, route: str, service_id: str, leader_board_id: str, count: int):
+    # 삭제 측정은 리더보드 크기가 변하지 않도록 측정 전에 별도의 유저를 추가하고 그 유저들을 삭제
+    if route == "delete":
+        for start in range(0, count, SEED_BATCH_SIZE):
+            scores = [{"userId": f"delete-{i}", "score": 1} for i in range(start, min(start + SEED_BATCH_SIZE, count))]
+            handler_module.write_scores(service_id, leader_board_id, scores, 1)
+
+
+def percentile(latencies: list, ratio: float):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * ratio))]
+
+
+def run_route(handler_module, events: list, concurrency: int):
+    def invoke(event):
+        started = time.perf_counter()
+        response = handler_module.handler(event, None)
+        return time.perf_counter() - started, int(response.get("statusCode", 200)) < 400
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(invoke, events))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    return {
+        "requests": len(results),
+        "errors": sum(1 for _, ok in results if not ok),
+        "opsPerSec": round(len(results) / elapsed, 1),
+        "meanMs": round(statistics.mean(latencies), 3),
+        "p50Ms": round(percentile(latencies, 0.50), 3),
+        "p95Ms": round(percentile(latencies, 0.95), 3),
+        "p99Ms": round(percentile(latencies, 0.99), 3)
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result: dict):
+    return result["boardSize"], result["concurrency"], result["route"]
+
+
+def print_results(results: list, baseline: dict):
+    print(f"{'size':>10} {'conc':>5} {'route':<15} {'ops/s':>10} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+    for result in results:
+        line = (f"{result['boardSize']:>10} {result['concurrency']:>5} {result['route']:<15} {result['opsPerSec']:>10} "
+                f"{result['p50Ms']:>9} {result['p95Ms']:>9} {result['p99Ms']:>9} {result['errors']:>7}")
+
+        previous = baseline.get(result_key(result))
+        if previous:
+            line += f"  ops/s {(result['opsPerSec'] / previous['opsPerSec'] - 1) * 100:+.1f}%, p99 {(result['p99Ms'] / previous['p99Ms'] - 1) * 100:+.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure latency and throughput of every leaderboard API route")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--backend", default="redis", choices=["redis", "memory"], help="leaderboard storage backend to measure")
+    parser.add_argument("--service", default="benchmark", help="service id used for benchmark data")
+    parser.add_argument("--board-sizes", default="10000", help="comma separated leaderboard sizes, e.g. 10000,100000,10000000")
+    parser.add_argument("--concurrency", default="1,8", help="comma separated numbers of concurrent requests")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per route, board size and concurrency")
+    parser.add_argument("--routes", default=",".join(ROUTES), help=f"comma separated routes among {','.join(ROUTES)}")
+    parser.add_argument("--property-users", type=int, default=100000, help="number of seeded users having properties")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of synthetic requests")
+    parser.add_argument("--output", help="json file to save results")
+    parser.add_argument("--compare", help="json file of a previous run to compare with")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    handler_module = load_handler(args)
+
+    board_sizes = [int(size) for size in args.board_sizes.split(",")]
+    concurrencies = [int(concurrency) for concurrency in args.concurrency.split(",")]
+    routes = args.routes.split(",")
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {result_key(result): result for result in json.load(f)["results"]}
+
+    results = []
+    for size in board_sizes:
+        leader_board_id = f"bench-{size}"
+        seed_board(handler_module, args.service, leader_board_id, size, args.property_users)
+
+        for concurrency in concurrencies:
+            for route in routes:
+                prepare_route(handler_module, route, args.service, leader_board_id, args.requests)
+                events = route_events(route, args.service, leader_board_id, size, args.requests)
+                result = {"boardSize": size, "concurrency": concurrency, "route": route,
+                          **run_route(handler_module, events, concurrency)}
+                results.append(result)
+                print_results([result], baseline)
+
+    report = {
+        "commit": git_commit(),
+        "createdAt": int(time.time()),
+        "config": {"backend": handler_module.LEADERBOARD_BACKEND, "storageMode": handler_module.STORAGE_MODE,
+                   "topCacheMaxEntries": handler_module.TOP_CACHE_MAX_ENTRIES,
+                   "requests": args.requests, "seed": args.seed},
+        "results": results
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"saved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# 성능 profile별 비용 / latency 비교
+#
+# 같은 부하를 profile별로 배포한 API에 HTTP로 보내고, profile마다 p50/p99 latency와 백만 요청당 비용을 출력합니다.
+# profile의 lambda memory, architecture, provisioned concurrency, elasticache node 구성은 environment.py의
+# DEPLOY_PROFILES에서 읽습니다. 배포는 profile마다 별도의 stack으로 진행합니다.
+#
+#   $ cdk deploy -c profile=small
+#   $ python benchmark/benchmark_profiles.py --target small=https://<api-id>.execute-api.<region>.amazonaws.com/prod \
+#         --target medium=https://<api-id>.execute-api.<region>.amazonaws.com/prod --monthly-requests 100000000
+#
+# lambda 실행 시간은 client에서 측정한 latency로 대신하므로 lambda 비용은 실제보다 조금 높게 계산됩니다.
+# 가격은 us-east-1의 on-demand 가격이며, 다른 region은 --prices 로 같은 형식의 json 파일을 지정합니다.
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from benchmark_handler import percentile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import environment
+
+PRICES = {
+    "lambdaRequest": 0.2 / 1000000,
+    "apiGatewayRequest": 3.5 / 1000000,
+    "lambdaGbSecond": {"x86_64": 0.0000166667, "arm64": 0.0000133334},
+    "provisionedGbSecond": {"x86_64": 0.0000041667, "arm64": 0.0000033334},
+    "cacheNodeHour": {
+        "cache.t2.micro": 0.017,
+        "cache.t3.medium": 0.068,
+        "cache.m5.large": 0.156,
+        "cache.r5.large": 0.216
+    }
+}
+HOURS_PER_MONTH = 730
+ROUTES = ["top", "around", "my_rank", "put"]
+SEED_BATCH_SIZE = 200
+MAX_SCORE = 2 ** 21 - 1
+
+
+def request(base_url: str, method: str, path: str, query: str = "", body: dict = None):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = urllib.request.Request(f"{base_url.rstrip('/')}{path}{'?' + query if query else ''}", data=data, method=method,
+                                 headers={"Content-Type": "application/json", "Accept-Encoding": "gzip"})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            response.read()
+            ok = True
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def seed_board(base_url: str, service_id: str, leader_board_id: str, users: int):
+    for start in range(0, users, SEED_BATCH_SIZE):
+        scores = [{"userId": f"user-{i}", "score": random.randint(1, MAX_SCORE)} for i in range(start, min(start + SEED_BATCH_SIZE, users))]
+        request(base_url, "POST", f"/{service_id}/leaderboards/{leader_board_id}/scores", body={"scores": scores})
+
+
+def route_request(route: str, service_id: str, leader_board_id: str, users: int):
+    base = f"/{service_id}/leaderboards/{leader_board_id}"
+    if route == "put":
+        return "PUT", f"{base}/user-{random.randrange(users)}", "", {"score": random.randint(1, MAX_SCORE)}
+    if route == "around":
+        return "GET", f"{base}/user-{random.randrange(users)}/around", "limit=10", None
+    if route == "my_rank":
+        return "GET", f"{base}/user-{random.randrange(users)}", "", None
+    return "GET", f"{base}/top", "limit=100", None
+
+
+def run_load(base_url: str, requests: list, concurrency: int):
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda args: request(base_url, *args), requests))
+
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    return {
+        "requests": len(results),
+        "errors": sum(1 for _, ok in results if not ok),
+        "meanMs": round(statistics.mean(latencies), 3),
+        "p50Ms": round(percentile(latencies, 0.50), 3),
+        "p99Ms": round(percentile(latencies, 0.99), 3)
+    }
+
+
+def cache_node_count(profile: dict):
+    nodes = 1 + profile["redis_replicas"]
+    return nodes * environment.REDIS_NODE_GROUPS if environment.REDIS_CLUSTER_MODE else nodes
+
+
+# 요청마다 비례하는 비용(lambda 실행, 요청 수)과 월 고정 비용(elasticache node, provisioned concurrency)을 백만 요청당 비용으로 환산
+def cost_per_million(profile: dict, mean_ms: float, monthly_requests: int, prices: dict):
+    architecture = profile["lambda_architecture"]
+    memory_gb = profile["lambda_memory"] / 1024
+    variable = (prices["lambdaRequest"] + prices["apiGatewayRequest"] +
+                mean_ms / 1000 * memory_gb * prices["lambdaGbSecond"][architecture]) * 1000000
+
+    fixed_monthly = cache_node_count(profile) * prices["cacheNodeHour"][profile["redis_node_type"]] * HOURS_PER_MONTH
+    fixed_monthly += (profile["provisioned_concurrency_min"] * memory_gb * prices["provisionedGbSecond"][architecture] *
+                      HOURS_PER_MONTH * 3600)
+    fixed = fixed_monthly / (monthly_requests / 1000000)
+    return {"variableUsd": round(variable, 4), "fixedUsd": round(fixed, 4), "totalUsd": round(variable + fixed, 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the same load against every deploy profile and compare cost with p99 latency")
+    parser.add_argument("--target", action="append", required=True, help="<profile>=<api base url>, repeat for every profile")
+    parser.add_argument("--service", default="benchmark", help="service id used for benchmark data")
+    parser.add_argument("--board", default="profile-bench")
+    parser.add_argument("--users", type=int, default=10000, help="number of users seeded into the benchmark board")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per profile")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--routes", default=",".join(ROUTES), help=f"comma separated routes among {','.join(ROUTES)}")
+    parser.add_argument("--monthly-requests", type=int, default=100000000, help="monthly request volume to spread fixed costs over")
+    parser.add_argument("--prices", help="json file overriding the built-in us-east-1 prices")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="json file to save results")
+    args = parser.parse_args()
+
+    prices = PRICES
+    if args.prices:
+        with open(args.prices) as f:
+            prices = {**PRICES, **json.load(f)}
+
+    routes = args.routes.split(",")
+    results = []
+    print(f"{'profile':<10} {'requests':>9} {'errors':>7} {'p50':>9} {'p99':>9} {'$/M var':>9} {'$/M fixed':>10} {'$/M total':>10}")
+    for target in args.target:
+        name, _, base_url = target.partition("=")
+        profile = environment.DEPLOY_PROFILES[name]
+
+        # profile마다 같은 요청 순서로 측정
+        random.seed(args.seed)
+        seed_board(base_url, args.service, args.board, args.users)
+        requests = [route_request(routes[i % len(routes)], args.service, args.board, args.users) for i in range(args.requests)]
+        # 첫 요청의 cold start가 결과에 섞이지 않도록 동시 요청 수 만큼 미리 호출
+        run_load(base_url, requests[:args.concurrency], args.concurrency)
+
+        result = {"profile": name, **run_load(base_url, requests, args.concurrency)}
+        result.update(cost_per_million(profile, result["meanMs"], args.monthly_requests, prices))
+        results.append(result)
+        print(f"{name:<10} {result['requests']:>9} {result['errors']:>7} {result['p50Ms']:>9} {result['p99Ms']:>9} "
+              f"{result['variableUsd']:>9} {result['fixedUsd']:>10} {result['totalUsd']:>10}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"createdAt": int(time.time()), "monthlyRequests": args.monthly_requests, "results": results}, f, indent=2)
+        print(f"saved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# router와 lambdarest의 cold start(import 시간), 요청당 dispatch 비용 비교
+#
+# lambda_handler의 route table을 그대로 두 dispatcher에 등록하고, redis를 사용하지 않는 빈 route 함수로 요청을 전달하여
+# path match, query parameter 변환, 응답 변환에 걸리는 시간만 측정합니다. lambdarest는 lambda layer에서 제외되었으므로
+# 프로젝트 최상위의 requirements.txt로 설치된 개발 환경에서 실행합니다.
+#
+#   $ python benchmark/benchmark_router.py --requests 100000
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+from benchmark_handler import load_handler, proxy_event
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda")
+SAMPLE_QUERY = {"limit": "10", "offset": "0", "properties": "true"}
+
+
+def import_seconds(module: str, runs: int):
+    code = f"import time; started = time.perf_counter(); import {module}; print(time.perf_counter() - started)"
+    samples = [float(subprocess.check_output([sys.executable, "-c", code], cwd=LAMBDA_DIR)) for _ in range(runs)]
+    return statistics.median(samples)
+
+
+def noop_route(event, **kwargs):
+    # route 함수가 일반적으로 조회하는 query parameter를 함께 조회
+    query = event.get("json", {}).get("query", {})
+    return {"limit": query.get("limit"), "properties": query.get("properties"), **kwargs}
+
+
+def sample_event(route):
+    path = "/".join("sample" if segment is None else segment for segment in route.segments)
+    return proxy_event(route.method, f"/{path}", query=SAMPLE_QUERY)
+
+
+def dispatch_seconds(dispatch, events: list, requests: int):
+    started = time.perf_counter()
+    for i in range(requests):
+        dispatch(dict(events[i % len(events)]))
+    return (time.perf_counter() - started) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the router with lambdarest")
+    parser.add_argument("--requests", type=int, default=100000, help="dispatched requests per dispatcher")
+    parser.add_argument("--cold-runs", type=int, default=10, help="fresh interpreters used to measure import time")
+    args = parser.parse_args()
+
+    from lambdarest import create_lambda_handler
+    from router import Router
+    handler_module = load_handler(argparse.Namespace(host="localhost", port=6379))
+
+    router = Router()
+    lambdarest_handler = create_lambda_handler(error_handler=None)
+    for route in handler_module.router.routes:
+        router.handle(route.method, route.path)(noop_route)
+        lambdarest_handler.handle(route.method.lower(), path=route.path)(noop_route)
+
+    events = [sample_event(route) for route in handler_module.router.routes]
+    for event in events:
+        assert router(dict(event))["body"] == lambdarest_handler(event=dict(event))["body"], event["path"]
+
+    results = {
+        "router": (import_seconds("router", args.cold_runs), dispatch_seconds(router, events, args.requests)),
+        "lambdarest": (import_seconds("lambdarest", args.cold_runs),
+                       dispatch_seconds(lambda event: lambdarest_handler(event=event), events, args.requests))
+    }
+
+    print(f"{'dispatcher':<12} {'import ms':>10} {'dispatch us':>12}")
+    for name, (import_time, dispatch_time) in results.items():
+        print(f"{name:<12} {import_time * 1000:>10.2f} {dispatch_time * 1000000:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,63 @@
 SERVICE_ID = "hexonia"
 ADMIN_SECRET_TOKEN = "togglegear-token"
 
+# Redis configuration
+# cluster mode deploys a sharded replication group so that sharded leaderboards spread over node groups
+# node type and replicas are set by the performance profile, read-only endpoints are served by the replicas
+REDIS_CLUSTER_MODE = False
+REDIS_NODE_GROUPS = 3
+# connection timeouts so that requests to a failed node give up well before the lambda timeout
+REDIS_CONNECT_TIMEOUT_SECONDS = 1
+REDIS_SOCKET_TIMEOUT_SECONDS = 2
+# idle connections of a thawed container are checked with PING after this many seconds
+REDIS_HEALTH_CHECK_INTERVAL_SECONDS = 30
+# retries of read-only requests after a connection error (writes are never retried)
+REDIS_READ_RETRIES = 2
+# install the compiled hiredis reply parser into the dependency layer
+REDIS_HIREDIS = True
+
+# Performance profiles
+# lambda memory (MB), architecture (x86_64 | arm64) and timeout, reserved concurrency (None for the unreserved pool),
+# provisioned concurrency scaled between min and max by target tracking on its utilization (0 disables provisioned concurrency),
+# elasticache node type and replica count (read replicas, or replicas per node group in cluster mode)
+# select a profile with `cdk deploy -c profile=<name>`, DEPLOY_PROFILE is used otherwise
+DEPLOY_PROFILE = "small"
+DEPLOY_PROFILES = {
+    "small": {
+        "lambda_memory": 128,
+        "lambda_architecture": "x86_64",
+        "lambda_timeout_seconds": 10,
+        "reserved_concurrency": None,
+        "provisioned_concurrency_min": 0,
+        "provisioned_concurrency_max": 0,
+        "provisioned_utilization_target": 0.7,
+        "redis_node_type": "cache.t2.micro",
+        "redis_replicas": 0
+    },
+    "medium": {
+        "lambda_memory": 512,
+        "lambda_architecture": "arm64",
+        "lambda_timeout_seconds": 10,
+        "reserved_concurrency": 200,
+        "provisioned_concurrency_min": 2,
+        "provisioned_concurrency_max": 20,
+        "provisioned_utilization_target": 0.7,
+        "redis_node_type": "cache.t3.medium",
+        "redis_replicas": 1
+    },
+    "large": {
+        "lambda_memory": 1024,
+        "lambda_architecture": "arm64",
+        "lambda_timeout_seconds": 10,
+        "reserved_concurrency": 1000,
+        "provisioned_concurrency_min": 10,
+        "provisioned_concurrency_max": 200,
+        "provisioned_utilization_target": 0.7,
+        "redis_node_type": "cache.r5.large",
+        "redis_replicas": 2
+    }
+}
+
 # AWS configuration
 AWS_VPC_ID = "vpc-69f45702"
 AWS_SECURITY_GROUP_ID = "sg-4fd0662b"
@@ -11,3 +68,51 @@ AWS_DEFAULT_REGION = "ap-northeast-2"
 # Leaderboard configuration
 DEFAULT_FETCH_COUNT = 100
 MAX_FETCH_COUNT = 1000
+MAX_BATCH_COUNT = 200
+# leaderboards a single user ranks request can query
+MAX_SUMMARY_BOARD_COUNT = 50
+# storage mode of newly created leaderboards (timestamp | score)
+STORAGE_MODE = "timestamp"
+# in-container cache of top rank pages (0 entries disables the cache)
+TOP_CACHE_MAX_ENTRIES = 256
+TOP_CACHE_TTL_SECONDS = 1
+# upper bound of shards of a single sharded leaderboard
+MAX_SHARD_COUNT = 64
+# largest top offset of a sharded leaderboard (every shard returns offset + limit entries)
+MAX_SHARDED_TOP_OFFSET = 1000
+# seconds to reuse leaderboard configuration (shard count) in a container
+BOARD_CONFIG_TTL_SECONDS = 60
+# boundary of daily/weekly/monthly leaderboards (hours from UTC)
+WINDOW_UTC_OFFSET_HOURS = 9
+# number of periods a closed windowed leaderboard is kept before it expires
+WINDOW_RETENTION_PERIODS = 1
+# top ranks archived when a windowed leaderboard closes, and how long the archive is kept
+ARCHIVE_TOP_COUNT = 100
+ARCHIVE_RETENTION_SECONDS = 7776000
+# relative score error of the histogram used by the percentile endpoint
+HISTOGRAM_ERROR = 0.01
+# time budget of a single histogram rebuild run, and how often every histogram is rebuilt
+HISTOGRAM_REBUILD_SECONDS = 5
+HISTOGRAM_REBUILD_INTERVAL_SECONDS = 86400
+# time budget of a single purge, timestamp cleanup or cold leaderboard offload run, and how often orphaned timestamp entries are cleaned up
+CLEANUP_SECONDS = 5
+CLEANUP_INTERVAL_SECONDS = 604800
+# how often a container records the last read/write time of a leaderboard
+ACTIVITY_INTERVAL_SECONDS = 3600
+# leaderboards neither read nor written for this many days are offloaded to the backup bucket and restored on their next access
+# (0 disables), larger leaderboards than COLD_BOARD_MAX_MEMBERS are left to lambda/cold_boards.py
+COLD_BOARD_DAYS = 0
+COLD_BOARD_MAX_MEMBERS = 100000
+# asynchronous score ingestion queue (none | sqs), messages delivered to a single consumer invocation
+SCORE_QUEUE = "none"
+SCORE_QUEUE_BATCH_SIZE = 10
+# ratio of API requests written as per-route CloudWatch metrics (0 ~ 1)
+METRICS_SAMPLE_RATE = 1
+# requests slower than this (milliseconds) are logged with their parameters, 0 disables the slow log
+SLOW_REQUEST_MS = 500
+# responses larger than this (bytes) are gzip compressed by API Gateway when the client accepts it, None disables compression
+API_COMPRESSION_MIN_BYTES = 1024
+# API Gateway stage cache for GET requests keyed on path, query parameters, If-None-Match and X-Auth (cache cluster is billed hourly)
+API_CACHE_ENABLED = False
+API_CACHE_SIZE = "0.5"
+API_CACHE_TTL_SECONDS = 1
@@ -0,0 +1,51 @@
+import os
+
+# 리더보드 backup 파일 저장소
+# "s3://{bucket}/{prefix}" 형식은 S3, 그 밖의 경로는 로컬 디렉토리에 저장합니다.
+
+
+class BackupStorage:
+    def write(self, name: str, data: bytes):
+        raise NotImplementedError
+
+    def read(self, name: str) -> bytes:
+        raise NotImplementedError
+
+
+class LocalBackupStorage(BackupStorage):
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def write(self, name: str, data: bytes):
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def read(self, name: str) -> bytes:
+        with open(os.path.join(self.directory, name), "rb") as f:
+            return f.read()
+
+
+class S3BackupStorage(BackupStorage):
+    def __init__(self, bucket: str, prefix: str = ""):
+        import boto3
+        self.client = boto3.client("s3")
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def key(self, name: str):
+        return f"{self.prefix.rstrip('/')}/{name}" if self.prefix else name
+
+    def write(self, name: str, data: bytes):
+        self.client.put_object(Bucket=self.bucket, Key=self.key(name), Body=data)
+
+    def read(self, name: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=self.key(name))["Body"].read()
+
+
+def create_backup_storage(location: str):
+    if location.startswith("s3://"):
+        bucket, _, prefix = location[len("s3://"):].partition("/")
+        return S3BackupStorage(bucket, prefix)
+    return LocalBackupStorage(location)
@@ -0,0 +1,90 @@
+import time
+from redis.exceptions import RedisError
+from leaderboard_keys import leaderboard_str, leaderboard_timestamp_str, leaderboard_config_str, leaderboard_version_str, \
+    leaderboard_index_read_str, leaderboard_index_written_str
+from score_histogram import histogram_key
+import sharded_leaderboard as sharded
+
+# 리더보드별 마지막 조회, 기록 시각과 메모리 사용량
+#
+# 조회 시각을 요청마다 기록하면 replica로 보낸 읽기 요청에도 primary 쓰기가 추가되므로, container마다 같은 리더보드의
+# 조회, 기록 시각은 interval에 한번만 primary에 기록합니다. 오래 사용되지 않은 리더보드를 찾는 용도이므로
+# interval 단위의 정밀도로 충분합니다.
+
+
+class ActivityTracker:
+    def __init__(self, redis_client, interval: int):
+        self.redis_client = redis_client
+        self.interval = interval
+        self.recorded = {}
+
+    # 기록에 실패해도 요청은 그대로 처리
+    def record(self, index_key_str, service_id: str, leader_board_id: str):
+        if self.redis_client is None:
+            return
+
+        now = int(time.time())
+        entry = (index_key_str, service_id, leader_board_id)
+        if now - self.recorded.get(entry, 0) < self.interval:
+            return
+
+        self.recorded[entry] = now
+        try:
+            self.redis_client.hset(index_key_str(service_id), leader_board_id, now)
+        except RedisError as error:
+            print(f"[{service_id}] failed to record activity of {leader_board_id}: {error}")
+
+    def read(self, service_id: str, leader_board_id: str):
+        self.record(leaderboard_index_read_str, service_id, leader_board_id)
+
+    def write(self, service_id: str, leader_board_id: str):
+        self.record(leaderboard_index_written_str, service_id, leader_board_id)
+
+
+# 리더보드를 구성하는 key 목록 (리더보드, timestamp hash, histogram, 설정, version, 샤드)
+def board_memory_keys(service_id: str, leader_board_id: str, shard_count: int):
+    leaderboard_key = leaderboard_str(service_id, leader_board_id)
+    keys = [leaderboard_key, leaderboard_timestamp_str(service_id, leader_board_id), histogram_key(leaderboard_key),
+            leaderboard_config_str(service_id, leader_board_id), leaderboard_version_str(service_id, leader_board_id)]
+    if shard_count > 1:
+        keys += sharded.shard_key_list(service_id, leader_board_id, shard_count)
+    return keys
+
+
+# 리더보드 목록 script가 반환한 [id, 생성 시각, cardinality, 샤드 수] 목록의 메모리 사용량과 마지막 조회, 기록 시각을
+# 하나의 pipeline으로 조회, 샤드 리더보드의 cardinality는 호출하는 쪽에서 샤드별로 합산
+def board_stats(redis_client, service_id: str, boards: list):
+    if not boards:
+        return []
+
+    board_ids = [board[0] for board in boards]
+    pipe = redis_client.pipeline(transaction=False)
+    key_counts = []
+    for leader_board_id, _, _, shards in boards:
+        keys = board_memory_keys(service_id, leader_board_id, shards)
+        key_counts.append(len(keys))
+        for key in keys:
+            pipe.memory_usage(key)
+        pipe.hmget(leaderboard_config_str(service_id, leader_board_id), "offloadedAt", "offloadedMembers")
+    pipe.hmget(leaderboard_index_read_str(service_id), *board_ids)
+    pipe.hmget(leaderboard_index_written_str(service_id), *board_ids)
+    results = pipe.execute()
+
+    last_reads, last_writes = results[-2], results[-1]
+    stats = []
+    position = 0
+    for i, (leader_board_id, created_at, cardinality, _) in enumerate(boards):
+        memory = sum(usage or 0 for usage in results[position:position + key_counts[i]])
+        offloaded_at, offloaded_members = results[position + key_counts[i]]
+        position += key_counts[i] + 1
+
+        stat = {"leaderBoardId": leader_board_id, "createdAt": created_at, "cardinality": cardinality, "memoryBytes": memory,
+                "lastReadAt": int(last_reads[i]) if last_reads[i] else None,
+                "lastWriteAt": int(last_writes[i]) if last_writes[i] else None,
+                "offloaded": offloaded_at is not None}
+        # 외부 저장소로 옮겨진 리더보드는 옮길 때의 cardinality를 응답
+        if offloaded_at is not None:
+            stat["offloadedAt"] = int(offloaded_at)
+            stat["cardinality"] = int(offloaded_members)
+        stats.append(stat)
+    return stats
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# 리더보드 backup(export) / 복원(import) 명령
+#
+# export는 리더보드의 sorted set을 ZSCAN으로 나누어 읽으면서 일정한 수의 항목마다 gzip으로 압축한
+# chunk 파일을 저장하므로, 리더보드 전체를 메모리에 올리거나 redis를 오래 block하지 않습니다. 모든 chunk를 저장한 뒤
+# 마지막으로 manifest를 저장하므로 manifest가 있는 backup만 완전한 backup입니다.
+#
+# import는 chunk를 script로 임시 key에 기록한 뒤 기존 key를 UNLINK하고 RENAME으로 교체하므로, 복원이 끝나기 전까지
+# 기존 리더보드가 그대로 조회되고 큰 리더보드를 교체할 때에도 redis가 block되지 않습니다. export는 snapshot이 아니므로
+# 같은 유저의 항목이 여러번 포함될 수 있으며, import가 유저마다 하나의 항목만 남기고 timestamp hash도 남긴 항목으로
+# 다시 만듭니다. 점수 분포 histogram은 복원하는 점수로 다시 계산합니다.
+# 유저 property는 리더보드에 속하지 않으므로 backup에 포함되지 않습니다.
+#
+#   $ python board_backup.py export --host <redis-host> --service <serviceId> --board <leaderBoardId> --location s3://<bucket>
+#   $ python board_backup.py import --host <redis-host> --service <serviceId> --board <leaderBoardId> --location s3://<bucket> \
+#         --backup <serviceId>/<leaderBoardId>/<backupId> [--target-board <leaderBoardId>]
+import json
+import gzip
+import time
+import argparse
+from collections import Counter
+import redis
+from timestamp import get_reverse_timestamp
+from leaderboard_keys import leaderboard_str, leaderboard_timestamp_str, leaderboard_config_str
+from board_config import read_board_config
+from score_policy import DEFAULT_SCORE_POLICY
+from backup_storage import create_backup_storage
+from score_histogram import histogram_key, bucket_of
+from histogram_rebuild import rebuild_keys
+from script_registry import script_import_entries, script_import_swap
+import sharded_leaderboard as sharded
+
+BACKUP_FORMAT_VERSION = 1
+IMPORT_SUFFIX = ':import'
+
+
+def backup_id_now():
+    return time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+
+
+# 리더보드를 구성하는 (sorted set key, timestamp hash key) 목록, 샤드 리더보드는 샤드마다 하나
+def board_parts(service_id: str, leader_board_id: str, shard_count: int):
+    if shard_count > 1:
+        return [sharded.shard_keys(service_id, leader_board_id, shard) for shard in range(shard_count)]
+    return [[leaderboard_str(service_id, leader_board_id), leaderboard_timestamp_str(service_id, leader_board_id)]]
+
+
+class ChunkWriter:
+    def __init__(self, storage, prefix: str, chunk_size: int):
+        self.storage = storage
+        self.prefix = prefix
+        self.chunk_size = chunk_size
+        self.chunks = []
+        self.entries = []
+        self.current = None
+        self.size = 0
+
+    def add(self, part: int, kind: str, entries: list):
+        if self.current != (part, kind):
+            self.flush()
+            self.current = (part, kind)
+        self.entries += entries
+        if len(self.entries) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.entries:
+            return
+        part, kind = self.current
+        name = f"chunk-{len(self.chunks):06d}.json.gz"
+        data = gzip.compress(json.dumps(self.entries, separators=(",", ":")).encode("utf-8"), compresslevel=6)
+        self.storage.write(self.prefix + name, data)
+        self.chunks.append({"name": name, "part": part, "type": kind, "count": len(self.entries)})
+        self.size += len(data)
+        self.entries = []
+
+
+def scan_pages(scan, key: str, count: int):
+    cursor = 0
+    while True:
+        cursor, entries = scan(key, cursor, count=count)
+        if entries:
+            yield entries
+        if cursor == 0:
+            return
+
+
+def export_board(redis_client, storage, service_id: str, leader_board_id: str, backup_id: str, chunk_size: int):
+    prefix = f"{service_id}/{leader_board_id}/{backup_id}/"
+    config = read_board_config(redis_client, service_id, leader_board_id)
+    writer = ChunkWriter(storage, prefix, chunk_size)
+
+    parts = []
+    for part, (leaderboard_key, timestamp_key) in enumerate(board_parts(service_id, leader_board_id, config["shards"])):
+        layout = "timestamp" if redis_client.exists(timestamp_key) else "score"
+        # timestamp 방식의 member에 timestamp가 포함되어 있으므로 timestamp hash는 import가 다시 만들고 export 하지 않음
+        for entries in scan_pages(redis_client.zscan, leaderboard_key, chunk_size):
+            writer.add(part, "zset", [[member, score] for member, score in entries])
+        parts.append({"layout": layout})
+    writer.flush()
+
+    manifest = {
+        "version": BACKUP_FORMAT_VERSION,
+        "serviceId": service_id,
+        "leaderBoardId": leader_board_id,
+        "createdAt": int(time.time()),
+        "config": config,
+        "parts": parts,
+        "chunks": writer.chunks
+    }
+    storage.write(prefix + "manifest.json", json.dumps(manifest).encode("utf-8"))
+    return {"backup": prefix, "members": sum(chunk["count"] for chunk in writer.chunks),
+            "chunks": len(writer.chunks), "bytes": writer.size}
+
+
+# progress는 chunk를 하나 기록할 때마다 호출, 복원하는 동안 lock을 유지하는 데 사용
+def import_board(redis_client, storage, backup: str, service_id: str, leader_board_id: str, batch_size: int, progress=None):
+    prefix = backup.rstrip("/") + "/"
+    manifest = json.loads(storage.read(prefix + "manifest.json"))
+    if manifest["version"] != BACKUP_FORMAT_VERSION:
+        raise ValueError(f"unsupported backup format version {manifest['version']}")
+
+    parts = board_parts(service_id, leader_board_id, manifest["config"]["shards"])
+    staging = [[key + IMPORT_SUFFIX for key in keys] for keys in parts]
+    histograms = [Counter() for _ in parts]
+    for keys in staging:
+        redis_client.delete(*keys)
+
+    members = 0
+    for chunk in manifest["chunks"]:
+        # timestamp hash는 sorted set 항목으로 다시 만들므로 이전 backup에 포함된 hash chunk는 읽지 않음
+        if chunk["type"] == "zset":
+            entries = json.loads(gzip.decompress(storage.read(prefix + chunk["name"])))
+            layout = manifest["parts"][chunk["part"]]["layout"]
+            for start in range(0, len(entries), batch_size):
+                args = [layout]
+                for member, score in entries[start:start + batch_size]:
+                    args += [member, score]
+                added, removed = script_import_entries(redis_client, keys=staging[chunk["part"]], args=args)
+                members += len(added) - len(removed)
+                for scores, count in ((added, 1), (removed, -1)):
+                    for score in map(float, scores):
+                        if score > 0:
+                            histograms[chunk["part"]][bucket_of(score)] += count
+        if progress is not None:
+            progress()
+
+    # 임시 key를 리더보드 key로 교체하고, 복원한 점수로 계산한 histogram으로 교체
+    for (leaderboard_key, timestamp_key), (staged_leaderboard, staged_timestamp), histogram in zip(parts, staging, histograms):
+        script_import_swap(redis_client, keys=[staged_leaderboard, leaderboard_key, staged_timestamp, timestamp_key])
+
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.delete(histogram_key(leaderboard_key), *rebuild_keys(leaderboard_key)[:2])
+        if +histogram:
+            pipe.hset(histogram_key(leaderboard_key), mapping=+histogram)
+        pipe.execute()
+
+    config = {}
+    if manifest["config"]["shards"] > 1:
+        config["shards"] = manifest["config"]["shards"]
+    if manifest["config"]["windows"]:
+        config["windows"] = ",".join(manifest["config"]["windows"])
+    if manifest["config"].get("policy", DEFAULT_SCORE_POLICY) != DEFAULT_SCORE_POLICY:
+        config["policy"] = manifest["config"]["policy"]
+    config_key = leaderboard_config_str(service_id, leader_board_id)
+    redis_client.delete(config_key)
+    if config:
+        redis_client.hset(config_key, mapping=config)
+
+    sharded.touch_board(redis_client, service_id, leader_board_id, get_reverse_timestamp())
+    return {"board": leader_board_id, "members": members, "chunks": len(manifest["chunks"])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a leaderboard into chunked backup files or import it back")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("--host", required=True)
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--service", required=True)
+    parser.add_argument("--board", required=True, help="leaderboard id to export, or the source leaderboard id of an import")
+    parser.add_argument("--location", required=True, help="local directory or s3://<bucket>/<prefix> of backups")
+    parser.add_argument("--backup", help="backup to import, <serviceId>/<leaderBoardId>/<backupId>")
+    parser.add_argument("--backup-id", default=None, help="id of a new backup, current UTC time if omitted")
+    parser.add_argument("--target-board", help="leaderboard id to import into, same as --board if omitted")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="number of entries in a single chunk file")
+    parser.add_argument("--batch-size", type=int, default=1000, help="number of entries written by a single command")
+    args = parser.parse_args()
+
+    redis_client = redis.StrictRedis(host=args.host, port=args.port, charset="utf-8", decode_responses=True)
+    storage = create_backup_storage(args.location)
+
+    started = time.monotonic()
+    if args.command == "export":
+        result = export_board(redis_client, storage, args.service, args.board, args.backup_id or backup_id_now(), args.chunk_size)
+    else:
+        if not args.backup:
+            parser.error("--backup is required to import")
+        result = import_board(redis_client, storage, args.backup, args.service, args.target_board or args.board, args.batch_size)
+
+    print(json.dumps({**result, "seconds": round(time.monotonic() - started, 3)}))
+
+
+if __name__ == "__main__":
+    main()
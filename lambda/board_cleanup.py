@@ -0,0 +1,95 @@
+import re
+import time
+from leaderboard_keys import service_str, leaderboard_index_str, leaderboard_index_created_str
+from script_registry import script_remove_orphan_timestamps
+from histogram_rebuild import board_key_pairs
+
+# 리더보드 key 삭제와 정리 작업
+#
+# 큰 sorted set을 DEL로 삭제하면 메모리를 해제하는 동안 redis가 block되므로 UNLINK로 key만 먼저 제거하고 메모리는
+# background thread에서 해제합니다. 서비스 전체 삭제와 timestamp hash 정리는 SCAN/HSCAN으로 나누어 진행하며,
+# 제한된 lambda 실행 시간 안에 끝나지 않으면 다음 실행에서 이어서 진행합니다.
+
+
+# cluster mode에서는 key마다 slot이 다를 수 있으므로 key마다 UNLINK를 pipeline으로 전송
+def unlink_keys(redis_client, keys):
+    if not keys:
+        return 0
+    pipe = redis_client.pipeline(transaction=False)
+    for key in keys:
+        pipe.unlink(key)
+    return sum(pipe.execute())
+
+
+def escape_pattern(value: str):
+    return re.sub(r'([*?\[\]\\])', r'\\\1', value)
+
+
+# 서비스에 속한 모든 key(리더보드, 샤드, 유저 property, 리더보드 목록)의 SCAN pattern
+def service_key_patterns(service_id: str):
+    return [f'{escape_pattern(service_str(service_id))}:*', f'{{{escape_pattern(service_id)}:leaderboard:*']
+
+
+# 서비스의 key를 batch_size 단위로 deadline까지 삭제하고, 삭제한 key 수와 완료 여부를 반환
+# 리더보드 목록 key를 마지막에 삭제하므로 중단되어도 다음 실행에서 남은 리더보드를 다시 찾을 수 있음
+def purge_service(redis_client, service_id: str, deadline: float, batch_size: int):
+    index_keys = {leaderboard_index_str(service_id), leaderboard_index_created_str(service_id)}
+    deleted = 0
+    for pattern in service_key_patterns(service_id):
+        batch = []
+        for key in redis_client.scan_iter(match=pattern, count=batch_size):
+            if key in index_keys:
+                continue
+            batch.append(key)
+            if len(batch) >= batch_size:
+                deleted += unlink_keys(redis_client, batch)
+                batch = []
+                if time.monotonic() > deadline:
+                    return {"deleted": deleted, "complete": False}
+        deleted += unlink_keys(redis_client, batch)
+
+    deleted += unlink_keys(redis_client, list(index_keys))
+    return {"deleted": deleted, "complete": True}
+
+
+def cleanup_keys(timestamp_key: str):
+    return timestamp_key + ':cleanup', timestamp_key + ':cleaned'
+
+
+# sorted set에 없는 유저의 timestamp hash 항목을 deadline까지 제거하고 완료 여부와 제거한 항목 수를 반환
+def cleanup_orphan_timestamps(redis_client, leaderboard_key: str, timestamp_key: str, deadline: float, chunk_size: int, interval: int):
+    cursor_id, cleaned_id = cleanup_keys(timestamp_key)
+    # score 방식 리더보드는 timestamp hash가 없음
+    if redis_client.exists(cleaned_id) or not redis_client.exists(timestamp_key):
+        return True, 0
+
+    removed = 0
+    cursor = int(redis_client.get(cursor_id) or 0)
+    while True:
+        cursor, entries = redis_client.hscan(timestamp_key, cursor, count=chunk_size)
+        if entries:
+            args = [value for entry in entries.items() for value in entry]
+            removed += script_remove_orphan_timestamps(redis_client, keys=[leaderboard_key, timestamp_key], args=args)
+
+        if cursor == 0:
+            redis_client.delete(cursor_id)
+            redis_client.set(cleaned_id, 1, ex=interval)
+            return True, removed
+
+        redis_client.set(cursor_id, cursor, ex=interval)
+        if time.monotonic() > deadline:
+            return False, removed
+
+
+# 서비스의 모든 timestamp 방식 리더보드를 deadline까지 정리하고 제거한 항목 수를 반환
+def cleanup_service_timestamps(redis_client, service_id: str, now, deadline: float, chunk_size: int, interval: int):
+    removed = 0
+    for leader_board_id, _ in redis_client.zscan_iter(leaderboard_index_str(service_id)):
+        for leaderboard_key, timestamp_key in board_key_pairs(redis_client, service_id, leader_board_id, now):
+            complete, count = cleanup_orphan_timestamps(redis_client, leaderboard_key, timestamp_key, deadline, chunk_size, interval)
+            removed += count
+            if not complete:
+                print(f"[{service_id}] timestamp cleanup of {timestamp_key} continues in the next run")
+                return removed
+
+    return removed
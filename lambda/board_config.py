@@ -0,0 +1,35 @@
+import time
+from leaderboard_keys import leaderboard_config_str
+from score_policy import DEFAULT_SCORE_POLICY
+
+
+# shards : 샤드 수, windows : 함께 갱신되는 기간별 리더보드 목록 (쉼표로 구분하여 저장), policy : 점수 반영 정책
+# offloaded : 외부 저장소로 옮겨진 리더보드의 backup 경로, redis에 리더보드가 있으면 None
+def read_board_config(redis_client, service_id: str, leader_board_id: str):
+    stored = redis_client.hgetall(leaderboard_config_str(service_id, leader_board_id))
+    return {
+        "shards": int(stored.get("shards", 1)),
+        "windows": [window for window in stored.get("windows", "").split(",") if window],
+        "policy": stored.get("policy", DEFAULT_SCORE_POLICY),
+        "offloaded": stored.get("offloaded")
+    }
+
+
+# 리더보드 설정은 거의 바뀌지 않으므로 요청마다 조회하지 않고 container 안에서 ttl 동안 재사용
+class BoardConfigCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.entries = {}
+
+    def get(self, backend, service_id: str, leader_board_id: str):
+        key = (service_id, leader_board_id)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+        config = backend.board_config(service_id, leader_board_id)
+        self.entries[key] = (time.monotonic() + self.ttl, config)
+        return config
+
+    def invalidate(self, service_id: str, leader_board_id: str):
+        self.entries.pop((service_id, leader_board_id), None)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# 오래 사용되지 않은 리더보드를 외부 저장소로 옮기고, 다시 접근하면 복원하는 명령
+#
+# 마지막 조회, 기록 시각이 모두 cold_seconds 보다 오래된 리더보드를 board_backup.py 와 같은 chunk 형식으로 export 한 뒤
+# redis에서 제거하고, 리더보드 설정에 backup 경로를 남깁니다. export 하는 동안 점수가 바뀐 리더보드는 제거하지 않습니다.
+# 설정에 backup 경로가 남아있는 리더보드는 처음 접근하는 요청이 import로 복원하며, backup 파일은 복원 후에도 남아있습니다.
+#
+# container는 설정을 BOARD_CONFIG_TTL_SECONDS 동안 재사용하지만, 그 동안 조회, 기록한 리더보드는 활동 시각이 기록되어
+# 옮겨지지 않으므로 옮겨진 리더보드에 이전 설정으로 접근하는 경우는 없습니다.
+# 샤드 리더보드와 만료 시각이 있는 기간별 리더보드는 옮기지 않습니다.
+#
+#   $ python cold_boards.py --host <redis-host> --service <serviceId> --location s3://<bucket> --days 30
+import json
+import time
+import argparse
+import redis
+from leaderboard_keys import leaderboard_str, leaderboard_timestamp_str, leaderboard_version_str, leaderboard_migrating_str, \
+    leaderboard_config_str, leaderboard_index_str, leaderboard_index_read_str, leaderboard_index_written_str
+from script_registry import script_offload_board
+from score_histogram import histogram_key
+from histogram_rebuild import rebuild_keys
+from backup_storage import create_backup_storage
+from leaderboard_exceptions import ServiceUnavailableException
+import board_backup
+
+RESTORE_LOCK_SECONDS = 60
+
+
+def offload_backup_id(now: int):
+    return "offload-" + time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(now))
+
+
+def restore_lock_key(config_key: str):
+    return config_key + ':restoring'
+
+
+def offload_board(redis_client, storage, service_id: str, leader_board_id: str, now: int, chunk_size: int):
+    leaderboard_key = leaderboard_str(service_id, leader_board_id)
+    version_key = leaderboard_version_str(service_id, leader_board_id)
+    version = redis_client.get(version_key) or ""
+
+    result = board_backup.export_board(redis_client, storage, service_id, leader_board_id, offload_backup_id(now), chunk_size)
+    keys = [version_key, leaderboard_config_str(service_id, leader_board_id), leaderboard_key,
+            leaderboard_timestamp_str(service_id, leader_board_id), histogram_key(leaderboard_key), *rebuild_keys(leaderboard_key)]
+    if not script_offload_board(redis_client, keys=keys, args=[version, result["backup"], now, result["members"]]):
+        return None
+    return result
+
+
+# 서비스의 리더보드 중 cold_seconds 동안 조회, 기록이 없는 리더보드를 deadline까지 옮기고 옮긴 리더보드 수를 반환
+# max_members 보다 큰 리더보드는 lambda 실행 시간 안에 끝나지 않을 수 있으므로 명령으로 옮김
+def offload_cold_boards(redis_client, storage, service_id: str, now: int, cold_seconds: int, deadline: float, max_members: int,
+                        chunk_size: int):
+    read_key, written_key = leaderboard_index_read_str(service_id), leaderboard_index_written_str(service_id)
+    offloaded = 0
+    for leader_board_id, _ in redis_client.zscan_iter(leaderboard_index_str(service_id)):
+        if time.monotonic() > deadline:
+            print(f"[{service_id}] cold leaderboard offload continues in the next run")
+            break
+
+        leaderboard_key = leaderboard_str(service_id, leader_board_id)
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hget(read_key, leader_board_id)
+        pipe.hget(written_key, leader_board_id)
+        pipe.hmget(leaderboard_config_str(service_id, leader_board_id), "shards", "offloaded")
+        pipe.ttl(leaderboard_key)
+        pipe.zcard(leaderboard_key)
+        pipe.exists(leaderboard_migrating_str(service_id, leader_board_id))
+        last_read, last_written, (shards, backup), ttl, members, migrating = pipe.execute()
+
+        # 비어있거나 만료되는 리더보드, 샤드 리더보드, migration 중인 리더보드와 이미 옮겨진 리더보드는 건너뜀
+        if ttl != -1 or int(shards or 1) > 1 or migrating or backup is not None:
+            continue
+
+        # 활동 시각이 기록되기 전부터 있던 리더보드는 처음 확인한 시각부터 기간을 계산
+        if last_read is None and last_written is None:
+            redis_client.hsetnx(read_key, leader_board_id, now)
+            continue
+
+        if now - max(int(last_read or 0), int(last_written or 0)) < cold_seconds:
+            continue
+
+        if members > max_members:
+            print(f"[{service_id}] {leader_board_id} has {members} users, offload it with cold_boards.py")
+            continue
+
+        result = offload_board(redis_client, storage, service_id, leader_board_id, now, chunk_size)
+        if result is None:
+            print(f"[{service_id}] {leader_board_id} changed while offloading, kept in redis")
+            continue
+        offloaded += 1
+        print(f"[{service_id}] offloaded {leader_board_id} to {result['backup']} ({result['members']} users)")
+
+    return offloaded
+
+
+# 옮겨진 리더보드를 복원, 다른 요청이 복원 중이면 wait_seconds 까지 끝나기를 기다림
+# import가 리더보드 설정을 backup의 설정으로 교체하므로 복원이 끝나면 backup 경로도 함께 제거됨
+# lock은 chunk를 기록할 때마다 만료 시각을 연장하므로 RESTORE_LOCK_SECONDS 보다 오래 걸리는 복원에도 유지되고,
+# 기다리는 동안 복원이 끝나지 않으면 ServiceUnavailableException으로 다시 요청하도록 응답
+def restore_board(redis_client, storage, service_id: str, leader_board_id: str, batch_size: int, wait_seconds: float):
+    config_key = leaderboard_config_str(service_id, leader_board_id)
+    lock_key = restore_lock_key(config_key)
+    if redis_client.set(lock_key, 1, nx=True, ex=RESTORE_LOCK_SECONDS):
+        try:
+            backup = redis_client.hget(config_key, "offloaded")
+            if backup is None:
+                return None
+            result = board_backup.import_board(redis_client, storage, backup, service_id, leader_board_id, batch_size,
+                                               lambda: redis_client.expire(lock_key, RESTORE_LOCK_SECONDS))
+            print(f"[{service_id}] restored {leader_board_id} from {backup} ({result['members']} users)")
+            return result
+        finally:
+            redis_client.delete(lock_key)
+
+    deadline = time.monotonic() + wait_seconds
+    while time.monotonic() < deadline and redis_client.hexists(config_key, "offloaded"):
+        time.sleep(0.05)
+    if redis_client.hexists(config_key, "offloaded"):
+        raise ServiceUnavailableException(f"leaderboard {leader_board_id} is being restored, retry later")
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offload leaderboards neither read nor written for days into backup storage")
+    parser.add_argument("--host", required=True)
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--service", required=True)
+    parser.add_argument("--location", required=True, help="local directory or s3://<bucket>/<prefix> of offloaded leaderboards")
+    parser.add_argument("--days", type=int, required=True, help="offload leaderboards idle for this many days")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="number of entries in a single chunk file")
+    args = parser.parse_args()
+
+    redis_client = redis.StrictRedis(host=args.host, port=args.port, charset="utf-8", decode_responses=True)
+    storage = create_backup_storage(args.location)
+
+    started = time.monotonic()
+    offloaded = offload_cold_boards(redis_client, storage, args.service, int(time.time()), args.days * 86400, float("inf"),
+                                    float("inf"), args.chunk_size)
+    print(json.dumps({"offloaded": offloaded, "seconds": round(time.monotonic() - started, 3)}))
+
+
+if __name__ == "__main__":
+    main()
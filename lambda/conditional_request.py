@@ -0,0 +1,38 @@
+import json
+import hashlib
+
+# 리더보드 version으로 만든 ETag로 조건부 조회(If-None-Match) 처리
+#
+# 같은 URL의 조회 결과는 리더보드 version(property를 함께 조회하면 서비스의 유저 property version)이 바뀌기 전까지
+# 같으므로, 랭킹을 조회하기 전에 version만 읽어서 ETag를 만들고 client가 가진 ETag와 같으면 본문 없이 304로 응답합니다.
+# 응답을 저장한 client가 매번 다시 확인하도록 no-cache로 응답합니다.
+CACHE_CONTROL = "no-cache"
+
+
+# API Gateway는 client가 보낸 header 이름을 그대로 전달하므로 대소문자 구분 없이 조회
+def request_header(event, name: str):
+    name = name.lower()
+    for key, value in (event.get("headers") or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+# 조회한 리더보드와 조회 방식, backend가 조회한 리더보드 생성 시각과 version 목록을 함께 hash하여 ETag를 만듦
+# version만 사용하면 기간이 바뀐 기간별 리더보드나 서비스 삭제 후 다시 만든 리더보드의 version이 이전 ETag와 겹칠 수 있음
+def board_etag(service_id: str, leader_board_id: str, shards: int, include_properties, fields: list, versions: list):
+    identity = json.dumps([service_id, leader_board_id, shards, bool(include_properties), fields if include_properties else None, versions])
+    return '"' + hashlib.sha1(identity.encode("utf-8")).hexdigest() + '"'
+
+
+def not_modified(event, etag: str):
+    if_none_match = request_header(event, "If-None-Match")
+    if not if_none_match:
+        return False
+    # 약한 비교(weak comparison), 압축 과정에서 W/ 가 붙은 ETag도 같은 응답으로 봄
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+
+def etag_headers(etag: str):
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
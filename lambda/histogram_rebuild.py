@@ -0,0 +1,93 @@
+import time
+from collections import Counter
+from timestamp import TIE_BREAK_FACTOR
+from leaderboard_keys import leaderboard_str, leaderboard_timestamp_str, leaderboard_index_str
+from board_config import read_board_config
+from score_histogram import histogram_key, bucket_of
+import sharded_leaderboard as sharded
+import windowed_leaderboard as windowed
+
+# 점수 분포 histogram 재생성 작업
+#
+# write script가 histogram을 함께 갱신하지만, histogram 도입 이전의 기록이나 HISTOGRAM_ERROR 변경으로 어긋난 histogram을
+# 주기적으로 sorted set에서 다시 계산합니다. ZSCAN cursor와 계산 중인 histogram을 redis에 저장하므로 한번의 실행 시간이
+# 제한된 lambda에서도 여러번에 나누어 진행되고, 재생성이 끝난 리더보드는 interval 동안 다시 계산하지 않습니다.
+# 재생성 도중의 점수 갱신은 완료 시점의 교체로 일부 유실될 수 있으며 다음 재생성에서 보정됩니다.
+
+
+def rebuild_keys(leaderboard_key: str):
+    histogram_id = histogram_key(leaderboard_key)
+    return histogram_id + ':rebuild', histogram_id + ':cursor', histogram_id + ':rebuilt'
+
+
+# 하나의 리더보드 key를 deadline까지 재생성하고 완료 여부를 반환
+def rebuild_board_histogram(redis_client, leaderboard_key: str, timestamp_key: str, deadline: float, chunk_size: int, interval: int):
+    rebuild_id, cursor_id, rebuilt_id = rebuild_keys(leaderboard_key)
+    if redis_client.exists(rebuilt_id):
+        return True
+
+    timestamp_layout = redis_client.exists(timestamp_key)
+    stored_cursor = redis_client.get(cursor_id)
+    if stored_cursor is None:
+        # 중단된 이전 재생성의 결과는 cursor가 만료되었으므로 버리고 처음부터 다시 계산
+        redis_client.delete(rebuild_id)
+    cursor = int(stored_cursor or 0)
+
+    while True:
+        cursor, entries = redis_client.zscan(leaderboard_key, cursor, count=chunk_size)
+
+        counts = Counter()
+        for _, score in entries:
+            counts[bucket_of(abs(score if timestamp_layout else score // TIE_BREAK_FACTOR))] += 1
+
+        pipe = redis_client.pipeline(transaction=False)
+        for bucket, count in counts.items():
+            pipe.hincrby(rebuild_id, bucket, count)
+
+        if cursor != 0:
+            pipe.set(cursor_id, cursor, ex=interval)
+            pipe.expire(rebuild_id, interval)
+        pipe.execute()
+
+        if cursor == 0:
+            if redis_client.exists(rebuild_id):
+                redis_client.rename(rebuild_id, histogram_key(leaderboard_key))
+                # 재생성 중의 만료 시각을 제거하고, 기간별 리더보드의 histogram은 리더보드와 함께 만료
+                ttl = redis_client.pttl(leaderboard_key)
+                if ttl > 0:
+                    redis_client.pexpire(histogram_key(leaderboard_key), ttl)
+                else:
+                    redis_client.persist(histogram_key(leaderboard_key))
+            else:
+                redis_client.delete(histogram_key(leaderboard_key))
+            redis_client.delete(cursor_id)
+            redis_client.set(rebuilt_id, 1, ex=interval)
+            return True
+
+        if time.monotonic() > deadline:
+            return False
+
+
+def board_key_pairs(redis_client, service_id: str, leader_board_id: str, now):
+    config = read_board_config(redis_client, service_id, leader_board_id)
+    if config["shards"] > 1:
+        return [sharded.shard_keys(service_id, leader_board_id, shard) for shard in range(config["shards"])]
+
+    pairs = [[leaderboard_str(service_id, leader_board_id), leaderboard_timestamp_str(service_id, leader_board_id)]]
+    for window in config["windows"]:
+        board_id = windowed.current_window_board_id(leader_board_id, window, now)
+        pairs.append([leaderboard_str(service_id, board_id), leaderboard_timestamp_str(service_id, board_id)])
+    return pairs
+
+
+# 서비스의 모든 리더보드(샤드, 현재 기간 리더보드 포함) histogram을 deadline까지 재생성하고 완료한 key 수를 반환
+def rebuild_service_histograms(redis_client, service_id: str, now, deadline: float, chunk_size: int, interval: int):
+    rebuilt = 0
+    for leader_board_id, _ in redis_client.zscan_iter(leaderboard_index_str(service_id)):
+        for leaderboard_key, timestamp_key in board_key_pairs(redis_client, service_id, leader_board_id, now):
+            if not rebuild_board_histogram(redis_client, leaderboard_key, timestamp_key, deadline, chunk_size, interval):
+                print(f"[{service_id}] histogram rebuild of {leaderboard_key} continues in the next run")
+                return rebuilt
+            rebuilt += 1
+
+    return rebuilt
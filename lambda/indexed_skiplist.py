@@ -0,0 +1,125 @@
+import random
+
+# 순위(index)로 접근할 수 있는 skiplist (redis sorted set의 zskiplist와 같은 구조)
+#
+# 각 level의 다음 node 포인터마다 건너뛰는 node 수(span)를 함께 저장하므로 삽입, 삭제, key의 순위 조회와
+# 순위로 node 조회가 모두 평균 O(log n) 입니다. key는 비교 가능한 값이며 오름차순으로 정렬됩니다.
+MAX_LEVEL = 32
+LEVEL_PROBABILITY = 0.25
+
+
+class SkipListNode:
+    __slots__ = ("key", "forward", "span")
+
+    def __init__(self, key, level: int):
+        self.key = key
+        self.forward = [None] * level
+        self.span = [0] * level
+
+
+class IndexedSkipList:
+    def __init__(self):
+        self.head = SkipListNode(None, MAX_LEVEL)
+        self.level = 1
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    @staticmethod
+    def random_level():
+        level = 1
+        while level < MAX_LEVEL and random.random() < LEVEL_PROBABILITY:
+            level += 1
+        return level
+
+    # level별로 key 바로 앞의 node와 그 node의 순위를 찾음
+    def find_update(self, key):
+        update = [self.head] * MAX_LEVEL
+        rank = [0] * MAX_LEVEL
+        node = self.head
+        for i in range(self.level - 1, -1, -1):
+            rank[i] = rank[i+1] if i < self.level - 1 else 0
+            while node.forward[i] is not None and node.forward[i].key < key:
+                rank[i] += node.span[i]
+                node = node.forward[i]
+            update[i] = node
+        return update, rank
+
+    def insert(self, key):
+        update, rank = self.find_update(key)
+
+        level = self.random_level()
+        if level > self.level:
+            for i in range(self.level, level):
+                rank[i] = 0
+                update[i] = self.head
+                self.head.span[i] = self.length
+            self.level = level
+
+        node = SkipListNode(key, level)
+        for i in range(level):
+            node.forward[i] = update[i].forward[i]
+            update[i].forward[i] = node
+            node.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = rank[0] - rank[i] + 1
+
+        for i in range(level, self.level):
+            update[i].span[i] += 1
+        self.length += 1
+
+    def remove(self, key):
+        update, _ = self.find_update(key)
+        node = update[0].forward[0]
+        if node is None or node.key != key:
+            return False
+
+        for i in range(self.level):
+            if update[i].forward[i] is node:
+                update[i].span[i] += node.span[i] - 1
+                update[i].forward[i] = node.forward[i]
+            else:
+                update[i].span[i] -= 1
+
+        while self.level > 1 and self.head.forward[self.level - 1] is None:
+            self.level -= 1
+        self.length -= 1
+        return True
+
+    # key의 오름차순 순위 (1부터 시작), key가 없으면 0
+    def rank(self, key):
+        rank = 0
+        node = self.head
+        for i in range(self.level - 1, -1, -1):
+            while node.forward[i] is not None and node.forward[i].key <= key:
+                rank += node.span[i]
+                node = node.forward[i]
+            if node is not self.head and node.key == key:
+                return rank
+        return 0
+
+    # 오름차순 순위(1부터 시작)의 node, 범위를 벗어나면 None
+    def node_at(self, rank: int):
+        if rank < 1 or rank > self.length:
+            return None
+
+        traversed = 0
+        node = self.head
+        for i in range(self.level - 1, -1, -1):
+            while node.forward[i] is not None and traversed + node.span[i] <= rank:
+                traversed += node.span[i]
+                node = node.forward[i]
+            if traversed == rank:
+                return node
+        return None
+
+    # 오름차순 순위 start ~ stop (1부터 시작, stop 포함)의 key 목록
+    def slice(self, start: int, stop: int):
+        start = max(start, 1)
+        stop = min(stop, self.length)
+        keys = []
+        node = self.node_at(start)
+        while node is not None and len(keys) < stop - start + 1:
+            keys.append(node.key)
+            node = node.forward[0]
+        return keys
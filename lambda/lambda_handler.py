@@ -1,79 +1,335 @@
 import os
-import redis
+import math
+import time
+import random
 import json
 import traceback
 import sys
-from lambdarest import create_lambda_handler
-from timestamp import get_reverse_timestamp
-from leaderboard_exceptions import UserNotFoundException, InvalidRequestException, AccessDeniedException
-from leaderboard_scripts import lua_script_get_around, lua_script_get_my_rank, lua_script_put_score, lua_script_delete_score
+from timestamp import get_reverse_timestamp, MAX_ENCODED_SCORE
+from leaderboard_keys import leaderboard_str, leaderboard_timestamp_str, leaderboard_version_str, leaderboard_staging_str, leaderboard_migrating_str, \
+    leaderboard_config_str, leaderboard_index_str, leaderboard_index_created_str, leaderboard_index_read_str, leaderboard_index_written_str, \
+    CLUSTER_MODE
+from leaderboard_exceptions import UserNotFoundException, InvalidRequestException, AccessDeniedException, ServiceUnavailableException
+from response_cache import ResponseCache
+from user_properties import decode_properties, parse_fields
+from script_registry import script_get_percentile
+from score_histogram import estimate_position, histogram_key
+from histogram_rebuild import rebuild_service_histograms
+from score_queue import InMemoryScoreQueue, create_score_queue, score_event, sqs_record_messages, batch_score_messages, coalesce_score_events, \
+    report_ingestion
+from board_config import BoardConfigCache, read_board_config
+from score_policy import DEFAULT_SCORE_POLICY, validate_policy, score_sign
+import sharded_leaderboard as sharded
+import windowed_leaderboard as windowed
+import metrics
+from router import Router
+import conditional_request
+import redis_connection
+import board_backup
+import board_cleanup
+import board_activity
+import cold_boards
+from backup_storage import create_backup_storage
+from leaderboard_backend import create_leaderboard_backend
 
 ADMIN_SECRET_TOKEN = os.environ.get('ADMIN_SECRET_TOKEN')
 DEFAULT_FETCH_COUNT = int(os.environ.get('DEFAULT_FETCH_COUNT'))
 MAX_FETCH_COUNT = int(os.environ.get('MAX_FETCH_COUNT'))
+MAX_BATCH_COUNT = int(os.environ.get('MAX_BATCH_COUNT'))
+# 새로 생성되는 리더보드의 저장 방식 (timestamp | score)
+STORAGE_MODE = os.environ.get('STORAGE_MODE', 'timestamp')
+# 리더보드 저장소 (redis | memory), memory는 redis 없이 로컬 개발, 테스트와 성능 비교 기준으로 사용
+LEADERBOARD_BACKEND = os.environ.get('LEADERBOARD_BACKEND', 'redis')
+TOP_CACHE_MAX_ENTRIES = int(os.environ.get('TOP_CACHE_MAX_ENTRIES', 0))
+TOP_CACHE_TTL_SECONDS = float(os.environ.get('TOP_CACHE_TTL_SECONDS', 1))
+MAX_SHARD_COUNT = int(os.environ.get('MAX_SHARD_COUNT', 64))
+MAX_SHARDED_TOP_OFFSET = int(os.environ.get('MAX_SHARDED_TOP_OFFSET', 1000))
+BOARD_CONFIG_TTL_SECONDS = float(os.environ.get('BOARD_CONFIG_TTL_SECONDS', 60))
+WINDOW_UTC_OFFSET_HOURS = int(os.environ.get('WINDOW_UTC_OFFSET_HOURS', 0))
+WINDOW_RETENTION_PERIODS = int(os.environ.get('WINDOW_RETENTION_PERIODS', 1))
+ARCHIVE_TOP_COUNT = int(os.environ.get('ARCHIVE_TOP_COUNT', 100))
+ARCHIVE_RETENTION_SECONDS = int(os.environ.get('ARCHIVE_RETENTION_SECONDS', 7776000))
+HISTOGRAM_REBUILD_SECONDS = float(os.environ.get('HISTOGRAM_REBUILD_SECONDS', 5))
+HISTOGRAM_REBUILD_INTERVAL_SECONDS = int(os.environ.get('HISTOGRAM_REBUILD_INTERVAL_SECONDS', 86400))
+HISTOGRAM_REBUILD_CHUNK_SIZE = 1000
+# 한번의 요청으로 순위를 조회할 수 있는 리더보드 수
+MAX_SUMMARY_BOARD_COUNT = int(os.environ.get('MAX_SUMMARY_BOARD_COUNT', 50))
+# 비동기 점수 갱신에 사용할 queue (none | sqs | memory)
+SCORE_QUEUE = os.environ.get('SCORE_QUEUE', 'none')
+# 리더보드 backup 저장 위치 (s3://{bucket}/{prefix} 또는 로컬 디렉토리)
+BACKUP_LOCATION = os.environ.get('BACKUP_LOCATION', '/tmp/leaderboard-backup')
+BACKUP_CHUNK_SIZE = 10000
+BACKUP_BATCH_SIZE = 1000
+# 서비스 삭제, timestamp hash 정리 작업의 한번 실행 시간과 정리 주기
+CLEANUP_SECONDS = float(os.environ.get('CLEANUP_SECONDS', 5))
+CLEANUP_INTERVAL_SECONDS = int(os.environ.get('CLEANUP_INTERVAL_SECONDS', 604800))
+CLEANUP_BATCH_SIZE = 1000
+# 리더보드별 마지막 조회, 기록 시각을 container마다 기록하는 주기
+ACTIVITY_INTERVAL_SECONDS = int(os.environ.get('ACTIVITY_INTERVAL_SECONDS', 3600))
+# 조회, 기록이 없는 기간이 지나면 backup 저장 위치로 옮기는 리더보드의 기준 일수 (0이면 옮기지 않음)와 주기 작업이 옮기는 최대 유저 수
+COLD_BOARD_DAYS = int(os.environ.get('COLD_BOARD_DAYS', 0))
+COLD_BOARD_MAX_MEMBERS = int(os.environ.get('COLD_BOARD_MAX_MEMBERS', 100000))
+COLD_RESTORE_WAIT_SECONDS = 5
+
+# 읽기 전용 endpoint가 사용할 replica node 목록 (쉼표로 구분), 비어있으면 primary에서 읽음
+REDIS_READER_HOSTS = [host for host in os.environ.get('REDIS_READER_HOSTS', '').split(',') if host]
+REDIS_READ_FROM_REPLICAS = os.environ.get('REDIS_READ_FROM_REPLICAS', 'false') == 'true'
+
+if CLUSTER_MODE:
+    # cluster mode replication group의 configuration endpoint로 접속하여 샤드별로 다른 node에 요청
+    redis_client = redis_connection.create_cluster_client(os.environ.get('REDIS_HOST'), os.environ.get('REDIS_PORT'))
+    reader_client = redis_client
+    if REDIS_READ_FROM_REPLICAS:
+        reader_client = redis_connection.create_cluster_client(os.environ.get('REDIS_HOST'), os.environ.get('REDIS_PORT'),
+                                                               read_from_replicas=True)
+else:
+    redis_client = redis_connection.create_client(os.environ.get('REDIS_HOST'), os.environ.get('REDIS_PORT'))
+    reader_client = redis_client
+    if REDIS_READER_HOSTS:
+        # container마다 하나의 node를 골라 읽기 부하를 replica 전체로 분산
+        reader_client = redis_connection.create_client(random.choice(REDIS_READER_HOSTS), os.environ.get('REDIS_PORT'))
+    # 읽기 요청만 재시도하도록 읽기 전용 client를 따로 둠
+    reader_client = redis_connection.create_read_client(reader_client)
+
+metrics.instrument_redis(redis_client)
+if reader_client is not redis_client:
+    metrics.instrument_redis(reader_client)
+
+# dependency layer에 hiredis가 설치되었는지 container 시작 log로 확인
+print(f"redis reply parser: {'hiredis' if redis_connection.hiredis_enabled() else 'python'}")
+
+backend = create_leaderboard_backend(LEADERBOARD_BACKEND, redis_client, STORAGE_MODE)
+reader_backend = backend
+if LEADERBOARD_BACKEND == 'redis':
+    reader_backend = create_leaderboard_backend(LEADERBOARD_BACKEND, reader_client, STORAGE_MODE)
+
+router = Router(json_encoder=metrics.TimedJSONEncoder)
+
+
+# route 함수 이름을 요청 metric에 기록하도록 router에 등록
+def handle(method: str, path: str):
+    def decorator(func):
+        return router.handle(method, path=path)(metrics.named_route(func))
+    return decorator
+
+top_rank_cache = ResponseCache(TOP_CACHE_MAX_ENTRIES, TOP_CACHE_TTL_SECONDS)
+board_config_cache = BoardConfigCache(BOARD_CONFIG_TTL_SECONDS)
+score_queue = create_score_queue(SCORE_QUEUE, os.environ.get('SCORE_QUEUE_URL'))
+activity = board_activity.ActivityTracker(redis_client if LEADERBOARD_BACKEND == 'redis' else None, ACTIVITY_INTERVAL_SECONDS)
+
+
+# 읽기 요청은 replica로 보내고, consistent=true 요청은 직전에 기록한 내용을 읽을 수 있도록 primary로 보냄
+def read_client(event):
+    query_param_dict = event.get("json", {}).get("query", {})
+    if query_param_dict.get("consistent", False):
+        return redis_client
+    return reader_client
+
+
+def read_backend(event):
+    query_param_dict = event.get("json", {}).get("query", {})
+    if query_param_dict.get("consistent", False):
+        return backend
+    return reader_backend
+
+
+# 외부 저장소로 옮겨진 리더보드는 처음 접근할 때 복원한 뒤 설정을 반환
+def board_config(service_id: str, leader_board_id: str):
+    config = board_config_cache.get(backend, service_id, leader_board_id)
+    if config["offloaded"] is None:
+        return config
+
+    cold_boards.restore_board(redis_client, create_backup_storage(BACKUP_LOCATION), service_id, leader_board_id, BACKUP_BATCH_SIZE,
+                              COLD_RESTORE_WAIT_SECONDS)
+    board_config_cache.invalidate(service_id, leader_board_id)
+    return board_config_cache.get(backend, service_id, leader_board_id)
+
+
+def shard_count(service_id: str, leader_board_id: str):
+    return board_config(service_id, leader_board_id)["shards"]
+
+
+def score_policy(service_id: str, leader_board_id: str):
+    return board_config(service_id, leader_board_id)["policy"]
+
+
+# 점수 갱신시 함께 갱신할 현재 기간의 기간별 리더보드 id와 만료 시각
+def window_targets(service_id: str, leader_board_id: str):
+    windows = board_config(service_id, leader_board_id)["windows"]
+    if not windows:
+        return []
+    return windowed.window_write_targets(leader_board_id, windows, windowed.window_now(WINDOW_UTC_OFFSET_HOURS), WINDOW_RETENTION_PERIODS)
+
+
+# window=daily 형태의 query parameter로 기간별 리더보드를 조회, period를 지정하지 않으면 현재 기간
+# period는 숫자로 변환되지 않도록 json 변환되지 않은 원본 문자열을 사용
+def resolve_board_id(event, leader_board_id: str):
+    query_params = event.get("queryStringParameters") or {}
+    window = query_params.get("window")
+    if not window:
+        return leader_board_id, False
+
+    if window not in windowed.WINDOWS:
+        raise ValueError(f"window parameter must be one of {', '.join(windowed.WINDOWS)}.")
+
+    period = query_params.get("period")
+    if not period:
+        return windowed.current_window_board_id(leader_board_id, window, windowed.window_now(WINDOW_UTC_OFFSET_HOURS)), True
+    return windowed.window_board_id(leader_board_id, window, period), True
 
-redis_client = redis.StrictRedis(
-    host=os.environ.get('REDIS_HOST'),
-    port=os.environ.get('REDIS_PORT'),
-    charset="utf-8",
-    decode_responses=True)
 
-lambda_handler = create_lambda_handler(error_handler=None)
+# score 방식은 score에 tie-break를 함께 기록하므로 표현 가능한 정수 범위로 제한
+# 항상 score 방식인 샤드 리더보드만 기록하기 전에 확인하고, 그 밖의 리더보드는 점수 갱신 script가 리더보드의 실제 저장 방식으로 확인
+def validate_score(score, storage_mode: str = None):
+    # json의 true/false는 bool로, NaN, Infinity는 float로 변환되므로 함께 제외
+    if isinstance(score, bool) or not isinstance(score, (int, float)) or not math.isfinite(score):
+        raise ValueError("score parameter must be number.")
 
+    if score < 0:
+        raise ValueError("score parameter must be positive value.")
 
-def leaderboard_str(service_id: str, leader_board_id: str):
-    return f'{service_id}:leaderboard:{leader_board_id}'
+    if storage_mode == 'score' and (score != int(score) or score > MAX_ENCODED_SCORE):
+        raise ValueError(f"score parameter must be integer value not greater than {MAX_ENCODED_SCORE}.")
 
 
-def leaderboard_timestamp_str(service_id: str, leader_board_id: str):
-    return f'{service_id}:leaderboard:{leader_board_id}:timestamp'
+# backend 랭킹 조회에 함께 조회할 property field로 전달하는 값, property를 조회하지 않으면 None
+def property_fields(include_properties, fields: list):
+    return fields if include_properties else None
 
 
-def user_properties_key_str(service_id: str, user_id: str):
-    return f'{service_id}:user:{user_id}:properties'
+# backend가 반환한 rank, user_id, score (, property) 목록을 중간 리스트 없이 바로 응답으로 변환
+def decode_rank_data(rank_data: list, include_properties, fields: list):
+    step = 4 if include_properties else 3
+    response = []
+    for i in range(0, len(rank_data), step):
+        data = {"userId": rank_data[i+1], "rank": rank_data[i], "score": rank_data[i+2]}
+        if include_properties:
+            properties = decode_properties(rank_data[i+3][0], rank_data[i+3][1], fields)
+            if properties is not None:
+                data["properties"] = properties
+        response.append(data)
+    return response
 
 
-@lambda_handler.handle("get", path="/<string:service_id>/leaderboards/<string:leader_board_id>")
+@handle("get", path="/<string:service_id>/leaderboards/<string:leader_board_id>")
 def get_leaderboard_status(event, service_id, leader_board_id):
-    cardinality = redis_client.hlen(leaderboard_timestamp_str(service_id, leader_board_id))
-    return {"cardinality": cardinality}
+    activity.read(service_id, leader_board_id)
+    leader_board_id, _ = resolve_board_id(event, leader_board_id)
+    config = board_config(service_id, leader_board_id)
+    shards = config["shards"]
+    if shards > 1:
+        cardinality = sharded.cardinality(read_client(event), service_id, leader_board_id, shards)
+    else:
+        cardinality = read_backend(event).cardinality(service_id, leader_board_id)
+    return {"cardinality": cardinality, "shards": shards, "policy": config["policy"]}
+
+
+# 리더보드의 샤드 수와 함께 갱신할 기간별 리더보드를 설정, 이미 기록이 있는 리더보드의 샤드 수와 min 정책 여부는 변경할 수 없음
+@handle("put", path="/<string:service_id>/leaderboards/<string:leader_board_id>")
+def put_leader_board_config(event, service_id, leader_board_id):
+    auth_token = event.get("headers", {}).get("X-Auth", "")
 
+    if auth_token != ADMIN_SECRET_TOKEN:
+        raise AccessDeniedException("Invalid authentication")
 
-@lambda_handler.handle("get", path="/<string:service_id>/leaderboards/<string:leader_board_id>/<string:user_id>")
-def get_user_score(event, service_id, leader_board_id, user_id):
-    data = redis_client.eval(lua_script_get_my_rank, 2,
-                             leaderboard_str(service_id, leader_board_id),
-                             leaderboard_timestamp_str(service_id, leader_board_id),
-                             user_id)
+    if event["body"] is None:
+        raise InvalidRequestException("request parameter invalid")
 
-    if data is None:
-        raise UserNotFoundException("user not found")
+    body = metrics.json_loads(event["body"])
+
+    if "shards" not in body and "windows" not in body and "policy" not in body:
+        raise InvalidRequestException(
+            "'shards', 'windows' or 'policy' parameter not exists in request body")
+
+    # 옮겨진 리더보드는 설정을 교체하기 전에 복원
+    board_config(service_id, leader_board_id)
+    current = read_board_config(redis_client, service_id, leader_board_id)
+    shards = body.get("shards", current["shards"])
+    windows = body.get("windows", current["windows"])
+    policy = body.get("policy", current["policy"])
+
+    if not isinstance(shards, int) or shards <= 0 or shards > MAX_SHARD_COUNT:
+        raise InvalidRequestException(f"'shards' parameter must be integer between 1 and {MAX_SHARD_COUNT}")
+
+    windowed.validate_windows(windows)
+    validate_policy(policy)
+
+    if shards > 1 and windows:
+        raise InvalidRequestException("sharded leaderboard does not support 'windows'")
+
+    reverses_order = score_sign(policy) != score_sign(current["policy"])
+    if (shards != current["shards"] or reverses_order) and \
+            (redis_client.exists(leaderboard_str(service_id, leader_board_id)) or
+             sharded.has_data(redis_client, service_id, leader_board_id, current["shards"])):
+        if shards != current["shards"]:
+            raise InvalidRequestException("shard count of leaderboard which already has scores can not be changed")
+        raise InvalidRequestException("policy of leaderboard which already has scores can not be changed from or to 'min'")
+
+    config = {}
+    if shards > 1:
+        config["shards"] = shards
+    if windows:
+        config["windows"] = ",".join(dict.fromkeys(windows))
+    if policy != DEFAULT_SCORE_POLICY:
+        config["policy"] = policy
+
+    config_key = leaderboard_config_str(service_id, leader_board_id)
+    pipe = redis_client.pipeline()
+    pipe.delete(config_key)
+    if config:
+        pipe.hset(config_key, mapping=config)
+    pipe.execute()
+
+    if config:
+        sharded.touch_board(redis_client, service_id, leader_board_id, get_reverse_timestamp())
+    board_config_cache.invalidate(service_id, leader_board_id)
+    return
 
+
+@handle("get", path="/<string:service_id>/leaderboards/<string:leader_board_id>/<string:user_id>")
+def get_user_score(event, service_id, leader_board_id, user_id):
+    activity.read(service_id, leader_board_id)
+    leader_board_id, _ = resolve_board_id(event, leader_board_id)
     query_param_dict = event.get("json", {}).get("query", {})
     include_properties = query_param_dict.get("properties", False)
+    fields = parse_fields(event) if include_properties else []
+    client = read_client(event)
 
-    response = {"userId": data[1], "rank": data[0], "score": data[2]}
-    if include_properties:
-        properties = redis_client.get(user_properties_key_str(service_id, user_id))
-        if properties is not None:
-            response["properties"] = json.loads(properties)
+    shards = shard_count(service_id, leader_board_id)
+    if shards > 1:
+        data = sharded.get_rank(client, service_id, leader_board_id, shards, user_id)
+        if data is None:
+            raise UserNotFoundException("user not found")
+        if include_properties:
+            data = sharded.join_properties(client, service_id, data, fields)
+        return decode_rank_data(data, include_properties, fields)[0]
 
-    return response
+    data = read_backend(event).get_rank(service_id, leader_board_id, user_id, property_fields(include_properties, fields))
+
+    if data is None:
+        raise UserNotFoundException("user not found")
+
+    return decode_rank_data(data, include_properties, fields)[0]
 
 
-@lambda_handler.handle("delete", path="/<string:service_id>/leaderboards/<string:leader_board_id>/<string:user_id>")
+@handle("delete", path="/<string:service_id>/leaderboards/<string:leader_board_id>/<string:user_id>")
 def delete_user_score(event, service_id, leader_board_id, user_id):
-    redis_client.eval(lua_script_delete_score, 2,
-                      leaderboard_str(service_id, leader_board_id),
-                      leaderboard_timestamp_str(service_id, leader_board_id),
-                      user_id)
+    activity.write(service_id, leader_board_id)
+    shards = shard_count(service_id, leader_board_id)
+    if shards > 1:
+        sharded.delete_score(redis_client, service_id, leader_board_id, shards, user_id, get_reverse_timestamp())
+        return
+
+    backend.delete_score(service_id, leader_board_id, user_id, window_targets(service_id, leader_board_id))
     return
 
 # pick top rank of leader board
 
 
-@lambda_handler.handle("get", path="/<string:service_id>/leaderboards/<string:leader_board_id>/top")
+@handle("get", path="/<string:service_id>/leaderboards/<string:leader_board_id>/top")
 def get_top_rank_scores(event, service_id, leader_board_id):
+    activity.read(service_id, leader_board_id)
+    leader_board_id, windowed_board = resolve_board_id(event, leader_board_id)
     query_param_dict = event.get("json", {}).get("query", {})
     # if exlicit limit query parameter not exists then apply fetch default count
     limit = query_param_dict.get("limit", DEFAULT_FETCH_COUNT)
@@ -82,32 +338,59 @@ def get_top_rank_scores(event, service_id, leader_board_id):
     if limit <= 0:
         raise ValueError("limit parameter must be positive value.")
 
-    if offset <= 0:
-        raise ValueError("limit parameter must be positive value.")
+    if offset < 0:
+        raise ValueError("offset parameter must not be negative value.")
 
     limit = min(limit, MAX_FETCH_COUNT)
-
-    rank_data = redis_client.zrevrange(leaderboard_str(service_id, leader_board_id), offset, offset+limit-1, withscores=True)
-    # rank_data = redis_client.zrevrangebyscore(
-    #     leader_board_id, "+inf", "-inf", withscores=True, start=0, num=limit)
-
-    response = []
-
-    for idx, data in enumerate(rank_data, start=offset+1):
-        response.append({"userId": data[0].split(':')[1], "rank": idx, "score": data[1]})
-
     include_properties = query_param_dict.get("properties", False)
-    if include_properties:
-        properties = redis_client.mget(list(map(lambda x: user_properties_key_str(service_id, x['userId']), response)))
-        for i, prop in enumerate(properties, start=0):
-            if prop is not None:
-                response[i]["properties"] = json.loads(prop)
-
-    return response
-
-
-@lambda_handler.handle("get", path="/<string:service_id>/leaderboards/<string:leader_board_id>/<string:user_id>/around")
+    fields = parse_fields(event) if include_properties else []
+    client = read_client(event)
+    shards = shard_count(service_id, leader_board_id)
+
+    # 샤드 리더보드는 모든 샤드에서 offset + limit 개를 조회하므로 offset을 제한
+    if shards > 1 and offset > MAX_SHARDED_TOP_OFFSET:
+        raise ValueError(f"offset parameter of sharded leaderboard must not exceed {MAX_SHARDED_TOP_OFFSET}.")
+
+    # 리더보드 version이 client가 가진 응답과 같으면 랭킹을 조회하지 않고 304로 응답
+    etag = conditional_request.board_etag(service_id, leader_board_id, shards, include_properties, fields,
+                                          read_backend(event).board_versions(service_id, leader_board_id, include_properties))
+    headers = conditional_request.etag_headers(etag)
+    if conditional_request.not_modified(event, etag):
+        return None, 304, headers
+
+    # 같은 페이지에 대한 반복 요청은 리더보드 version이 바뀌지 않은 동안 container 내부 cache로 응답
+    cache_key = (service_id, leader_board_id, offset, limit, bool(include_properties), tuple(fields))
+    if TOP_CACHE_MAX_ENTRIES > 0:
+        cached = top_rank_cache.get(cache_key, etag)
+        if cached is not None:
+            return cached, 200, headers
+
+    if shards > 1:
+        rank_data = sharded.get_top(client, service_id, leader_board_id, shards, offset, limit)
+        if include_properties:
+            rank_data = sharded.join_properties(client, service_id, rank_data, fields)
+    else:
+        # 랭킹과 property를 한번에 조회
+        rank_data = read_backend(event).get_range(service_id, leader_board_id, offset, limit, property_fields(include_properties, fields))
+
+    if not rank_data and windowed_board:
+        # 만료된 기간별 리더보드는 archive 된 최종 상위 랭킹으로 응답
+        archive = windowed.read_archive(client, service_id, leader_board_id)
+        if archive is not None:
+            return archive[offset:(offset+limit)], 200, headers
+
+    response = decode_rank_data(rank_data, include_properties, fields)
+
+    if TOP_CACHE_MAX_ENTRIES > 0:
+        top_rank_cache.put(cache_key, etag, response)
+
+    return response, 200, headers
+
+
+@handle("get", path="/<string:service_id>/leaderboards/<string:leader_board_id>/<string:user_id>/around")
 def get_around_rank_scores(event, service_id, leader_board_id, user_id):
+    activity.read(service_id, leader_board_id)
+    leader_board_id, _ = resolve_board_id(event, leader_board_id)
     query_param_dict = event.get("json", {}).get("query", {})
 
     # if exlicit limit query parameter not exists then apply fetch default count
@@ -118,138 +401,466 @@ def get_around_rank_scores(event, service_id, leader_board_id, user_id):
 
     # limit count for prevent huge fetch
     limit = min(limit, MAX_FETCH_COUNT)
+    include_properties = query_param_dict.get("properties", False)
+    fields = parse_fields(event) if include_properties else []
+    client = read_client(event)
+    shards = shard_count(service_id, leader_board_id)
+
+    etag = conditional_request.board_etag(service_id, leader_board_id, shards, include_properties, fields,
+                                          read_backend(event).board_versions(service_id, leader_board_id, include_properties))
+    headers = conditional_request.etag_headers(etag)
+    if conditional_request.not_modified(event, etag):
+        return None, 304, headers
+
+    if shards > 1:
+        rank_data = sharded.get_around(client, service_id, leader_board_id, shards, user_id, limit)
+        if rank_data is None:
+            return [], 200, headers
+        if include_properties:
+            rank_data = sharded.join_properties(client, service_id, rank_data, fields)
+        return decode_rank_data(rank_data, include_properties, fields), 200, headers
+
+    rank_data = read_backend(event).get_around(service_id, leader_board_id, user_id, limit, property_fields(include_properties, fields))
 
-    # rank_data = redis_client.zrevrangebyscore(
-    #     leader_board_id, "+inf", "-inf", withscores=True, start=0, num=limit)
-    response = []
+    if rank_data is None:
+        return [], 200, headers
+
+    return decode_rank_data(rank_data, include_properties, fields), 200, headers
+
+
+# 정확한 순위 대신 점수 분포 histogram으로 추정한 순위와 상위 백분위를 리더보드 크기와 관계없는 비용으로 조회
+@handle("get", path="/<string:service_id>/leaderboards/<string:leader_board_id>/<string:user_id>/percentile")
+def get_user_percentile(event, service_id, leader_board_id, user_id):
+    activity.read(service_id, leader_board_id)
+    # 기간별 리더보드는 원본 리더보드의 정책을 따름
+    lowest_first = score_sign(score_policy(service_id, leader_board_id)) < 0
+    leader_board_id, _ = resolve_board_id(event, leader_board_id)
+    client = read_client(event)
+
+    shards = shard_count(service_id, leader_board_id)
+    if shards > 1:
+        located = sharded.get_score_histograms(client, service_id, leader_board_id, shards, user_id)
+    else:
+        data = script_get_percentile(client,
+                                     keys=[leaderboard_str(service_id, leader_board_id), leaderboard_timestamp_str(service_id, leader_board_id)],
+                                     args=[user_id])
+        located = None if data is None else (float(data[0]), [dict(zip(data[1][0::2], data[1][1::2]))])
+
+    if located is None:
+        raise UserNotFoundException("user not found")
 
-    rank_data = redis_client.eval(lua_script_get_around, 2,
-                                  leaderboard_str(service_id, leader_board_id), leaderboard_timestamp_str(service_id, leader_board_id),
-                                  user_id, limit)
+    score, histograms = located
+    if float(score).is_integer():
+        score = int(score)
+    return {"userId": user_id, "score": score, **estimate_position(score, histograms, lowest_first)}
 
-    if rank_data is None:
-        return []
 
-    for data in [rank_data[i:(i+3)] for i in range(0, len(rank_data), 3)]:
-        response.append({"userId": data[1].split(":")[1], "rank": data[0], "score": data[2]})
+# 유저의 여러 리더보드 순위를 한번에 조회, boards=season,map1,map2 형태의 query parameter
+# 샤드가 아닌 리더보드는 하나의 script 호출로 조회하고 property는 리더보드와 관계없이 한번만 조회
+@handle("get", path="/<string:service_id>/users/<string:user_id>/ranks")
+def get_user_ranks(event, service_id, user_id):
+    # 리더보드 id는 json 변환되지 않은 원본 문자열을 사용
+    boards = (event.get("queryStringParameters") or {}).get("boards", "")
+    board_ids = list(dict.fromkeys(board.strip() for board in boards.split(",") if board.strip()))
+
+    if not board_ids:
+        raise ValueError("boards parameter must not be empty.")
+
+    if len(board_ids) > MAX_SUMMARY_BOARD_COUNT:
+        raise ValueError(f"boards parameter must not contain more than {MAX_SUMMARY_BOARD_COUNT} leaderboards.")
+
+    query_param_dict = event.get("json", {}).get("query", {})
+    include_properties = query_param_dict.get("properties", False)
+    fields = parse_fields(event) if include_properties else []
+    client = read_client(event)
+
+    ranks = {}
+    single_boards = []
+    for board_id in board_ids:
+        activity.read(service_id, board_id)
+        leader_board_id, _ = resolve_board_id(event, board_id)
+        shards = shard_count(service_id, leader_board_id)
+        if shards > 1:
+            ranks[board_id] = sharded.get_rank(client, service_id, leader_board_id, shards, user_id)
+        else:
+            single_boards.append((board_id, leader_board_id))
+
+    properties = None
+    if single_boards:
+        single_ranks, properties = read_backend(event).get_user_ranks(service_id, [leader_board_id for _, leader_board_id in single_boards],
+                                                                      user_id, property_fields(include_properties, fields))
+        for (board_id, _), rank in zip(single_boards, single_ranks):
+            ranks[board_id] = rank
+    elif include_properties:
+        properties = read_backend(event).get_properties(service_id, [user_id], fields)[0]
+
+    # 기록이 없는 리더보드는 응답에서 제외
+    response = {"userId": user_id, "ranks": [{"leaderBoardId": board_id, "rank": ranks[board_id][0], "score": ranks[board_id][2]}
+                                             for board_id in board_ids if ranks[board_id] is not None]}
+    if properties is not None:
+        decoded = decode_properties(properties[0], properties[1], fields)
+        if decoded is not None:
+            response["properties"] = decoded
+    return response
+
+
+# 친구 목록처럼 요청한 유저들만의 순위를 조회, 요청한 유저 안에서의 순위(rank)와 리더보드 전체 순위(globalRank)를 함께 응답
+# 샤드가 아닌 리더보드는 유저 수와 관계없이 하나의 script 호출로 조회
+@handle("post", path="/<string:service_id>/leaderboards/<string:leader_board_id>/ranks")
+def get_users_rank(event, service_id, leader_board_id):
+    if event["body"] is None:
+        raise InvalidRequestException("request parameter invalid")
+
+    body = metrics.json_loads(event["body"])
+
+    if "userIds" not in body:
+        raise InvalidRequestException(
+            "'userIds' parameter not exists in request body")
+
+    if not isinstance(body["userIds"], list) or not all(isinstance(user_id, str) for user_id in body["userIds"]):
+        raise InvalidRequestException("'userIds' parameter must be a list of user id")
 
+    user_ids = list(dict.fromkeys(body["userIds"]))
+
+    if len(user_ids) > MAX_BATCH_COUNT:
+        raise InvalidRequestException(f"'userIds' parameter must not exceed {MAX_BATCH_COUNT} entries")
+
+    if not user_ids:
+        return []
+
+    activity.read(service_id, leader_board_id)
+    leader_board_id, _ = resolve_board_id(event, leader_board_id)
+    query_param_dict = event.get("json", {}).get("query", {})
     include_properties = query_param_dict.get("properties", False)
-    if include_properties:
-        properties = redis_client.mget(list(map(lambda x: user_properties_key_str(service_id, x['userId']), response)))
-        for i, prop in enumerate(properties, start=0):
-            if prop is not None:
-                response[i]["properties"] = json.loads(prop)
+    fields = parse_fields(event) if include_properties else []
+    client = read_client(event)
 
+    shards = shard_count(service_id, leader_board_id)
+    if shards > 1:
+        rank_data = sharded.get_ranks(client, service_id, leader_board_id, shards, user_ids)
+        if include_properties:
+            rank_data = sharded.join_properties(client, service_id, rank_data, fields)
+    else:
+        rank_data = read_backend(event).get_ranks(service_id, leader_board_id, user_ids, property_fields(include_properties, fields))
+
+    response = []
+    for rank, data in enumerate(decode_rank_data(rank_data, include_properties, fields), start=1):
+        response.append({"userId": data.pop("userId"), "rank": rank, "globalRank": data.pop("rank"), **data})
     return response
 
 
-@lambda_handler.handle("put", path="/<string:service_id>/leaderboards/<string:leader_board_id>/<string:user_id>")
+# async=true 요청은 점수를 queue에 넣고 바로 응답하며, 이전 점수는 응답하지 않음
+def is_async(event):
+    return event.get("json", {}).get("query", {}).get("async", False)
+
+
+def enqueue_scores(service_id: str, leader_board_id: str, scores: list):
+    if score_queue is None:
+        raise InvalidRequestException("asynchronous score ingestion is not enabled")
+
+    score_queue.send([score_event(service_id, leader_board_id, entry["userId"], entry["score"]) for entry in scores])
+
+
+# 검증이 끝난 점수 목록을 한번의 script 호출로 원자적으로 갱신하여 유저별 왕복을 제거하고, 유저별 이전 점수를 반환
+def write_scores(service_id: str, leader_board_id: str, scores: list, shards: int):
+    activity.write(service_id, leader_board_id)
+    policy = score_policy(service_id, leader_board_id)
+    if shards > 1:
+        return sharded.put_scores(redis_client, service_id, leader_board_id, shards, scores, get_reverse_timestamp(), policy)
+
+    return backend.put_scores(service_id, leader_board_id, scores, get_reverse_timestamp(), policy, window_targets(service_id, leader_board_id))
+
+
+# queue에서 전달된 메세지를 리더보드별 batch로 나누고, batch마다 정책에 따라 유저별 하나의 점수로 합친 뒤 한번의 batch 갱신으로 기록
+# 기록에 실패한 batch의 message id 목록을 반환하여 그 메세지만 다시 전달받으므로, 기록된 메세지의 sum 점수는 다시 더해지지 않음
+# 리더보드의 저장 방식으로 기록할 수 없는 점수가 포함된 batch는 다시 전달되어도 기록할 수 없으므로 버림
+def consume_score_messages(messages: list):
+    failed = []
+    received = written = 0
+    for (service_id, leader_board_id), message_ids, events in batch_score_messages(messages, MAX_BATCH_COUNT):
+        boards, _ = coalesce_score_events(events, score_policy)
+        scores = [{"userId": user_id, "score": score} for user_id, score in boards[(service_id, leader_board_id)].items()]
+        received, written = received + len(events), written + len(scores)
+        try:
+            write_scores(service_id, leader_board_id, scores, shard_count(service_id, leader_board_id))
+        except InvalidRequestException as error:
+            print(f"[{service_id}] dropped {len(scores)} queued scores of {leader_board_id}: {error}")
+        except Exception as error:
+            print(f"[{service_id}] failed to write {len(message_ids)} queued messages of {leader_board_id}, retried later: {error}")
+            failed += message_ids
+
+    report_ingestion(received, written)
+    return failed
+
+
+@handle("put", path="/<string:service_id>/leaderboards/<string:leader_board_id>/<string:user_id>")
 def put_score(event, service_id, leader_board_id, user_id):
     if event["body"] is None:
         raise InvalidRequestException("request parameter invalid")
 
-    body = json.loads(event["body"])
+    body = metrics.json_loads(event["body"])
 
-    if "score" not in body:
+    if not isinstance(body, dict) or "score" not in body:
         raise InvalidRequestException(
             "'score' parameter not exists in request body")
 
     if body["score"] == 0:
         return
 
-    if body["score"] < 0:
-        raise ValueError("score parameter must be positive value.")
+    shards = shard_count(service_id, leader_board_id)
+
+    if is_async(event):
+        validate_score(body["score"], "score" if shards > 1 else None)
+        enqueue_scores(service_id, leader_board_id, [{"userId": user_id, "score": body["score"]}])
+        return {"queued": 1}, 202
+
+    # 리더보드 정책에 따라 최고 점수, 최저 점수, 누적 점수 또는 마지막 점수로 기록
+    activity.write(service_id, leader_board_id)
+    policy = score_policy(service_id, leader_board_id)
+
+    if shards > 1:
+        # 샤드는 항상 score 방식으로 저장
+        validate_score(body["score"], "score")
+        prev_score = sharded.put_score(redis_client, service_id, leader_board_id, shards, user_id, body["score"], get_reverse_timestamp(), policy)
+        return {"prevScore": prev_score}
+
+    validate_score(body["score"])
 
-    prev_score = redis_client.eval(lua_script_put_score, 2,
-                                   leaderboard_str(service_id, leader_board_id),
-                                   leaderboard_timestamp_str(service_id, leader_board_id),
-                                   user_id, body["score"], get_reverse_timestamp())
+    # 설정된 기간별 리더보드도 같은 backend 호출에서 원자적으로 함께 갱신
+    prev_score = backend.put_score(service_id, leader_board_id, user_id, body["score"], get_reverse_timestamp(), policy,
+                                   window_targets(service_id, leader_board_id))
 
     return {"prevScore": prev_score}
 
-    # lboard_user_id = redis_client.hget(leaderboard_timestamp_str(
-    #     service_id, leader_board_id), user_id)
 
-    # # exist prev value
-    # if lboard_user_id is not None:
-    #     prev_score = redis_client.zscore(leaderboard_str(
-    #         service_id, leader_board_id), lboard_user_id)
-    #     if prev_score is not None and body["score"] <= prev_score:
-    #         return
+@handle("post", path="/<string:service_id>/leaderboards/<string:leader_board_id>/scores")
+def put_scores(event, service_id, leader_board_id):
+    if event["body"] is None:
+        raise InvalidRequestException("request parameter invalid")
+
+    body = metrics.json_loads(event["body"])
+
+    if not isinstance(body, dict) or "scores" not in body:
+        raise InvalidRequestException(
+            "'scores' parameter not exists in request body")
+
+    scores = body["scores"]
+
+    if not isinstance(scores, list):
+        raise InvalidRequestException("'scores' parameter must be list of userId and score entries")
 
-    # update_timestamp = get_now_timestamp()
-    # redis_client.hset(leaderboard_timestamp_str(
-    #     service_id, leader_board_id), user_id, update_timestamp)
-    # stamped_user_id = timestamp_user_id(user_id, update_timestamp)
-    # redis_client.zadd(leaderboard_str(
-    #     service_id, leader_board_id), ch=True, mapping={stamped_user_id: body["score"]})
-    # return
+    if len(scores) > MAX_BATCH_COUNT:
+        raise InvalidRequestException(f"'scores' parameter must not exceed {MAX_BATCH_COUNT} entries")
 
+    shards = shard_count(service_id, leader_board_id)
 
-# @lambda_handler.handle("post", path="/<string:service_id>/<string:leader_board_id>/<string:user_id>")
-# def incr_score(event, service_id, leader_board_id, user_id):
-#     if event["body"] is None:
-#         raise InvalidRequestException("request parameter invalid")
+    for entry in scores:
+        if not isinstance(entry, dict) or "userId" not in entry or "score" not in entry:
+            raise InvalidRequestException(
+                "'userId' and 'score' parameter must exist in every 'scores' entry")
 
-#     body = json.loads(event["body"])
+        if not isinstance(entry["userId"], str) or not entry["userId"]:
+            raise InvalidRequestException("'userId' parameter must be non-empty string")
 
-#     if "delta" not in body:
-#         raise InvalidRequestException(
-#             "'delta' parameter not exists in request body")
+        validate_score(entry["score"], "score" if shards > 1 else None)
+
+    if not scores:
+        return []
 
-#     redis_client.zincrby(leaderboard_str(
-#         service_id, leader_board_id), body["delta"], user_id)
-#     return
+    if is_async(event):
+        enqueue_scores(service_id, leader_board_id, scores)
+        return {"queued": len(scores)}, 202
 
-@lambda_handler.handle("put", path="/<string:service_id>/users/<string:user_id>")
+    prev_scores = write_scores(service_id, leader_board_id, scores, shards)
+
+    return [{"userId": entry["userId"], "prevScore": prev_score} for entry, prev_score in zip(scores, prev_scores)]
+
+
+@handle("put", path="/<string:service_id>/users/<string:user_id>")
 def put_user_property(event, service_id, user_id):
-    body = json.loads(event["body"])
+    body = metrics.json_loads(event["body"])
+    if not isinstance(body, dict):
+        raise InvalidRequestException("request parameter invalid")
+
     if "properties" in body:
-        redis_client.set(user_properties_key_str(service_id, user_id), json.dumps(body["properties"]))
+        # property는 field 단위로 저장하므로 object만 허용
+        if not isinstance(body["properties"], dict):
+            raise InvalidRequestException("'properties' parameter must be object")
+        backend.put_properties(service_id, user_id, body["properties"])
     return
 
 
-@lambda_handler.handle("delete", path="/<string:service_id>/leaderboards/<string:leader_board_id>")
+@handle("delete", path="/<string:service_id>/leaderboards/<string:leader_board_id>")
 def delete_leader_board(event, service_id, leader_board_id):
     auth_token = event.get("headers", {}).get("X-Auth", "")
 
     if auth_token != ADMIN_SECRET_TOKEN:
         raise AccessDeniedException("Invalid authentication")
 
-    redis_client.delete(leaderboard_str(service_id, leader_board_id), leaderboard_timestamp_str(service_id, leader_board_id))
+    config = read_board_config(redis_client, service_id, leader_board_id)
+    shards = config["shards"]
+    # 큰 리더보드의 메모리 해제로 redis가 block되지 않도록 UNLINK로 삭제
+    keys = [leaderboard_str(service_id, leader_board_id), leaderboard_timestamp_str(service_id, leader_board_id),
+            leaderboard_staging_str(service_id, leader_board_id), leaderboard_migrating_str(service_id, leader_board_id),
+            leaderboard_config_str(service_id, leader_board_id), histogram_key(leaderboard_str(service_id, leader_board_id))]
+    if shards > 1:
+        keys += sharded.shard_key_list(service_id, leader_board_id, shards)
+    if config["windows"]:
+        # 이전 기간의 기간별 리더보드는 만료되므로 현재, 직전 기간만 삭제
+        keys += windowed.window_key_list(service_id, leader_board_id, config["windows"], windowed.window_now(WINDOW_UTC_OFFSET_HOURS))
+    board_cleanup.unlink_keys(redis_client, keys)
+    board_config_cache.invalidate(service_id, leader_board_id)
+    # version key는 삭제하지 않고 증가시켜서 이전 version으로 저장된 cache가 재사용되지 않도록 함
+    redis_client.incr(leaderboard_version_str(service_id, leader_board_id))
+    redis_client.zrem(leaderboard_index_str(service_id), leader_board_id)
+    for index_key in (leaderboard_index_created_str(service_id), leaderboard_index_read_str(service_id), leaderboard_index_written_str(service_id)):
+        redis_client.hdel(index_key, leader_board_id)
     return
 
-# for debug purpose
 
+@handle("get", path="/<string:service_id>/leaderboards")
+def get_leader_boards(event, service_id):
+    auth_token = event.get("headers", {}).get("X-Auth", "")
+
+    query_param_dict = event.get("json", {}).get("query", {})
+    # if exlicit limit query parameter not exists then apply fetch default count
+    limit = query_param_dict.get("limit", DEFAULT_FETCH_COUNT)
+    # cursor는 리더보드 id 이므로 json 변환되지 않은 원본 문자열을 사용
+    cursor = (event.get("queryStringParameters") or {}).get("cursor", "")
+
+    if limit <= 0:
+        raise ValueError("limit parameter must be positive value.")
+
+    if auth_token != ADMIN_SECRET_TOKEN:
+        raise AccessDeniedException("Invalid authentication")
+
+    limit = min(limit, MAX_FETCH_COUNT)
+    next_cursor, boards = read_backend(event).list_boards(service_id, cursor, limit)
 
-# @lambda_handler.handle("get")
-# def get_default_handle(event):
-#     return event
+    leaderboards = []
+    for board in boards:
+        cardinality = board[2]
+        if board[3] > 1:
+            cardinality = sharded.cardinality(read_client(event), service_id, board[0], board[3])
+        leaderboards.append({"leaderBoardId": board[0], "createdAt": board[1], "cardinality": cardinality})
 
-@lambda_handler.handle("get", path="/<string:service_id>/leaderboards")
-def delete_leader_board(event, service_id):
+    return {"leaderboards": leaderboards, "cursor": next_cursor}
+
+
+# 리더보드별 메모리 사용량, cardinality, 마지막 조회, 기록 시각과 외부 저장소로 옮겨졌는지 여부를 리더보드 목록과 같은 순서로 조회
+@handle("get", path="/<string:service_id>/stats/leaderboards")
+def get_leader_board_stats(event, service_id):
     auth_token = event.get("headers", {}).get("X-Auth", "")
 
     query_param_dict = event.get("json", {}).get("query", {})
-    # if exlicit limit query parameter not exists then apply fetch default count
     limit = query_param_dict.get("limit", DEFAULT_FETCH_COUNT)
+    cursor = (event.get("queryStringParameters") or {}).get("cursor", "")
 
-    if limit < 0:
+    if limit <= 0:
         raise ValueError("limit parameter must be positive value.")
 
     if auth_token != ADMIN_SECRET_TOKEN:
         raise AccessDeniedException("Invalid authentication")
 
-    scan_responses = redis_client.scan(count=limit, match=f'{service_id}:leaderboard:*:timestamp')
+    limit = min(limit, MAX_FETCH_COUNT)
+    client = read_client(event)
+    next_cursor, boards = read_backend(event).list_boards(service_id, cursor, limit)
+    stats = board_activity.board_stats(client, service_id, boards)
+    for board, stat in zip(boards, stats):
+        if board[3] > 1:
+            stat["cardinality"] = sharded.cardinality(client, service_id, board[0], board[3])
+
+    return {"leaderboards": stats, "cursor": next_cursor}
+
+
+# EventBridge 스케줄로 실행되는 주기 작업
+def run_job(event):
+    if event["job"] == "rollover":
+        for service_id in event.get("services", []):
+            archived = windowed.archive_closed_windows(redis_client, service_id, windowed.window_now(WINDOW_UTC_OFFSET_HOURS),
+                                                       ARCHIVE_TOP_COUNT, ARCHIVE_RETENTION_SECONDS)
+            print(f"[{service_id}] rollover finished, {archived} leaderboards archived")
+        return
 
-    response = [k.split(":")[2] for k in scan_responses[1:][0]]
+    if event["job"] == "rebuild_histograms":
+        deadline = time.monotonic() + HISTOGRAM_REBUILD_SECONDS
+        for service_id in event.get("services", []):
+            rebuilt = rebuild_service_histograms(redis_client, service_id, windowed.window_now(WINDOW_UTC_OFFSET_HOURS), deadline,
+                                                 HISTOGRAM_REBUILD_CHUNK_SIZE, HISTOGRAM_REBUILD_INTERVAL_SECONDS)
+            print(f"[{service_id}] {rebuilt} histograms are up to date")
+        return
 
-    return response
+    # SQS 메세지는 lambda의 event source가 전달하므로 같은 프로세스 안의 queue를 사용할 때에만 실행
+    if event["job"] == "drain_score_queue":
+        if not isinstance(score_queue, InMemoryScoreQueue):
+            raise ValueError("drain_score_queue job requires SCORE_QUEUE=memory, SQS messages are delivered by the lambda event source.")
+        consume_score_messages(score_queue.receive(MAX_BATCH_COUNT))
+        return
+
+    # lambda 실행 시간 안에 끝나는 크기의 리더보드 backup/복원, 큰 리더보드는 board_backup.py 명령으로 실행
+    if event["job"] == "export_board":
+        result = board_backup.export_board(redis_client, create_backup_storage(BACKUP_LOCATION), event["service"], event["board"],
+                                           event.get("backupId") or board_backup.backup_id_now(), BACKUP_CHUNK_SIZE)
+        print(f"[{event['service']}] exported {result}")
+        return result
+
+    if event["job"] == "import_board":
+        result = board_backup.import_board(redis_client, create_backup_storage(BACKUP_LOCATION), event["backup"], event["service"],
+                                           event.get("targetBoard") or event["board"], BACKUP_BATCH_SIZE)
+        board_config_cache.invalidate(event["service"], result["board"])
+        print(f"[{event['service']}] imported {result}")
+        return result
+
+    # 서비스 전체 삭제, 끝나지 않으면 같은 event로 다시 실행
+    if event["job"] == "purge_service":
+        result = board_cleanup.purge_service(redis_client, event["service"], time.monotonic() + CLEANUP_SECONDS, CLEANUP_BATCH_SIZE)
+        board_config_cache.entries.clear()
+        print(f"[{event['service']}] purged {result}")
+        return result
+
+    if event["job"] == "cleanup_timestamps":
+        deadline = time.monotonic() + CLEANUP_SECONDS
+        for service_id in event.get("services", []):
+            removed = board_cleanup.cleanup_service_timestamps(redis_client, service_id, windowed.window_now(WINDOW_UTC_OFFSET_HOURS), deadline,
+                                                               CLEANUP_BATCH_SIZE, CLEANUP_INTERVAL_SECONDS)
+            print(f"[{service_id}] {removed} orphaned timestamp entries removed")
+        return
+
+    # 오래 사용되지 않은 리더보드를 backup 저장 위치로 옮김, 끝나지 않으면 다음 실행에서 이어서 진행
+    if event["job"] == "offload_cold_boards":
+        if COLD_BOARD_DAYS <= 0:
+            return
+        deadline = time.monotonic() + CLEANUP_SECONDS
+        storage = create_backup_storage(BACKUP_LOCATION)
+        for service_id in event.get("services", []):
+            offloaded = cold_boards.offload_cold_boards(redis_client, storage, service_id, int(time.time()), COLD_BOARD_DAYS * 86400, deadline,
+                                                        COLD_BOARD_MAX_MEMBERS, BACKUP_CHUNK_SIZE)
+            print(f"[{service_id}] {offloaded} cold leaderboards offloaded")
+        return
+
+    print(f"unknown job: {event['job']}")
 
 
 def handler(event, context):
+    # API Gateway 요청이 아닌 스케줄 이벤트는 주기 작업으로 처리
+    if "job" in event:
+        return run_job(event)
+
+    # SQS event source로 전달된 비동기 점수 갱신, 실패하면 예외를 그대로 전달하여 SQS가 다시 전달하도록 함
+    records = event.get("Records")
+    if records and records[0].get("eventSource") == "aws:sqs":
+        failed = consume_score_messages(sqs_record_messages(records))
+        return {"batchItemFailures": [{"itemIdentifier": message_id} for message_id in failed]}
+
+    metrics.start_request()
+    response = route_request(event)
+    metrics.finish_request(event, response)
+    return response
+
+
+def route_request(event):
     try:
-        return lambda_handler(event=event)
+        return router(event)
     except (ValueError, InvalidRequestException) as verror:
         return {
             "statusCode": "400",
@@ -271,6 +882,14 @@ def handler(event, context):
                 "message": str(kerror)
             })
         }
+    except ServiceUnavailableException as uerror:
+        return {
+            "statusCode": "503",
+            "headers": {"Retry-After": "1"},
+            "body": json.dumps({
+                "message": str(uerror)
+            })
+        }
     except Exception as ex:
         traceback.print_exc()
         return {
@@ -279,14 +898,3 @@ def handler(event, context):
                 "message": str(ex)
             })
         }
-    # rank_data = redis_client.zrevrangebyscore(
-    #     LeaderBoardId, "+inf", "-inf", withscores=True, start=0, num=50)
-
-    # return {
-    #     # 'path': event['path'],
-    #     # 'method': event['httpMethod'],
-    #     'statusCode': '200',
-    #     'headers': {},
-    #     'body': json.dumps(event),
-    #     'isBase64Encoded': False
-    # }
@@ -0,0 +1,407 @@
+import threading
+import time
+from timestamp import MAX_TIMESTAMP
+from leaderboard_keys import leaderboard_str, leaderboard_timestamp_str, leaderboard_version_str, leaderboard_index_str, \
+    leaderboard_index_created_str, user_properties_key_str, user_properties_key_parts, user_properties_version_str
+from script_registry import script_get_around, script_get_my_rank, script_get_top, script_put_score, script_put_scores, script_delete_score, \
+    script_list_boards, script_get_user_ranks, script_get_users_rank, script_get_properties
+from board_config import read_board_config
+from score_policy import DEFAULT_SCORE_POLICY, score_sign
+from user_properties import encode_properties
+from indexed_skiplist import IndexedSkipList
+
+# 샤드가 아닌 리더보드의 점수 기록, 순위 조회와 유저 property 저장소
+#
+# route 함수는 저장소에 직접 접근하지 않고 backend를 통해서 처리합니다. 순위 조회 결과는 조회 script와 같은
+# rank, user_id, score 목록이며, fields가 None이 아니면 각 유저 뒤에 (key type, 값 목록) 형태의 property를 덧붙입니다
+# (빈 fields는 전체 field). windows는 함께 갱신할 기간별 리더보드의 (board id, 만료 시각) 목록입니다.
+#
+# - redis  : Lua script로 처리하는 기본 저장소
+# - memory : 프로세스 안의 indexed skiplist로 처리하는 저장소, redis 없이 로컬 개발, 테스트와 성능 비교 기준으로 사용
+#
+# 샤드 리더보드, 리더보드 설정 변경과 삭제, 점수 분포 histogram, 기간별 리더보드 archive와 주기 작업은 redis에서만 지원합니다.
+
+
+class LeaderboardBackend:
+    def board_config(self, service_id: str, leader_board_id: str) -> dict:
+        raise NotImplementedError
+
+    # 리더보드 생성 시각과 version (include_properties 이면 서비스의 유저 property version 포함), 조회 결과의 ETag에 사용
+    def board_versions(self, service_id: str, leader_board_id: str, include_properties) -> list:
+        raise NotImplementedError
+
+    def put_score(self, service_id: str, leader_board_id: str, user_id: str, score, timestamp: int, policy: str, windows: list = ()):
+        raise NotImplementedError
+
+    def put_scores(self, service_id: str, leader_board_id: str, scores: list, timestamp: int, policy: str, windows: list = ()) -> list:
+        raise NotImplementedError
+
+    def delete_score(self, service_id: str, leader_board_id: str, user_id: str, windows: list = ()):
+        raise NotImplementedError
+
+    def get_rank(self, service_id: str, leader_board_id: str, user_id: str, fields: list = None):
+        raise NotImplementedError
+
+    # 여러 유저의 순위를 순위 순서로 반환, 기록이 없는 유저는 제외
+    def get_ranks(self, service_id: str, leader_board_id: str, user_ids: list, fields: list = None) -> list:
+        raise NotImplementedError
+
+    # 여러 리더보드에서 한 유저의 rank, user_id, score (기록이 없으면 None) 목록과 property
+    def get_user_ranks(self, service_id: str, leader_board_ids: list, user_id: str, fields: list = None):
+        raise NotImplementedError
+
+    def get_range(self, service_id: str, leader_board_id: str, offset: int, limit: int, fields: list = None) -> list:
+        raise NotImplementedError
+
+    def get_around(self, service_id: str, leader_board_id: str, user_id: str, limit: int, fields: list = None):
+        raise NotImplementedError
+
+    def cardinality(self, service_id: str, leader_board_id: str) -> int:
+        raise NotImplementedError
+
+    def get_properties(self, service_id: str, user_ids: list, fields: list) -> list:
+        raise NotImplementedError
+
+    def put_properties(self, service_id: str, user_id: str, properties: dict):
+        raise NotImplementedError
+
+    # cursor 이후의 리더보드 (id, 생성 시각, cardinality, 샤드 수) 목록과 다음 cursor, 다음 페이지가 없으면 빈 문자열
+    def list_boards(self, service_id: str, cursor: str, limit: int):
+        raise NotImplementedError
+
+
+# 랭킹 조회 script가 property를 함께 조회하도록 전달하는 인자 (property key prefix, suffix, fields)
+def properties_args(service_id: str, fields: list):
+    if fields is None:
+        return ["", ""]
+    return [*user_properties_key_parts(service_id), *fields]
+
+
+class RedisBackend(LeaderboardBackend):
+    def __init__(self, redis_client, storage_mode: str):
+        self.client = redis_client
+        self.storage_mode = storage_mode
+
+    @staticmethod
+    def board_keys(service_id: str, leader_board_id: str):
+        return [leaderboard_str(service_id, leader_board_id), leaderboard_timestamp_str(service_id, leader_board_id)]
+
+    def write_keys(self, service_id: str, leader_board_id: str, windows: list):
+        keys = [*self.board_keys(service_id, leader_board_id), leaderboard_index_str(service_id)]
+        for board_id, _ in windows:
+            keys += self.board_keys(service_id, board_id)
+        return keys
+
+    def board_config(self, service_id: str, leader_board_id: str):
+        return read_board_config(self.client, service_id, leader_board_id)
+
+    def board_versions(self, service_id: str, leader_board_id: str, include_properties):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hget(leaderboard_index_created_str(service_id), leader_board_id)
+        pipe.get(leaderboard_version_str(service_id, leader_board_id))
+        if include_properties:
+            pipe.get(user_properties_version_str(service_id))
+        return [version or "0" for version in pipe.execute()]
+
+    def put_score(self, service_id: str, leader_board_id: str, user_id: str, score, timestamp: int, policy: str, windows: list = ()):
+        return script_put_score(self.client,
+                                keys=self.write_keys(service_id, leader_board_id, windows),
+                                args=[user_id, score, timestamp, self.storage_mode, leader_board_id, policy,
+                                      *[expire_at for _, expire_at in windows]])
+
+    def put_scores(self, service_id: str, leader_board_id: str, scores: list, timestamp: int, policy: str, windows: list = ()):
+        args = []
+        for entry in scores:
+            args += [entry["userId"], entry["score"]]
+
+        return script_put_scores(self.client,
+                                 keys=self.write_keys(service_id, leader_board_id, windows),
+                                 args=[timestamp, self.storage_mode, leader_board_id, policy,
+                                       len(windows), *[expire_at for _, expire_at in windows], *args])
+
+    def delete_score(self, service_id: str, leader_board_id: str, user_id: str, windows: list = ()):
+        return script_delete_score(self.client,
+                                   keys=self.write_keys(service_id, leader_board_id, windows),
+                                   args=[user_id, leader_board_id])
+
+    def get_rank(self, service_id: str, leader_board_id: str, user_id: str, fields: list = None):
+        return script_get_my_rank(self.client,
+                                  keys=self.board_keys(service_id, leader_board_id),
+                                  args=[user_id, *properties_args(service_id, fields)])
+
+    def get_ranks(self, service_id: str, leader_board_id: str, user_ids: list, fields: list = None):
+        return script_get_users_rank(self.client,
+                                     keys=self.board_keys(service_id, leader_board_id),
+                                     args=[len(user_ids), *user_ids, *properties_args(service_id, fields)])
+
+    def get_user_ranks(self, service_id: str, leader_board_ids: list, user_id: str, fields: list = None):
+        keys = []
+        for leader_board_id in leader_board_ids:
+            keys += self.board_keys(service_id, leader_board_id)
+        data = script_get_user_ranks(self.client, keys=keys, args=[user_id, *properties_args(service_id, fields)])
+
+        ranks = [[data[i*2], user_id, data[i*2+1]] if data[i*2] > 0 else None for i in range(len(leader_board_ids))]
+        return ranks, data[-1] if fields is not None else None
+
+    def get_range(self, service_id: str, leader_board_id: str, offset: int, limit: int, fields: list = None):
+        return script_get_top(self.client,
+                              keys=self.board_keys(service_id, leader_board_id),
+                              args=[offset, limit, *properties_args(service_id, fields)])
+
+    def get_around(self, service_id: str, leader_board_id: str, user_id: str, limit: int, fields: list = None):
+        return script_get_around(self.client,
+                                 keys=self.board_keys(service_id, leader_board_id),
+                                 args=[user_id, limit, *properties_args(service_id, fields)])
+
+    def cardinality(self, service_id: str, leader_board_id: str):
+        return self.client.zcard(leaderboard_str(service_id, leader_board_id))
+
+    def get_properties(self, service_id: str, user_ids: list, fields: list):
+        return script_get_properties(self.client,
+                                     keys=[user_properties_key_str(service_id, user_id) for user_id in user_ids],
+                                     args=fields)
+
+    def put_properties(self, service_id: str, user_id: str, properties: dict):
+        # 부분 업데이트가 아닌 전체 교체이므로 기존 property를 지우고 field 단위 hash로 저장
+        properties_key = user_properties_key_str(service_id, user_id)
+        pipe = self.client.pipeline()
+        pipe.delete(properties_key)
+        if properties:
+            pipe.hset(properties_key, mapping=encode_properties(properties))
+        # property를 함께 조회한 응답의 ETag가 바뀌도록 version 증가
+        pipe.incr(user_properties_version_str(service_id))
+        pipe.execute()
+
+    def list_boards(self, service_id: str, cursor: str, limit: int):
+        # 전체 keyspace를 SCAN하지 않고 write script가 관리하는 서비스별 리더보드 index를 cursor 기반으로 조회
+        next_cursor, data = script_list_boards(self.client,
+                                               keys=[leaderboard_index_str(service_id)],
+                                               args=[cursor, limit, leaderboard_str(service_id, "")])
+        return next_cursor, [data[i:(i+4)] for i in range(0, len(data), 4)]
+
+
+# 메모리 리더보드, key는 (score, reverse timestamp, user_id) 이며 skiplist의 오름차순을 뒤집은 순서가 순위
+# redis의 ZREVRANGE와 같이 점수가 같으면 먼저 달성한(reverse timestamp가 큰) 유저가, 그 다음은 user id 사전 역순으로 앞에 위치
+# script와 같이 min 정책 리더보드는 점수의 부호를 바꾸어 기록하고 읽을 때 절대값으로 되돌림
+class MemoryBoard:
+    def __init__(self, expire_at: int = None):
+        self.entries = IndexedSkipList()
+        self.users = {}
+        self.version = 0
+        self.expire_at = expire_at
+
+    def find(self, user_id: str):
+        return self.users.get(user_id)
+
+    def store(self, user_id: str, score, timestamp: int):
+        prev = self.users.get(user_id)
+        if prev is not None:
+            self.entries.remove(prev)
+        entry = (score, int(timestamp), user_id)
+        self.users[user_id] = entry
+        self.entries.insert(entry)
+
+    def remove(self, user_id: str):
+        entry = self.users.pop(user_id, None)
+        if entry is not None:
+            self.entries.remove(entry)
+        return entry
+
+    # 1부터 시작하는 순위
+    def rank(self, entry):
+        return len(self.entries) - self.entries.rank(entry) + 1
+
+    # 0부터 시작하는 순위 start ~ stop (stop 포함)의 rank, user_id, score 목록
+    def range(self, start: int, stop: int):
+        size = len(self.entries)
+        entries = reversed(self.entries.slice(size - stop, size - start))
+
+        data = []
+        for rank, (score, _, user_id) in enumerate(entries, start=start+1):
+            data += [rank, user_id, int(abs(score))]
+        return data
+
+
+# script와 같이 각 작업을 lock 안에서 원자적으로 처리, 결과의 점수는 script의 Lua number 변환과 같이 정수
+class MemoryBackend(LeaderboardBackend):
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.boards = {}
+        self.configs = {}
+        self.indexes = {}
+        self.properties = {}
+        self.property_versions = {}
+
+    def board(self, service_id: str, leader_board_id: str, create: bool = False, expire_at: int = None):
+        key = (service_id, leader_board_id)
+        board = self.boards.get(key)
+        if board is not None and board.expire_at is not None and board.expire_at <= time.time():
+            del self.boards[key]
+            board = None
+        if board is None and create:
+            board = self.boards[key] = MemoryBoard(expire_at)
+        return board
+
+    @staticmethod
+    def apply_policy(policy: str, prev_score, score):
+        if prev_score is None:
+            return score
+        next_score = score
+        if policy == "sum":
+            next_score = prev_score + score
+        elif policy == "min":
+            next_score = min(prev_score, score)
+        elif policy != "latest":
+            next_score = max(prev_score, score)
+        return None if next_score == prev_score else next_score
+
+    def store(self, board: MemoryBoard, user_id: str, score, timestamp: int, policy: str):
+        prev = board.find(user_id)
+        next_score = self.apply_policy(policy, abs(prev[0]) if prev else None, score)
+        if next_score is not None:
+            board.store(user_id, next_score * score_sign(policy), timestamp)
+            board.version += 1
+        return prev, next_score is not None
+
+    def register(self, service_id: str, leader_board_id: str, timestamp: int):
+        self.indexes.setdefault(service_id, {}).setdefault(leader_board_id, MAX_TIMESTAMP - int(timestamp))
+
+    def with_properties(self, service_id: str, data: list, fields: list):
+        if fields is None:
+            return data
+
+        joined = []
+        for i in range(0, len(data), 3):
+            joined += [*data[i:(i+3)], self.user_properties(service_id, data[i+1], fields)]
+        return joined
+
+    def user_properties(self, service_id: str, user_id: str, fields: list):
+        stored = self.properties.get((service_id, user_id))
+        if stored is None:
+            return ["none", []]
+        if fields:
+            return ["hash", [stored.get(field) for field in fields]]
+        return ["hash", [value for item in stored.items() for value in item]]
+
+    def board_config(self, service_id: str, leader_board_id: str):
+        return self.configs.get((service_id, leader_board_id)) or {"shards": 1, "windows": [], "policy": DEFAULT_SCORE_POLICY, "offloaded": None}
+
+    def board_versions(self, service_id: str, leader_board_id: str, include_properties):
+        with self.lock:
+            board = self.board(service_id, leader_board_id)
+            versions = [str(self.indexes.get(service_id, {}).get(leader_board_id, 0)), str(board.version if board else 0)]
+            if include_properties:
+                versions.append(str(self.property_versions.get(service_id, 0)))
+            return versions
+
+    def put_score(self, service_id: str, leader_board_id: str, user_id: str, score, timestamp: int, policy: str, windows: list = ()):
+        if score <= 0:
+            return None
+        return self.put_scores(service_id, leader_board_id, [{"userId": user_id, "score": score}], timestamp, policy, windows)[0]
+
+    def put_scores(self, service_id: str, leader_board_id: str, scores: list, timestamp: int, policy: str, windows: list = ()):
+        with self.lock:
+            board = self.board(service_id, leader_board_id, create=True)
+            window_boards = [self.board(service_id, board_id, create=True, expire_at=expire_at) for board_id, expire_at in windows]
+
+            prev_scores = []
+            changed = False
+            for entry in scores:
+                prev = board.find(entry["userId"])
+                if entry["score"] > 0:
+                    _, stored = self.store(board, entry["userId"], entry["score"], timestamp, policy)
+                    changed = changed or stored
+                    for window_board in window_boards:
+                        self.store(window_board, entry["userId"], entry["score"], timestamp, policy)
+                prev_scores.append(int(abs(prev[0])) if prev else 0)
+
+            if changed:
+                self.register(service_id, leader_board_id, timestamp)
+            return prev_scores
+
+    def delete_score(self, service_id: str, leader_board_id: str, user_id: str, windows: list = ()):
+        with self.lock:
+            for board_id, _ in windows:
+                window_board = self.board(service_id, board_id)
+                if window_board is not None and window_board.remove(user_id) is not None:
+                    window_board.version += 1
+
+            board = self.board(service_id, leader_board_id)
+            if board is None or board.remove(user_id) is None:
+                return 0
+
+            board.version += 1
+            if not board.users:
+                self.indexes.get(service_id, {}).pop(leader_board_id, None)
+            return 1
+
+    def get_rank(self, service_id: str, leader_board_id: str, user_id: str, fields: list = None):
+        with self.lock:
+            board = self.board(service_id, leader_board_id)
+            entry = board.find(user_id) if board else None
+            if entry is None:
+                return None
+            return self.with_properties(service_id, [board.rank(entry), user_id, int(abs(entry[0]))], fields)
+
+    def get_ranks(self, service_id: str, leader_board_id: str, user_ids: list, fields: list = None):
+        with self.lock:
+            board = self.board(service_id, leader_board_id)
+            if board is None:
+                return []
+            entries = sorted(entry for entry in (board.find(user_id) for user_id in user_ids) if entry is not None)
+
+            data = []
+            for entry in reversed(entries):
+                data += [board.rank(entry), entry[2], int(abs(entry[0]))]
+            return self.with_properties(service_id, data, fields)
+
+    def get_user_ranks(self, service_id: str, leader_board_ids: list, user_id: str, fields: list = None):
+        with self.lock:
+            ranks = [self.get_rank(service_id, leader_board_id, user_id) for leader_board_id in leader_board_ids]
+            return ranks, self.user_properties(service_id, user_id, fields) if fields is not None else None
+
+    def get_range(self, service_id: str, leader_board_id: str, offset: int, limit: int, fields: list = None):
+        with self.lock:
+            board = self.board(service_id, leader_board_id)
+            if board is None:
+                return []
+            return self.with_properties(service_id, board.range(offset, offset + limit - 1), fields)
+
+    def get_around(self, service_id: str, leader_board_id: str, user_id: str, limit: int, fields: list = None):
+        with self.lock:
+            board = self.board(service_id, leader_board_id)
+            entry = board.find(user_id) if board else None
+            if entry is None:
+                return None
+            rank = board.rank(entry) - 1
+            return self.with_properties(service_id, board.range(max(rank - limit, 0), rank + limit), fields)
+
+    def cardinality(self, service_id: str, leader_board_id: str):
+        with self.lock:
+            board = self.board(service_id, leader_board_id)
+            return len(board.users) if board else 0
+
+    def get_properties(self, service_id: str, user_ids: list, fields: list):
+        with self.lock:
+            return [self.user_properties(service_id, user_id, fields) for user_id in user_ids]
+
+    def put_properties(self, service_id: str, user_id: str, properties: dict):
+        with self.lock:
+            if properties:
+                self.properties[(service_id, user_id)] = encode_properties(properties)
+            else:
+                self.properties.pop((service_id, user_id), None)
+            self.property_versions[service_id] = self.property_versions.get(service_id, 0) + 1
+
+    def list_boards(self, service_id: str, cursor: str, limit: int):
+        with self.lock:
+            index = self.indexes.get(service_id, {})
+            board_ids = sorted(board_id for board_id in index if board_id > cursor)[:limit]
+            boards = [[board_id, index[board_id], self.cardinality(service_id, board_id), 1] for board_id in board_ids]
+            return board_ids[-1] if len(board_ids) == limit else "", boards
+
+
+def create_leaderboard_backend(backend_type: str, redis_client, storage_mode: str):
+    if backend_type == "memory":
+        return MemoryBackend()
+    return RedisBackend(redis_client, storage_mode)
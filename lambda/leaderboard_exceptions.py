@@ -21,3 +21,11 @@ class AccessDeniedException(Exception):
 
     def __str__(self):
         return self.msg
+
+
+class ServiceUnavailableException(Exception):
+    def __init__(self, msg):
+        self.msg = msg
+
+    def __str__(self):
+        return self.msg
@@ -0,0 +1,76 @@
+import os
+
+# cluster mode에서는 하나의 script가 접근하는 서비스 key들이 같은 slot에 위치하도록 service id를 hash tag로 감쌈
+CLUSTER_MODE = os.environ.get('REDIS_CLUSTER_MODE', 'false') == 'true'
+
+
+def service_str(service_id: str):
+    return f'{{{service_id}}}' if CLUSTER_MODE else service_id
+
+
+def leaderboard_str(service_id: str, leader_board_id: str):
+    return f'{service_str(service_id)}:leaderboard:{leader_board_id}'
+
+
+def leaderboard_timestamp_str(service_id: str, leader_board_id: str):
+    return f'{service_str(service_id)}:leaderboard:{leader_board_id}:timestamp'
+
+
+def leaderboard_version_str(service_id: str, leader_board_id: str):
+    return f'{service_str(service_id)}:leaderboard:{leader_board_id}:version'
+
+
+def leaderboard_staging_str(service_id: str, leader_board_id: str):
+    return f'{service_str(service_id)}:leaderboard:{leader_board_id}:staging'
+
+
+def leaderboard_migrating_str(service_id: str, leader_board_id: str):
+    return f'{service_str(service_id)}:leaderboard:{leader_board_id}:migrating'
+
+
+def leaderboard_config_str(service_id: str, leader_board_id: str):
+    return f'{service_str(service_id)}:leaderboard:{leader_board_id}:config'
+
+
+def leaderboard_archive_str(service_id: str, leader_board_id: str):
+    return f'{service_str(service_id)}:leaderboard:{leader_board_id}:archive'
+
+
+# 샤드마다 별도의 hash tag를 가지므로 cluster mode에서 샤드가 여러 node로 분산됨
+def leaderboard_shard_str(service_id: str, leader_board_id: str, shard: int):
+    return f'{{{service_id}:leaderboard:{leader_board_id}:shard:{shard}}}'
+
+
+def leaderboard_shard_timestamp_str(service_id: str, leader_board_id: str, shard: int):
+    return f'{leaderboard_shard_str(service_id, leader_board_id, shard)}:timestamp'
+
+
+def leaderboard_index_str(service_id: str):
+    return f'{service_str(service_id)}:leaderboards'
+
+
+def leaderboard_index_created_str(service_id: str):
+    return f'{service_str(service_id)}:leaderboards:created'
+
+
+# 리더보드별 마지막 조회, 기록 시각 (epoch seconds)
+def leaderboard_index_read_str(service_id: str):
+    return f'{service_str(service_id)}:leaderboards:read'
+
+
+def leaderboard_index_written_str(service_id: str):
+    return f'{service_str(service_id)}:leaderboards:written'
+
+
+def user_properties_key_str(service_id: str, user_id: str):
+    return f'{service_str(service_id)}:user:{user_id}:properties'
+
+
+# 유저 property가 바뀔때마다 증가하는 서비스 단위 version
+def user_properties_version_str(service_id: str):
+    return f'{service_str(service_id)}:users:version'
+
+
+# script 안에서 유저별 property key를 만들기 위한 prefix, suffix
+def user_properties_key_parts(service_id: str):
+    return f'{service_str(service_id)}:user:', ':properties'
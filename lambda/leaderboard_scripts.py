@@ -1,92 +1,691 @@
-# pick specific user's score and rank
-lua_script_get_my_rank = """
-local stored_update_timestamp = redis.call('HGET', KEYS[2], ARGV[1])
+from timestamp import MAX_TIMESTAMP, TIE_BREAK_FACTOR, MAX_ENCODED_SCORE
+from score_histogram import HISTOGRAM_LOG_BASE
+
+# 기록할 수 없는 점수로 script가 반환하는 error의 code, 잘못된 요청으로 응답
+INVALID_SCORE_ERROR = "INVALID_SCORE"
+
+# 리더보드의 저장 방식(layout)에 따라 달라지는 sorted set 접근을 감추는 공통 함수
+#
+# - timestamp : sorted set member가 "{reverse_ts}:{user_id}" 이고, 유저별 reverse_ts를 별도의 hash에 저장
+# - score     : sorted set member가 user_id 이고, score에 "score * TIE_BREAK_FACTOR + reverse_ts" 로 tie-break를 포함
+#
+# timestamp hash가 존재하는 리더보드는 timestamp 방식으로 취급하며, 비어있는 리더보드에 처음 기록할 때에만
+# 요청된 storage_mode를 따릅니다. migration 중인 리더보드의 staging, marker key와 version, histogram key는 리더보드 key에서 파생합니다.
+#
+# min 정책 리더보드는 낮은 점수가 앞에 위치하도록 점수의 부호를 바꾸어 기록합니다. 점수는 항상 양수이므로 읽을 때에는
+# 정책과 관계없이 절대값으로 되돌리며, histogram에는 부호를 바꾸기 전의 점수를 기록합니다.
+lua_board_functions = f"""
+local MAX_TIMESTAMP = {MAX_TIMESTAMP}
+local TIE_BREAK_FACTOR = {TIE_BREAK_FACTOR}
+local MAX_ENCODED_SCORE = {MAX_ENCODED_SCORE}
+local INVALID_SCORE_ERROR = '{INVALID_SCORE_ERROR}'
+local HISTOGRAM_LOG_BASE = {HISTOGRAM_LOG_BASE!r}
+""" + """
+local board_layouts = {}
+
+local function board_layout(leaderboard_id, timestamp_hash_set_id, storage_mode)
+  local layout = board_layouts[leaderboard_id]
+  if layout then
+    return layout
+  end
+
+  if redis.call('EXISTS', timestamp_hash_set_id) == 1 then
+    layout = 'timestamp'
+  elseif storage_mode and redis.call('EXISTS', leaderboard_id) == 0 then
+    layout = storage_mode
+  else
+    layout = 'score'
+  end
+
+  board_layouts[leaderboard_id] = layout
+  return layout
+end
+
+local function board_encode(score, timestamp)
+  return string.format('%.0f', score * TIE_BREAK_FACTOR + tonumber(timestamp))
+end
+
+local function board_decode(member, score, layout)
+  if layout == 'timestamp' then
+    return string.sub(member, string.find(member, ':', 1, true) + 1), math.abs(tonumber(score))
+  end
+  return member, math.abs(math.floor(tonumber(score) / TIE_BREAK_FACTOR))
+end
+
+-- 유저의 sorted set member와 score를 획득, 기록이 없으면 nil
+local function board_find(leaderboard_id, timestamp_hash_set_id, user_id, layout)
+  local member = user_id
+  if layout == 'timestamp' then
+    local stored_update_timestamp = redis.call('HGET', timestamp_hash_set_id, user_id)
+    if not stored_update_timestamp then
+      return nil
+    end
+    member = stored_update_timestamp .. ":" .. user_id
+  end
+
+  local score = redis.call('ZSCORE', leaderboard_id, member)
+  if not score then
+    return nil
+  end
+
+  local _, decoded_score = board_decode(member, score, layout)
+  return member, decoded_score
+end
+
+local function board_store(leaderboard_id, timestamp_hash_set_id, user_id, prev_member, score, timestamp, layout, policy)
+  if policy == 'min' then
+    score = -score
+  end
+
+  if layout == 'timestamp' then
+    if prev_member then
+      redis.call('ZREM', leaderboard_id, prev_member)
+    end
+    redis.call('ZADD', leaderboard_id, score, timestamp .. ":" .. user_id)
+    redis.call('HSET', timestamp_hash_set_id, user_id, timestamp)
+
+    -- migration 중에는 변경 내용을 staging 리더보드에도 반영
+    if redis.call('EXISTS', leaderboard_id .. ':migrating') == 1 then
+      redis.call('ZADD', leaderboard_id .. ':staging', board_encode(score, timestamp), user_id)
+    end
+  else
+    redis.call('ZADD', leaderboard_id, board_encode(score, timestamp), user_id)
+  end
+end
+
+local function board_remove(leaderboard_id, timestamp_hash_set_id, user_id, member, layout)
+  redis.call('ZREM', leaderboard_id, member)
+  if layout == 'timestamp' then
+    redis.call('HDEL', timestamp_hash_set_id, user_id)
+
+    if redis.call('EXISTS', leaderboard_id .. ':migrating') == 1 then
+      redis.call('ZREM', leaderboard_id .. ':staging', user_id)
+    end
+  end
+end
+
+-- 유저의 점수가 from_score에서 to_score로 바뀐 것을 점수 분포 histogram에 반영 (기록이 없던 유저, 삭제된 유저는 nil)
+local function histogram_move(leaderboard_id, from_score, to_score)
+  local histogram_id = leaderboard_id .. ':histogram'
+  if from_score then
+    local bucket = math.floor(math.log(from_score) / HISTOGRAM_LOG_BASE)
+    if redis.call('HINCRBY', histogram_id, bucket, -1) <= 0 then
+      redis.call('HDEL', histogram_id, bucket)
+    end
+  end
+  if to_score then
+    redis.call('HINCRBY', histogram_id, math.floor(math.log(to_score) / HISTOGRAM_LOG_BASE), 1)
+  end
+end
+
+-- 리더보드 내용이 바뀔때마다 증가하는 version, 조회 결과 cache의 무효화에 사용
+-- version과 index는 리더보드 단위로 관리하므로 index key 없이 호출되는 샤드에서는 생략
+local function board_touch(leaderboard_id, index_id)
+  if index_id then
+    redis.call('INCR', leaderboard_id .. ':version')
+  end
+end
+
+-- 서비스별 리더보드 index에 리더보드를 등록, 이미 등록된 경우 생성 시각은 유지
+local function board_register(index_id, leader_board_id, timestamp)
+  if index_id and redis.call('ZADD', index_id, 'NX', 0, leader_board_id) == 1 then
+    redis.call('HSET', index_id .. ':created', leader_board_id, MAX_TIMESTAMP - tonumber(timestamp))
+  end
+end
+
+-- 비어있는 리더보드를 index에서 제거
+local function board_unregister(index_id, leaderboard_id, leader_board_id)
+  if index_id and redis.call('EXISTS', leaderboard_id) == 0 then
+    redis.call('ZREM', index_id, leader_board_id)
+    redis.call('HDEL', index_id .. ':created', leader_board_id)
+  end
+end
+
+-- 리더보드의 점수 반영 정책(max, min, sum, latest)에 따라 기록된 점수(기록이 없으면 nil)에 요청된 점수를 반영한 점수를 반환
+-- 점수가 바뀌지 않으면 nil
+local function policy_apply(policy, prev_score, score)
+  if not prev_score then
+    return score
+  end
+
+  local next_score = score
+  if policy == 'sum' then
+    next_score = prev_score + score
+  elseif policy == 'min' then
+    next_score = math.min(prev_score, score)
+  elseif policy ~= 'latest' then
+    next_score = math.max(prev_score, score)
+  end
+
+  if next_score == prev_score then
+    return nil
+  end
+  return next_score
+end
+
+-- score 방식은 score에 tie-break를 함께 기록하므로 표현 가능한 정수 범위의 점수만 기록할 수 있음
+-- args[first] 부터의 유저, 점수 목록을 정책에 따라 반영한 점수가 범위를 벗어나면 error reply를 반환하며,
+-- 기록하기 전에 모든 대상 리더보드를 확인하여 일부만 기록되지 않도록 함. 같은 유저가 반복되면 앞의 점수에 이어서 계산
+local function board_check_scores(leaderboard_id, timestamp_hash_set_id, layout, policy, args, first)
+  if layout ~= 'score' then
+    return nil
+  end
 
-if not stored_update_timestamp then
+  local planned = {}
+  for i=first,#args,2 do
+    local user_id, new_score = args[i], tonumber(args[i+1])
+    if new_score > 0 then
+      local prev_score = planned[user_id]
+      if prev_score == nil then
+        local _, stored_score = board_find(leaderboard_id, timestamp_hash_set_id, user_id, layout)
+        prev_score = stored_score or false
+      end
+
+      local score = policy_apply(policy, prev_score or nil, new_score) or prev_score
+      if score ~= math.floor(score) or score > MAX_ENCODED_SCORE then
+        return redis.error_reply(INVALID_SCORE_ERROR .. ' score of ' .. user_id .. ' must be integer value not greater than ' .. MAX_ENCODED_SCORE)
+      end
+      planned[user_id] = score
+    end
+  end
   return nil
 end
 
-local rank = redis.call('ZREVRANK', KEYS[1], stored_update_timestamp .. ":" .. ARGV[1])
-if not rank then
+-- 기간별 리더보드에 기간 안의 점수를 정책에 따라 기록하고, 기간이 끝난 뒤 expire_at 시각에 만료되도록 설정
+local function window_store(leaderboard_id, timestamp_hash_set_id, user_id, new_score, timestamp, storage_mode, expire_at, policy)
+  local layout = board_layout(leaderboard_id, timestamp_hash_set_id, storage_mode)
+  local member, prev_score = board_find(leaderboard_id, timestamp_hash_set_id, user_id, layout)
+  local score = policy_apply(policy, prev_score, new_score)
+  if not score then
+    return
+  end
+
+  board_store(leaderboard_id, timestamp_hash_set_id, user_id, member, score, timestamp, layout, policy)
+  histogram_move(leaderboard_id, prev_score, score)
+  redis.call('INCR', leaderboard_id .. ':version')
+  redis.call('EXPIREAT', leaderboard_id, expire_at)
+  redis.call('EXPIREAT', leaderboard_id .. ':version', expire_at)
+  redis.call('EXPIREAT', leaderboard_id .. ':histogram', expire_at)
+  if layout == 'timestamp' then
+    redis.call('EXPIREAT', timestamp_hash_set_id, expire_at)
+  end
+end
+
+local function window_remove(leaderboard_id, timestamp_hash_set_id, user_id)
+  local layout = board_layout(leaderboard_id, timestamp_hash_set_id)
+  local member, prev_score = board_find(leaderboard_id, timestamp_hash_set_id, user_id, layout)
+  if member then
+    board_remove(leaderboard_id, timestamp_hash_set_id, user_id, member, layout)
+    histogram_move(leaderboard_id, prev_score, nil)
+    redis.call('INCR', leaderboard_id .. ':version')
+  end
+end
+
+local function board_range(leaderboard_id, layout, start, stop, first_rank)
+  local range = redis.call('ZREVRANGE', leaderboard_id, start, stop, 'WITHSCORES')
+
+  local data = {}
+  for i=1,#range,2 do
+    local user_id, score = board_decode(range[i], range[i+1], layout)
+    data[#data+1] = first_rank + (i-1)/2
+    data[#data+1] = user_id
+    data[#data+1] = score
+  end
+
+  return data
+end
+"""
+
+
+# 유저 property는 field마다 json으로 인코딩된 값을 가지는 hash로 저장
+# 이전 방식으로 저장된 json 문자열 property도 함께 지원하기 위해 key type과 값 목록을 반환
+lua_property_functions = """
+local function user_properties(properties_key, fields)
+  local key_type = redis.call('TYPE', properties_key).ok
+  if key_type == 'hash' then
+    if #fields > 0 then
+      return {key_type, redis.call('HMGET', properties_key, unpack(fields))}
+    end
+    return {key_type, redis.call('HGETALL', properties_key)}
+  elseif key_type == 'string' then
+    return {key_type, {redis.call('GET', properties_key)}}
+  end
+  return {'none', {}}
+end
+
+-- rank, user_id, score 목록의 각 유저 뒤에 property를 덧붙임, properties_prefix가 비어있으면 그대로 반환
+-- property key는 properties_prefix .. user_id .. properties_suffix 형태
+local function join_properties(data, properties_prefix, properties_suffix, fields)
+  if properties_prefix == nil or properties_prefix == '' then
+    return data
+  end
+
+  local joined = {}
+  for i=1,#data,3 do
+    joined[#joined+1] = data[i]
+    joined[#joined+1] = data[i+1]
+    joined[#joined+1] = data[i+2]
+    joined[#joined+1] = user_properties(properties_prefix .. data[i+1] .. properties_suffix, fields)
+  end
+
+  return joined
+end
+"""
+
+
+lua_script_get_properties = lua_property_functions + """
+local data = {}
+for i=1,#KEYS do
+  data[i] = user_properties(KEYS[i], ARGV)
+end
+
+return data
+"""
+
+# pick specific user's score and rank
+lua_script_get_my_rank = lua_board_functions + lua_property_functions + """
+local layout = board_layout(KEYS[1], KEYS[2])
+local member, score = board_find(KEYS[1], KEYS[2], ARGV[1], layout)
+
+if not member then
   -- Key or member not found
   return nil
 end
 
-local score = redis.call('ZSCORE', KEYS[1], stored_update_timestamp .. ":" .. ARGV[1])
-return {rank+1, ARGV[1], tonumber(score)}
+local rank = redis.call('ZREVRANK', KEYS[1], member)
+return join_properties({rank+1, ARGV[1], score}, ARGV[2], ARGV[3], {unpack(ARGV, 4)})
 """
 
 
-lua_script_get_around = """
-local stored_update_timestamp = redis.call('HGET', KEYS[2], ARGV[1])
+# 여러 리더보드에서 한 유저의 순위와 점수를 조회, KEYS는 리더보드마다 (sorted set, timestamp hash) 쌍
+# 리더보드 순서대로 rank, score를 반환하며 기록이 없는 리더보드는 rank 0, property는 한번만 조회하여 마지막에 덧붙임
+lua_script_get_user_ranks = lua_board_functions + lua_property_functions + """
+local user_id = ARGV[1]
+local data = {}
 
-if not stored_update_timestamp then
-  return nil
+for i=1,#KEYS,2 do
+  local layout = board_layout(KEYS[i], KEYS[i+1])
+  local member, score = board_find(KEYS[i], KEYS[i+1], user_id, layout)
+  if member then
+    data[#data+1] = redis.call('ZREVRANK', KEYS[i], member) + 1
+    data[#data+1] = score
+  else
+    data[#data+1] = 0
+    data[#data+1] = 0
+  end
+end
+
+if ARGV[2] ~= '' then
+  data[#data+1] = user_properties(ARGV[2] .. user_id .. ARGV[3], {unpack(ARGV, 4)})
+end
+return data
+"""
+
+
+# 한 리더보드에서 여러 유저의 순위와 점수를 조회하여 전체 순위 순서로 rank, user_id, score 목록을 반환, 기록이 없는 유저는 제외
+# ARGV[1] 개의 user id 뒤에 property 조회 인자, timestamp 방식은 유저들의 timestamp를 한번의 HMGET으로 조회
+lua_script_get_users_rank = lua_board_functions + lua_property_functions + """
+local user_count = tonumber(ARGV[1])
+local layout = board_layout(KEYS[1], KEYS[2])
+
+local user_ids, members = {}, {}
+for i=1,user_count do
+  user_ids[i] = ARGV[i+1]
+  members[i] = ARGV[i+1]
+end
+
+if layout == 'timestamp' then
+  local timestamps = redis.call('HMGET', KEYS[2], unpack(user_ids))
+  for i=1,user_count do
+    members[i] = timestamps[i] and (timestamps[i] .. ":" .. user_ids[i])
+  end
 end
 
-local rank = redis.call('ZREVRANK', KEYS[1], stored_update_timestamp .. ":" .. ARGV[1])
-if not rank then
+local entries = {}
+for i=1,user_count do
+  local score = members[i] and redis.call('ZSCORE', KEYS[1], members[i])
+  if score then
+    entries[#entries+1] = {redis.call('ZREVRANK', KEYS[1], members[i]), members[i], score}
+  end
+end
+table.sort(entries, function(a, b) return a[1] < b[1] end)
+
+local data = {}
+for _, entry in ipairs(entries) do
+  local user_id, score = board_decode(entry[2], entry[3], layout)
+  data[#data+1] = entry[1] + 1
+  data[#data+1] = user_id
+  data[#data+1] = score
+end
+return join_properties(data, ARGV[user_count+2], ARGV[user_count+3], {unpack(ARGV, user_count+4)})
+"""
+
+lua_script_get_top = lua_board_functions + lua_property_functions + """
+local offset, limit = tonumber(ARGV[1]), tonumber(ARGV[2])
+local layout = board_layout(KEYS[1], KEYS[2])
+
+local data = board_range(KEYS[1], layout, offset, offset+limit-1, offset+1)
+return join_properties(data, ARGV[3], ARGV[4], {unpack(ARGV, 5)})
+"""
+
+
+lua_script_get_around = lua_board_functions + lua_property_functions + """
+local layout = board_layout(KEYS[1], KEYS[2])
+local member = board_find(KEYS[1], KEYS[2], ARGV[1], layout)
+
+if not member then
   -- Key or member not found
   return nil
 end
 
+local rank = redis.call('ZREVRANK', KEYS[1], member)
+
 local r1, r2 = rank-ARGV[2], rank+ARGV[2]
 if r1 < 0 then
   r1 = 0
 end
 
-local member, score
-local range = redis.call('ZREVRANGE', KEYS[1], r1, r2, 'WITHSCORES')
+local data = board_range(KEYS[1], layout, r1, r2, r1+1)
+return join_properties(data, ARGV[3], ARGV[4], {unpack(ARGV, 5)})
+"""
+
+
+lua_script_put_score = lua_board_functions + """
+local leaderboard_id, timestamp_hash_set_id, index_id = KEYS[1], KEYS[2], KEYS[3]
+local user_id, new_score, timestamp, storage_mode, leader_board_id, policy = ARGV[1], tonumber(ARGV[2]), ARGV[3], ARGV[4], ARGV[5], ARGV[6]
+
+if new_score <= 0 then
+  return
+end
+
+local layout = board_layout(leaderboard_id, timestamp_hash_set_id, storage_mode)
+local invalid = board_check_scores(leaderboard_id, timestamp_hash_set_id, layout, policy, {user_id, new_score}, 1)
+for i=4,#KEYS,2 do
+  invalid = invalid or board_check_scores(KEYS[i], KEYS[i+1], board_layout(KEYS[i], KEYS[i+1], storage_mode), policy, {user_id, new_score}, 1)
+end
+if invalid then
+  return invalid
+end
+
+local member, prev_score = board_find(leaderboard_id, timestamp_hash_set_id, user_id, layout)
+local score = policy_apply(policy, prev_score, new_score)
+
+if score then
+  board_store(leaderboard_id, timestamp_hash_set_id, user_id, member, score, timestamp, layout, policy)
+  histogram_move(leaderboard_id, prev_score, score)
+  board_touch(leaderboard_id, index_id)
+  board_register(index_id, leader_board_id, timestamp)
+end
+
+-- KEYS[4] 부터는 기간별 리더보드 key, timestamp hash 쌍이고 ARGV[7] 부터 각각의 만료 시각
+for i=4,#KEYS,2 do
+  window_store(KEYS[i], KEYS[i+1], user_id, new_score, timestamp, storage_mode, ARGV[7 + (i-4)/2], policy)
+end
+
+return prev_score or 0
+"""
+
+lua_script_put_scores = lua_board_functions + """
+local leaderboard_id, timestamp_hash_set_id, index_id = KEYS[1], KEYS[2], KEYS[3]
+local timestamp, storage_mode, leader_board_id, policy, window_count = ARGV[1], ARGV[2], ARGV[3], ARGV[4], tonumber(ARGV[5])
+local layout = board_layout(leaderboard_id, timestamp_hash_set_id, storage_mode)
+
+-- KEYS[4] 부터는 기간별 리더보드 key, timestamp hash 쌍이고 ARGV[6] 부터 window_count 개의 만료 시각, 이후 유저별 점수
+local invalid = board_check_scores(leaderboard_id, timestamp_hash_set_id, layout, policy, ARGV, 6+window_count)
+for w=1,window_count do
+  invalid = invalid or board_check_scores(KEYS[2+w*2], KEYS[3+w*2], board_layout(KEYS[2+w*2], KEYS[3+w*2], storage_mode), policy, ARGV, 6+window_count)
+end
+if invalid then
+  return invalid
+end
+
+local prev_scores = {}
+local changed = false
+for i=6+window_count,#ARGV,2 do
+  local user_id, new_score = ARGV[i], tonumber(ARGV[i+1])
+  local member, prev_score = board_find(leaderboard_id, timestamp_hash_set_id, user_id, layout)
+
+  if new_score > 0 then
+    local score = policy_apply(policy, prev_score, new_score)
+    if score then
+      board_store(leaderboard_id, timestamp_hash_set_id, user_id, member, score, timestamp, layout, policy)
+      histogram_move(leaderboard_id, prev_score, score)
+      changed = true
+    end
+
+    for w=1,window_count do
+      window_store(KEYS[2+w*2], KEYS[3+w*2], user_id, new_score, timestamp, storage_mode, ARGV[5+w], policy)
+    end
+  end
+
+  prev_scores[#prev_scores+1] = prev_score or 0
+end
+
+if changed then
+  board_touch(leaderboard_id, index_id)
+  board_register(index_id, leader_board_id, timestamp)
+end
+
+return prev_scores
+"""
+
+# 점수 목록을 기록하지 않고 기록할 수 있는지만 확인, 여러 샤드에 나누어 기록하는 합산 점수를 기록 전에 확인하는 데 사용
+lua_script_check_scores = lua_board_functions + """
+local layout = board_layout(KEYS[1], KEYS[2], ARGV[1])
+return board_check_scores(KEYS[1], KEYS[2], layout, ARGV[2], ARGV, 3) or 0
+"""
+
+lua_script_delete_score = lua_board_functions + """
+local leaderboard_id, timestamp_hash_set_id, index_id = KEYS[1], KEYS[2], KEYS[3]
+local user_id, leader_board_id = ARGV[1], ARGV[2]
+local layout = board_layout(leaderboard_id, timestamp_hash_set_id)
+local member, prev_score = board_find(leaderboard_id, timestamp_hash_set_id, user_id, layout)
+
+for i=4,#KEYS,2 do
+  window_remove(KEYS[i], KEYS[i+1], user_id)
+end
+
+if member then
+  board_remove(leaderboard_id, timestamp_hash_set_id, user_id, member, layout)
+  histogram_move(leaderboard_id, prev_score, nil)
+  board_touch(leaderboard_id, index_id)
+  board_unregister(index_id, leaderboard_id, leader_board_id)
+  return 1
+end
+
+return 0
+"""
+
+# 유저의 점수와 리더보드의 점수 분포 histogram을 반환, 점수는 정수로 변환되지 않도록 문자열로 반환
+lua_script_get_percentile = lua_board_functions + """
+local layout = board_layout(KEYS[1], KEYS[2])
+local member, score = board_find(KEYS[1], KEYS[2], ARGV[1], layout)
+
+if not member then
+  return nil
+end
+
+return {tostring(score), redis.call('HGETALL', KEYS[1] .. ':histogram')}
+"""
+
+# 서비스의 리더보드 index를 cursor 이후부터 limit 개 만큼 조회
+# 리더보드마다 id, 생성 시각, cardinality, 샤드 수를 반환하고 다음 페이지가 없으면 cursor로 빈 문자열을 반환
+# 샤드로 나누어진 리더보드의 cardinality는 호출하는 쪽에서 샤드별로 합산
+lua_script_list_boards = """
+local index_id = KEYS[1]
+local cursor, limit, leaderboard_prefix = ARGV[1], tonumber(ARGV[2]), ARGV[3]
+
+local start = '-'
+if cursor ~= '' then
+  start = '(' .. cursor
+end
+
+local boards = redis.call('ZRANGEBYLEX', index_id, start, '+', 'LIMIT', 0, limit)
 
 local data = {}
-for i=r1,(r1+#range/2)-1 do
-  data[#data+1] = i+1
-  data[#data+1] = range[((i-r1)*2)+1]
-  data[#data+1] = tonumber(range[((i-r1)*2)+2])
+for i=1,#boards do
+  data[#data+1] = boards[i]
+  data[#data+1] = tonumber(redis.call('HGET', index_id .. ':created', boards[i])) or 0
+  data[#data+1] = redis.call('ZCARD', leaderboard_prefix .. boards[i])
+  data[#data+1] = tonumber(redis.call('HGET', leaderboard_prefix .. boards[i] .. ':config', 'shards')) or 1
 end
 
-return data
+local next_cursor = ''
+if #boards == limit then
+  next_cursor = boards[#boards]
+end
+
+return {next_cursor, data}
 """
 
+# sorted set에 member가 없는 timestamp hash 항목(이전 버전의 점수 삭제가 남긴 항목)을 제거
+# ARGV는 HSCAN으로 읽은 (user id, timestamp) 쌍이며, 그 사이에 점수가 갱신된 유저는 timestamp가 달라지므로 제거하지 않음
+lua_script_remove_orphan_timestamps = """
+local leaderboard_id, timestamp_hash_set_id = KEYS[1], KEYS[2]
+local removed = 0
+
+for i=1,#ARGV,2 do
+  local user_id, stored_update_timestamp = ARGV[i], ARGV[i+1]
+  if redis.call('HGET', timestamp_hash_set_id, user_id) == stored_update_timestamp and
+     not redis.call('ZSCORE', leaderboard_id, stored_update_timestamp .. ":" .. user_id) then
+    redis.call('HDEL', timestamp_hash_set_id, user_id)
+    removed = removed + 1
+  end
+end
+
+return removed
+"""
 
-lua_script_put_score = """
+# timestamp 방식 리더보드의 유저 목록 일부를 score 방식의 staging 리더보드로 복사
+# timestamp hash에서 사라진 유저는 staging 리더보드에서도 제거하고, sorted set member가 없는 timestamp hash 항목
+# (이전 버전의 점수 삭제가 남긴 항목)은 함께 제거
+lua_script_migrate_chunk = lua_board_functions + """
 local leaderboard_id, timestamp_hash_set_id = KEYS[1], KEYS[2]
-local user_id, new_score, timestamp = ARGV[1], tonumber(ARGV[2]), ARGV[3]
-local stored_update_timestamp = redis.call('HGET', timestamp_hash_set_id, user_id)
+local staging_id = leaderboard_id .. ':staging'
 
-if new_score <= 0 then
-  return
+if redis.call('EXISTS', leaderboard_id .. ':migrating') == 0 then
+  return redis.error_reply('migration is not in progress')
 end
 
-local prev_score
-if stored_update_timestamp then
-  prev_score = redis.call('ZSCORE', leaderboard_id, stored_update_timestamp .. ":" .. user_id)
+for i=1,#ARGV do
+  local user_id = ARGV[i]
+  local stored_update_timestamp = redis.call('HGET', timestamp_hash_set_id, user_id)
+  local score
+  if stored_update_timestamp then
+    score = redis.call('ZSCORE', leaderboard_id, stored_update_timestamp .. ":" .. user_id)
+  end
+
+  if score then
+    score = tonumber(score)
+    if score ~= math.floor(score) or math.abs(score) > MAX_ENCODED_SCORE then
+      return redis.error_reply('score of ' .. user_id .. ' can not be encoded: ' .. score)
+    end
+    redis.call('ZADD', staging_id, board_encode(score, stored_update_timestamp), user_id)
+  else
+    if stored_update_timestamp then
+      redis.call('HDEL', timestamp_hash_set_id, user_id)
+    end
+    redis.call('ZREM', staging_id, user_id)
+  end
 end
 
-if not prev_score then
-  prev_score = 0
+return #ARGV
+"""
+
+# staging 리더보드로 원본을 교체하고 timestamp hash를 제거, 유저 수가 원본 리더보드와 일치하지 않으면 0을 반환
+# 기간별 리더보드처럼 만료 시각이 있는 리더보드는 교체한 리더보드에도 같은 만료 시각을 설정
+lua_script_migrate_swap = """
+local leaderboard_id, timestamp_hash_set_id = KEYS[1], KEYS[2]
+local staging_id, marker_id = leaderboard_id .. ':staging', leaderboard_id .. ':migrating'
+
+if redis.call('EXISTS', marker_id) == 0 then
+  return redis.error_reply('migration is not in progress')
 end
 
-prev_score = tonumber(prev_score)
+if redis.call('ZCARD', staging_id) ~= redis.call('ZCARD', leaderboard_id) then
+  return 0
+end
 
-if new_score > prev_score then
-  if prev_score > 0 and stored_update_timestamp then
-    redis.call('ZREM', leaderboard_id, stored_update_timestamp .. ":" .. user_id)
+local ttl = redis.call('PTTL', leaderboard_id)
+
+-- RENAME의 암묵적인 삭제로 redis가 block되지 않도록 기존 key는 UNLINK로 제거
+redis.call('UNLINK', leaderboard_id, timestamp_hash_set_id)
+if redis.call('EXISTS', staging_id) == 1 then
+  redis.call('RENAME', staging_id, leaderboard_id)
+  if ttl > 0 then
+    redis.call('PEXPIRE', leaderboard_id, ttl)
   end
-  redis.call('ZADD', leaderboard_id, new_score, timestamp .. ":" .. user_id)
-  redis.call('HSET', timestamp_hash_set_id, user_id, timestamp)
 end
+redis.call('DEL', marker_id)
 
-return prev_score
+return 1
 """
 
-lua_script_delete_score = """
-local leaderboard_id, timestamp_hash_set_id = KEYS[1], KEYS[2]
-local user_id = ARGV[1]
-local stored_update_timestamp = redis.call('HGET', timestamp_hash_set_id, user_id)
+# backup chunk의 sorted set 항목(member, score 쌍)을 import 임시 key에 기록, ARGV[1]은 저장 방식
+# export는 snapshot이 아니므로 ZSCAN이 같은 항목을 여러번 반환하거나, 그 사이에 갱신된 timestamp 방식 유저의 이전, 이후 member가
+# 함께 포함될 수 있음. 유저마다 reverse timestamp가 가장 큰 항목 하나만 남기고 timestamp hash는 남긴 항목으로 기록
+# histogram 계산을 위해 추가된 점수와 제거된 점수 목록을 정수로 변환되지 않도록 문자열로 반환
+lua_script_import_entries = lua_board_functions + """
+local leaderboard_id, timestamp_hash_set_id, layout = KEYS[1], KEYS[2], ARGV[1]
 
-if stored_update_timestamp then
-  redis.call('ZREM', leaderboard_id, stored_update_timestamp .. ":" .. user_id)
-  redis.call('HDEL', leaderboard_id, timestamp_hash_set_id)
+local function entry_timestamp(member, score)
+  if layout == 'timestamp' then
+    return tonumber(string.sub(member, 1, string.find(member, ':', 1, true) - 1))
+  end
+  local encoded = tonumber(score)
+  return encoded - math.floor(encoded / TIE_BREAK_FACTOR) * TIE_BREAK_FACTOR
+end
+
+local added, removed = {}, {}
+for i=2,#ARGV,2 do
+  local member, score = ARGV[i], ARGV[i+1]
+  local user_id, decoded_score = board_decode(member, score, layout)
+  local prev_member, prev_score = board_find(leaderboard_id, timestamp_hash_set_id, user_id, layout)
+
+  if not prev_member or entry_timestamp(member, score) > entry_timestamp(prev_member, redis.call('ZSCORE', leaderboard_id, prev_member)) then
+    if prev_member then
+      redis.call('ZREM', leaderboard_id, prev_member)
+      removed[#removed+1] = tostring(prev_score)
+    end
+    redis.call('ZADD', leaderboard_id, score, member)
+    if layout == 'timestamp' then
+      redis.call('HSET', timestamp_hash_set_id, user_id, string.sub(member, 1, string.find(member, ':', 1, true) - 1))
+    end
+    added[#added+1] = tostring(decoded_score)
+  end
 end
+
+return {added, removed}
+"""
+
+# import 임시 key(KEYS의 홀수 번째)로 리더보드 key(짝수 번째)를 교체, 임시 key가 없으면 리더보드 key만 제거
+# RENAME의 암묵적인 삭제로 redis가 block되지 않도록 기존 key는 같은 script 안에서 UNLINK로 먼저 제거
+lua_script_import_swap = """
+for i=1,#KEYS,2 do
+  redis.call('UNLINK', KEYS[i+1])
+  if redis.call('EXISTS', KEYS[i]) == 1 then
+    redis.call('RENAME', KEYS[i], KEYS[i+1])
+  end
+end
+
+return 1
+"""
+
+# 외부 저장소에 export 한 리더보드를 redis에서 제거하고 설정에 backup 경로를 기록
+# export 하는 동안 리더보드가 바뀌었으면(version이 다르면) 제거하지 않고 0을 반환
+lua_script_offload_board = """
+local version_id, config_id = KEYS[1], KEYS[2]
+local version, backup, offloaded_at, members = ARGV[1], ARGV[2], ARGV[3], ARGV[4]
+
+if (redis.call('GET', version_id) or '') ~= version then
+  return 0
+end
+
+for i=3,#KEYS do
+  redis.call('UNLINK', KEYS[i])
+end
+redis.call('HSET', config_id, 'offloaded', backup, 'offloadedAt', offloaded_at, 'offloadedMembers', members)
+redis.call('INCR', version_id)
+
+return 1
 """
@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import random
+import threading
+from functools import wraps
+
+# CloudWatch embedded metric format(EMF) 로그로 metric을 기록
+#
+# API 요청마다 route, 전체 처리 시간, redis 명령 수/왕복 수/시간, json 변환 시간, 응답 크기, cold start 여부를 측정하여
+# METRICS_SAMPLE_RATE 비율의 요청만 metric 로그로 기록하고, SLOW_REQUEST_MS 보다 오래 걸린 요청은 sampling과 관계없이
+# 요청 파라미터를 포함한 slow log를 남깁니다.
+METRICS_NAMESPACE = "LeaderBoard"
+METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', 1))
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 0))
+
+# lambda container는 한번에 하나의 요청만 처리하지만, 여러 thread에서 handler를 호출하는 benchmark에서도 요청별로 측정되도록 thread별로 기록
+_current = threading.local()
+_cold_start = True
+
+
+# metrics는 {이름: (값, 단위)}, dimensions와 properties는 metric과 함께 기록할 {이름: 값}
+def emit_metrics(metrics: dict, dimensions: dict = None, properties: dict = None):
+    dimensions = dimensions or {}
+    print(json.dumps({
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": [list(dimensions)],
+                "Metrics": [{"Name": name, "Unit": unit} for name, (_, unit) in metrics.items()]
+            }]
+        },
+        **dimensions,
+        **(properties or {}),
+        **{name: value for name, (value, _) in metrics.items()}
+    }))
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.route = "unknown"
+        self.redis_seconds = 0.0
+        self.redis_commands = 0
+        self.redis_round_trips = 0
+        self.json_seconds = 0.0
+
+
+def current_request():
+    return getattr(_current, "request", None)
+
+
+def start_request():
+    _current.request = RequestMetrics()
+
+
+def record_redis(seconds: float, commands: int):
+    request = current_request()
+    if request is not None:
+        request.redis_seconds += seconds
+        request.redis_commands += commands
+        request.redis_round_trips += 1
+
+
+def record_json(seconds: float):
+    request = current_request()
+    if request is not None:
+        request.json_seconds += seconds
+
+
+# route 함수의 이름을 metric의 Route dimension으로 기록
+def named_route(func):
+    @wraps(func)
+    def inner(*args, **kwargs):
+        request = current_request()
+        if request is not None:
+            request.route = func.__name__
+        return func(*args, **kwargs)
+    return inner
+
+
+def finish_request(event, response):
+    global _cold_start
+    request = current_request()
+    _current.request = None
+    if request is None:
+        return
+
+    cold_start, _cold_start = _cold_start, False
+    elapsed_ms = (time.perf_counter() - request.started) * 1000
+    status_code = str((response or {}).get("statusCode", "200"))
+    response_size = len((response or {}).get("body") or "")
+
+    if random.random() < METRICS_SAMPLE_RATE:
+        emit_metrics({
+            "Latency": (round(elapsed_ms, 3), "Milliseconds"),
+            "RedisTime": (round(request.redis_seconds * 1000, 3), "Milliseconds"),
+            "RedisCommands": (request.redis_commands, "Count"),
+            "RedisRoundTrips": (request.redis_round_trips, "Count"),
+            "JsonTime": (round(request.json_seconds * 1000, 3), "Milliseconds"),
+            "ResponseSize": (response_size, "Bytes"),
+            "ColdStart": (int(cold_start), "Count")
+        }, dimensions={"Route": request.route}, properties={"StatusCode": status_code})
+
+    if 0 < SLOW_REQUEST_MS <= elapsed_ms:
+        print(json.dumps({
+            "slowRequest": {
+                "route": request.route,
+                "method": event.get("httpMethod"),
+                "path": event.get("path"),
+                "query": event.get("queryStringParameters"),
+                "bodySize": len(event.get("body") or ""),
+                "statusCode": status_code,
+                "latencyMs": round(elapsed_ms, 3),
+                "redisMs": round(request.redis_seconds * 1000, 3),
+                "redisCommands": request.redis_commands,
+                "redisRoundTrips": request.redis_round_trips,
+                "coldStart": cold_start
+            }
+        }))
+
+
+# redis client의 명령 실행과 pipeline 실행 시간을 현재 요청의 metric으로 기록하도록 client를 감쌈
+def instrument_redis(redis_client):
+    execute_command = redis_client.execute_command
+    create_pipeline = redis_client.pipeline
+
+    def timed_execute_command(*args, **options):
+        started = time.perf_counter()
+        try:
+            return execute_command(*args, **options)
+        finally:
+            record_redis(time.perf_counter() - started, 1)
+
+    def timed_pipeline(*args, **kwargs):
+        pipe = create_pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        def timed_execute(*execute_args, **execute_kwargs):
+            commands = len(pipe.command_stack)
+            started = time.perf_counter()
+            try:
+                return execute(*execute_args, **execute_kwargs)
+            finally:
+                record_redis(time.perf_counter() - started, commands)
+
+        pipe.execute = timed_execute
+        return pipe
+
+    redis_client.execute_command = timed_execute_command
+    redis_client.pipeline = timed_pipeline
+    return redis_client
+
+
+def json_loads(text: str):
+    started = time.perf_counter()
+    try:
+        return json.loads(text)
+    finally:
+        record_json(time.perf_counter() - started)
+
+
+# router가 응답 body를 json으로 변환하는 시간을 기록
+class TimedJSONEncoder(json.JSONEncoder):
+    def encode(self, o):
+        started = time.perf_counter()
+        try:
+            return super().encode(o)
+        finally:
+            record_json(time.perf_counter() - started)
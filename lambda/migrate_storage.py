@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# timestamp 방식으로 저장된 리더보드를 score 방식으로 변환하는 migration 명령
+#
+# 리더보드의 timestamp hash를 HSCAN으로 나누어 읽으면서 짧은 script 호출 단위로 staging 리더보드에 복사하므로
+# redis를 오래 block하지 않고 서비스 중에 실행할 수 있습니다. migration이 진행되는 동안의 점수 갱신/삭제는
+# put/delete script가 staging 리더보드에도 반영하고, 복사가 끝나면 하나의 script로 원본을 교체합니다.
+#
+#   $ python migrate_storage.py --host <redis-host> --service <serviceId> [--board <leaderBoardId>]
+import argparse
+import time
+import redis
+from leaderboard_keys import leaderboard_str, leaderboard_timestamp_str, leaderboard_staging_str, leaderboard_migrating_str
+from leaderboard_scripts import lua_script_migrate_chunk, lua_script_migrate_swap
+from script_registry import ScriptRegistry
+
+migration_registry = ScriptRegistry()
+script_migrate_chunk = migration_registry.register(lua_script_migrate_chunk)
+script_migrate_swap = migration_registry.register(lua_script_migrate_swap)
+
+MAX_SWAP_ATTEMPTS = 3
+
+
+def find_timestamp_boards(redis_client, service_id: str):
+    prefix = leaderboard_str(service_id, '')
+    for key in redis_client.scan_iter(match=leaderboard_timestamp_str(service_id, '*'), count=1000):
+        yield key[len(prefix):-len(':timestamp')]
+
+
+def copy_chunks(redis_client, keys, member_iter, chunk_size: int, interval: float):
+    copied = 0
+    chunk = []
+    for member in member_iter:
+        chunk.append(member)
+        if len(chunk) >= chunk_size:
+            copied += script_migrate_chunk(redis_client, keys=keys, args=chunk)
+            chunk = []
+            time.sleep(interval)
+
+    if chunk:
+        copied += script_migrate_chunk(redis_client, keys=keys, args=chunk)
+
+    return copied
+
+
+def migrate_board(redis_client, service_id: str, leader_board_id: str, chunk_size: int, interval: float):
+    keys = [leaderboard_str(service_id, leader_board_id), leaderboard_timestamp_str(service_id, leader_board_id)]
+
+    if not redis_client.exists(keys[1]):
+        print(f"[{leader_board_id}] already stored in score mode, skipped")
+        return
+
+    # marker가 설정된 이후의 갱신은 put/delete script가 staging 리더보드에도 기록
+    redis_client.set(leaderboard_migrating_str(service_id, leader_board_id), 1)
+
+    users = (user_id for user_id, _ in redis_client.hscan_iter(keys[1], count=chunk_size))
+    copied = copy_chunks(redis_client, keys, users, chunk_size, interval)
+    print(f"[{leader_board_id}] copied {copied} users")
+
+    for _ in range(MAX_SWAP_ATTEMPTS):
+        if script_migrate_swap(redis_client, keys=keys):
+            print(f"[{leader_board_id}] migrated")
+            return
+
+        # staging 리더보드에 남아있는 삭제된 유저를 정리하고 누락된 유저를 다시 복사
+        staged = (user_id for user_id, _ in redis_client.zscan_iter(leaderboard_staging_str(service_id, leader_board_id), count=chunk_size))
+        copy_chunks(redis_client, keys, staged, chunk_size, interval)
+        users = (user_id for user_id, _ in redis_client.hscan_iter(keys[1], count=chunk_size))
+        copy_chunks(redis_client, keys, users, chunk_size, interval)
+
+    # marker가 남아있으면 점수 갱신이 계속 staging 리더보드에 기록되므로 정리한 뒤 실패로 처리
+    abort_board(redis_client, service_id, leader_board_id)
+    raise RuntimeError(f"[{leader_board_id}] cardinality of staging leaderboard does not match, migration aborted, retry migration")
+
+
+def abort_board(redis_client, service_id: str, leader_board_id: str):
+    redis_client.delete(leaderboard_migrating_str(service_id, leader_board_id))
+    redis_client.unlink(leaderboard_staging_str(service_id, leader_board_id))
+    print(f"[{leader_board_id}] migration aborted")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert timestamp mode leaderboards into score mode")
+    parser.add_argument("--host", required=True)
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--service", required=True, help="service id to migrate")
+    parser.add_argument("--board", action="append", help="leaderboard id to migrate, every timestamp mode leaderboard of the service if omitted")
+    parser.add_argument("--chunk-size", type=int, default=500, help="number of users converted by a single script call")
+    parser.add_argument("--interval", type=float, default=0.0, help="seconds to sleep between chunks")
+    parser.add_argument("--abort", action="store_true", help="discard staging data of an unfinished migration")
+    args = parser.parse_args()
+
+    redis_client = redis.StrictRedis(host=args.host, port=args.port, charset="utf-8", decode_responses=True)
+
+    boards = args.board or list(find_timestamp_boards(redis_client, args.service))
+    for leader_board_id in boards:
+        if args.abort:
+            abort_board(redis_client, args.service, leader_board_id)
+        else:
+            migrate_board(redis_client, args.service, leader_board_id, args.chunk_size, args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# 리더보드 index가 도입되기 이전에 생성된 리더보드를 서비스별 리더보드 index에 등록하는 명령
+#
+# keyspace 전체를 SCAN 하므로 배포 직후 한번만 실행합니다. 생성 시각을 알 수 없는 리더보드는 실행 시각으로 등록됩니다.
+#
+#   $ python rebuild_board_index.py --host <redis-host> --service <serviceId>
+import argparse
+import redis
+from leaderboard_keys import leaderboard_str, leaderboard_index_str, leaderboard_index_created_str
+from timestamp import get_now_timestamp
+
+
+def rebuild_board_index(redis_client, service_id: str, batch_size: int):
+    prefix = leaderboard_str(service_id, "")
+    created_at = int(get_now_timestamp())
+    registered = 0
+
+    for key in redis_client.scan_iter(match=f'{prefix}*', count=batch_size):
+        leader_board_id = key[len(prefix):]
+        # timestamp hash, version 등 리더보드에 딸린 key는 제외
+        if ":" in leader_board_id or redis_client.type(key) != "zset":
+            continue
+
+        if redis_client.zadd(leaderboard_index_str(service_id), {leader_board_id: 0}, nx=True):
+            redis_client.hsetnx(leaderboard_index_created_str(service_id), leader_board_id, created_at)
+            registered += 1
+
+    return registered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Register existing leaderboards into the per-service leaderboard index")
+    parser.add_argument("--host", required=True)
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--service", required=True, help="service id to index")
+    parser.add_argument("--batch-size", type=int, default=1000, help="SCAN count hint")
+    args = parser.parse_args()
+
+    redis_client = redis.StrictRedis(host=args.host, port=args.port, charset="utf-8", decode_responses=True)
+    registered = rebuild_board_index(redis_client, args.service, args.batch_size)
+    print(f"[{args.service}] registered {registered} leaderboards")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import os
+import time
+import redis
+
+# redis 접속 설정
+#
+# - connect/read timeout으로 failover 중인 node에 대한 요청이 lambda timeout까지 멈추지 않도록 제한
+# - freeze 되었다가 재사용되는 container의 connection은 health check 주기가 지났으면 사용 전에 PING으로 확인
+# - 읽기 전용 client는 connection 오류가 발생하면 connection을 다시 맺고 제한된 횟수만큼 재시도
+#   (쓰기는 재시도하면 같은 요청이 두번 반영될 수 있으므로 재시도하지 않음)
+# - lambda layer에 hiredis가 설치되어 있으면 redis-py가 자동으로 hiredis reply parser를 사용
+REDIS_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('REDIS_CONNECT_TIMEOUT_SECONDS', 1))
+REDIS_SOCKET_TIMEOUT_SECONDS = float(os.environ.get('REDIS_SOCKET_TIMEOUT_SECONDS', 2))
+REDIS_HEALTH_CHECK_INTERVAL_SECONDS = int(os.environ.get('REDIS_HEALTH_CHECK_INTERVAL_SECONDS', 30))
+REDIS_READ_RETRIES = int(os.environ.get('REDIS_READ_RETRIES', 2))
+REDIS_RETRY_BACKOFF_SECONDS = 0.05
+
+
+def connection_options():
+    return {
+        "socket_connect_timeout": REDIS_CONNECT_TIMEOUT_SECONDS,
+        "socket_timeout": REDIS_SOCKET_TIMEOUT_SECONDS,
+        "socket_keepalive": True,
+        "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL_SECONDS
+    }
+
+
+def create_client(host: str, port):
+    return redis.StrictRedis(host=host, port=port, charset="utf-8", decode_responses=True, **connection_options())
+
+
+# 같은 connection pool을 사용하면서 명령을 재시도하는 읽기 전용 client
+def create_read_client(redis_client):
+    return retry_reads(redis.StrictRedis(connection_pool=redis_client.connection_pool), REDIS_READ_RETRIES)
+
+
+def create_cluster_client(host: str, port, read_from_replicas: bool = False):
+    # cluster client는 connection 오류가 발생하면 cluster 구성을 다시 읽고 자체적으로 재시도
+    from rediscluster import RedisCluster
+    return RedisCluster(
+        startup_nodes=[{"host": host, "port": port}],
+        decode_responses=True,
+        skip_full_coverage_check=True,
+        read_from_replicas=read_from_replicas,
+        **connection_options())
+
+
+def hiredis_enabled():
+    return redis.connection.HIREDIS_AVAILABLE
+
+
+def retry_reads(redis_client, retries: int):
+    execute_command = redis_client.execute_command
+    create_pipeline = redis_client.pipeline
+
+    def with_retry(func, *args, **kwargs):
+        for attempt in range(retries + 1):
+            try:
+                return func(*args, **kwargs)
+            except (redis.ConnectionError, redis.TimeoutError):
+                if attempt == retries:
+                    raise
+                # 끊어진 connection을 모두 정리하고 잠시 후 새 connection으로 재시도 (failover 중에는 DNS가 새 node를 가리킴)
+                redis_client.connection_pool.disconnect()
+                time.sleep(REDIS_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+
+    def retried_execute_command(*args, **options):
+        return with_retry(execute_command, *args, **options)
+
+    def retried_pipeline(*args, **kwargs):
+        pipe = create_pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        def retried_execute(*execute_args, **execute_kwargs):
+            # 실패한 execute는 command stack을 비우므로 재시도 전에 복원
+            stack = list(pipe.command_stack)
+
+            def execute_stack():
+                pipe.command_stack = list(stack)
+                return execute(*execute_args, **execute_kwargs)
+            return with_retry(execute_stack)
+
+        pipe.execute = retried_execute
+        return pipe
+
+    redis_client.execute_command = retried_execute_command
+    redis_client.pipeline = retried_pipeline
+    return redis_client
@@ -0,0 +1,54 @@
+import time
+from collections import OrderedDict
+
+STATS_LOG_INTERVAL = 1000
+
+
+# lambda container 안에서 유지되는 LRU + TTL cache
+# 리더보드 version이 저장 당시와 다르면 쓰기가 있었던 것이므로 cache를 사용하지 않음
+class ResponseCache:
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hit_count = 0
+        self.miss_count = 0
+        self.eviction_count = 0
+
+    def get(self, key, version):
+        entry = self.entries.get(key)
+        if entry is not None:
+            expires_at, entry_version, value = entry
+            if expires_at > time.monotonic() and entry_version == version:
+                self.entries.move_to_end(key)
+                self.hit_count += 1
+                self.log_stats()
+                return value
+            del self.entries[key]
+
+        self.miss_count += 1
+        self.log_stats()
+        return None
+
+    def put(self, key, version, value):
+        if self.max_entries <= 0:
+            return
+
+        self.entries[key] = (time.monotonic() + self.ttl, version, value)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.eviction_count += 1
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "hits": self.hit_count,
+            "misses": self.miss_count,
+            "evictions": self.eviction_count
+        }
+
+    def log_stats(self):
+        if (self.hit_count + self.miss_count) % STATS_LOG_INTERVAL == 0:
+            print(f"response cache stats: {self.stats()}")
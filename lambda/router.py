@@ -0,0 +1,107 @@
+import json
+
+# API Gateway proxy 요청을 route 함수로 전달하는 dispatcher
+#
+# lambdarest와 같은 "/<string:name>/..." 형식의 route를 module load 시점에 (method, path segment 수) 별로 나누어 두고,
+# 요청마다 같은 길이의 route만 segment 단위로 비교합니다. 고정된 segment가 앞쪽에 있는 route를 먼저 비교하므로
+# "/<board>/top" 과 "/<board>/<user>" 처럼 겹치는 route는 lambdarest(werkzeug)와 같이 고정된 segment가 우선합니다.
+# query parameter는 route 함수가 조회하는 parameter만 json 변환하고, 요청 body는 route 함수가 직접 해석합니다.
+
+
+# lambdarest와 같이 query parameter 값을 json으로 해석하고, 해석할 수 없는 값은 문자열 그대로 사용
+class QueryParameters:
+    def __init__(self, raw: dict):
+        self.raw = raw or {}
+        self.parsed = {}
+
+    def get(self, name: str, default=None):
+        if name not in self.raw:
+            return default
+        if name not in self.parsed:
+            try:
+                self.parsed[name] = json.loads(self.raw[name])
+            except ValueError:
+                self.parsed[name] = self.raw[name]
+        return self.parsed[name]
+
+    def __contains__(self, name: str):
+        return name in self.raw
+
+
+class Route:
+    def __init__(self, method: str, path: str, func):
+        self.method = method
+        self.path = path
+        self.func = func
+        # 고정된 segment는 문자열, 변수 segment는 None, 변수 이름은 위치와 함께 따로 보관
+        self.segments = []
+        self.params = []
+        for position, segment in enumerate(path.strip("/").split("/")):
+            if segment.startswith("<") and segment.endswith(">"):
+                self.segments.append(None)
+                self.params.append((position, segment[1:-1].split(":")[-1]))
+            else:
+                self.segments.append(segment)
+
+    def priority(self):
+        return tuple(segment is None for segment in self.segments)
+
+    def match(self, parts: list):
+        for segment, part in zip(self.segments, parts):
+            if (segment is None and not part) or (segment is not None and segment != part):
+                return None
+        return {name: parts[position] for position, name in self.params}
+
+
+class Router:
+    def __init__(self, json_encoder=json.JSONEncoder):
+        self.json_encoder = json_encoder
+        self.routes = []
+        self.table = {}
+
+    def handle(self, method: str, path: str):
+        def decorator(func):
+            route = Route(method.upper(), path, func)
+            self.routes.append(route)
+            candidates = self.table.setdefault((route.method, len(route.segments)), [])
+            candidates.append(route)
+            candidates.sort(key=Route.priority)
+            return func
+        return decorator
+
+    def find(self, method: str, parts: list):
+        for route in self.table.get((method, len(parts)), ()):
+            kwargs = route.match(parts)
+            if kwargs is not None:
+                return route, kwargs
+        return None, None
+
+    def request_path(self, event):
+        # {proxy+} resource는 custom domain의 base path가 제외된 proxy path를 사용
+        proxy = (event.get("pathParameters") or {}).get("proxy")
+        return proxy if proxy is not None else event.get("path", "")
+
+    def __call__(self, event):
+        method = event["httpMethod"].upper()
+        parts = self.request_path(event).strip("/").split("/")
+
+        route, kwargs = self.find(method, parts)
+        if route is None:
+            # 같은 path를 처리하는 다른 method가 있으면 405와 함께 허용된 method를 Allow header로 응답
+            allowed = sorted({other for other, _ in self.table if other != method and self.find(other, parts)[0]})
+            if allowed:
+                return self.response({"message": "Method Not Allowed"}, 405, {"Allow": ", ".join(allowed)})
+            return self.response({"message": "Not Found"}, 404)
+
+        event["json"] = {"query": QueryParameters(event.get("queryStringParameters"))}
+        result = route.func(event, **kwargs)
+        if isinstance(result, tuple):
+            return self.response(*result)
+        return self.response(result)
+
+    # route 함수의 반환값(body 또는 (body, status code, headers))을 lambda proxy 응답으로 변환
+    def response(self, body, status_code=200, headers=None):
+        response = {"statusCode": status_code or 200, "headers": headers or {}}
+        if body is not None:
+            response["body"] = body if isinstance(body, str) else json.dumps(body, cls=self.json_encoder, sort_keys=True)
+        return response
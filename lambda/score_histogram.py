@@ -0,0 +1,52 @@
+import os
+import math
+from collections import Counter
+
+# 리더보드마다 점수 분포 histogram을 "{리더보드 key}:histogram" hash로 유지
+# 점수를 (1 + HISTOGRAM_ERROR) 배 간격의 log bucket으로 나누어 bucket별 유저 수를 기록하므로, 같은 bucket 안의 점수는
+# 최대 HISTOGRAM_ERROR 비율만큼 차이나고 리더보드 크기와 관계없이 bucket 수 만큼의 비용으로 백분위를 계산할 수 있음
+# 값을 바꾸면 기존 histogram과 bucket 경계가 달라지므로 histogram 재생성 작업이 끝날때까지 결과가 부정확함
+HISTOGRAM_ERROR = float(os.environ.get('HISTOGRAM_ERROR', 0.01))
+
+HISTOGRAM_LOG_BASE = math.log(1 + HISTOGRAM_ERROR)
+
+
+def histogram_key(leaderboard_key: str):
+    return f'{leaderboard_key}:histogram'
+
+
+def bucket_of(score):
+    return math.floor(math.log(score) / HISTOGRAM_LOG_BASE)
+
+
+def merge_histograms(histograms: list):
+    counts = Counter()
+    for histogram in histograms:
+        for bucket, count in histogram.items():
+            counts[int(bucket)] += int(count)
+    return counts
+
+
+# histogram으로 추정한 순위, 순위 범위(같은 bucket의 유저들), 상위 백분위
+# lowest_first 이면 (min 정책 리더보드) 낮은 점수가 앞에 위치
+def estimate_position(score, histograms: list, lowest_first: bool = False):
+    counts = merge_histograms(histograms)
+    bucket = bucket_of(score)
+
+    # histogram이 재생성되기 전에 기록된 유저는 감소만 반영되어 음수가 될 수 있으므로 0으로 취급
+    above = sum(max(count, 0) for other, count in counts.items() if (other < bucket if lowest_first else other > bucket))
+    same = max(counts.get(bucket, 0), 1)
+    total = max(sum(max(count, 0) for count in counts.values()), above + same)
+
+    # bucket 안에서는 점수가 균등하게 분포한다고 가정하고 보간
+    lower, upper = (1 + HISTOGRAM_ERROR) ** bucket, (1 + HISTOGRAM_ERROR) ** (bucket + 1)
+    fraction = min(max(((score - lower) if lowest_first else (upper - score)) / (upper - lower), 0), 1)
+    rank = above + 1 + round(fraction * (same - 1))
+
+    return {
+        "rank": rank,
+        "rankBucket": {"min": above + 1, "max": above + same},
+        "percentile": round(rank / total * 100, 2),
+        "cardinality": total,
+        "error": HISTOGRAM_ERROR
+    }
@@ -0,0 +1,46 @@
+# 리더보드별 점수 반영 정책
+#
+# - max    : 기록된 점수보다 높은 점수만 기록 (기본값)
+# - min    : 기록된 점수보다 낮은 점수만 기록
+# - sum    : 요청된 점수를 기록된 점수에 더함
+# - latest : 마지막으로 요청된 점수를 기록
+#
+# 정책은 write script 안에서 적용되므로 읽고 더해서 다시 쓰는 과정 없이 원자적으로 반영되며, 점수가 바뀐 경우에만
+# tie-break timestamp가 갱신됩니다. min 정책은 낮은 점수가, 그 밖의 정책은 높은 점수가 앞에 위치합니다.
+SCORE_POLICIES = ("max", "min", "sum", "latest")
+DEFAULT_SCORE_POLICY = "max"
+
+
+def validate_policy(policy):
+    if policy not in SCORE_POLICIES:
+        raise ValueError(f"policy must be one of {', '.join(SCORE_POLICIES)}.")
+
+
+# min 정책 리더보드는 낮은 점수가 앞에 위치하도록 점수의 부호를 바꾸어 기록
+# 기록된 점수의 부호가 달라지므로 점수가 기록된 리더보드의 정책은 min 정책으로, 또는 min 정책에서 다른 정책으로 변경할 수 없음
+def score_sign(policy: str):
+    return -1 if policy == "min" else 1
+
+
+# 같은 유저에게 연달아 요청된 점수를 정책에 따라 하나의 점수로 합침 (queue consumer의 병합에 사용)
+def merge_scores(policy: str, score, next_score):
+    if policy == "sum":
+        return score + next_score
+    if policy == "min":
+        return min(score, next_score)
+    if policy == "latest":
+        return next_score
+    return max(score, next_score)
+
+
+# 기록된 점수(기록이 없으면 0)에 점수를 반영했을때 기록이 바뀌는지 여부 (script를 호출한 쪽에서 version 갱신 여부 판단에 사용)
+def changes_score(policy: str, prev_score, score):
+    if not prev_score:
+        return True
+    if policy == "sum":
+        return True
+    if policy == "min":
+        return score < prev_score
+    if policy == "latest":
+        return score != prev_score
+    return score > prev_score
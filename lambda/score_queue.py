@@ -0,0 +1,99 @@
+import json
+import itertools
+from collections import deque
+from metrics import emit_metrics
+from score_policy import merge_scores
+
+# 점수 갱신을 API 호출과 분리하여 비동기로 기록하기 위한 queue
+#
+# API는 검증이 끝난 점수 이벤트를 queue에 넣고 바로 응답하며, consumer가 이벤트를 모아 (service, board, user) 단위로
+# 리더보드의 점수 반영 정책에 따라 하나의 점수로 합친 뒤 리더보드마다 한번의 batch 갱신으로 기록합니다.
+# 하나의 API 요청에 포함된 이벤트는 하나의 리더보드에 대한 하나의 메세지로 전송되며, 메세지는 (message id, 이벤트 목록) 형태로 처리합니다.
+
+
+class ScoreQueue:
+    def send(self, events: list):
+        raise NotImplementedError
+
+
+# 로컬 테스트용 queue, 같은 프로세스 안에서만 유효하며 drain_score_queue 작업으로 consumer를 실행
+class InMemoryScoreQueue(ScoreQueue):
+    def __init__(self):
+        self.messages = deque()
+        self.message_ids = itertools.count(1)
+
+    def send(self, events: list):
+        self.messages.append((str(next(self.message_ids)), events))
+
+    def receive(self, max_count: int) -> list:
+        return [self.messages.popleft() for _ in range(min(max_count, len(self.messages)))]
+
+
+# SQS queue, 메세지는 lambda의 SQS event source가 consumer로 전달하므로 직접 수신하지 않음
+class SqsScoreQueue(ScoreQueue):
+    def __init__(self, queue_url: str):
+        import boto3
+        self.client = boto3.client("sqs")
+        self.queue_url = queue_url
+
+    def send(self, events: list):
+        # 하나의 API 요청에 포함된 이벤트는 하나의 메세지로 전송
+        self.client.send_message(QueueUrl=self.queue_url, MessageBody=json.dumps(events))
+
+
+def create_score_queue(queue_type: str, queue_url: str):
+    if queue_type == "sqs":
+        return SqsScoreQueue(queue_url)
+    if queue_type == "memory":
+        return InMemoryScoreQueue()
+    return None
+
+
+def score_event(service_id: str, leader_board_id: str, user_id: str, score):
+    return {"serviceId": service_id, "leaderBoardId": leader_board_id, "userId": user_id, "score": score}
+
+
+def sqs_record_messages(records: list):
+    return [(record["messageId"], json.loads(record["body"])) for record in records]
+
+
+# 메세지를 리더보드별로 모아 이벤트 수가 max_count 이하인 batch로 나누고 (리더보드, message id 목록, 이벤트 목록) 목록을 반환
+# 기록에 실패한 batch의 메세지만 다시 전달받을 수 있도록 하나의 메세지는 항상 하나의 batch 안에 위치
+def batch_score_messages(messages: list, max_count: int):
+    boards = {}
+    for message_id, events in messages:
+        if not events:
+            continue
+        batches = boards.setdefault((events[0]["serviceId"], events[0]["leaderBoardId"]), [])
+        if not batches or len(batches[-1][1]) + len(events) > max_count:
+            batches.append(([], []))
+        batches[-1][0].append(message_id)
+        batches[-1][1].extend(events)
+
+    return [(board, message_ids, events) for board, batches in boards.items() for message_ids, events in batches]
+
+
+# 이벤트를 리더보드의 점수 반영 정책에 따라 유저별 하나의 점수로 합치고 (리더보드별 {user_id: score}, 합쳐져서 기록되지 않는 이벤트 수)를 반환
+# policy_of는 (service id, leaderboard id)로 리더보드의 정책을 조회하는 함수
+def coalesce_score_events(events: list, policy_of):
+    boards = {}
+    policies = {}
+    for event in events:
+        board = (event["serviceId"], event["leaderBoardId"])
+        if board not in policies:
+            policies[board] = policy_of(*board)
+        users = boards.setdefault(board, {})
+        user_id = event["userId"]
+        users[user_id] = merge_scores(policies[board], users[user_id], event["score"]) if user_id in users else event["score"]
+
+    written = sum(len(users) for users in boards.values())
+    return boards, len(events) - written
+
+
+# 수신/기록/병합된 점수 수를 metric으로 기록
+def report_ingestion(received: int, written: int):
+    emit_metrics({
+        "IngestedScores": (received, "Count"),
+        "WrittenScores": (written, "Count"),
+        "MergedScores": (received - written, "Count")
+    })
@@ -0,0 +1,90 @@
+import hashlib
+from redis.exceptions import NoScriptError, ResponseError
+try:
+    from rediscluster import RedisCluster
+except ImportError:
+    RedisCluster = None
+from leaderboard_scripts import lua_script_get_around, lua_script_get_my_rank, lua_script_get_top, lua_script_put_score, lua_script_put_scores, lua_script_delete_score, lua_script_list_boards, \
+    lua_script_get_properties, lua_script_get_percentile, lua_script_remove_orphan_timestamps, \
+    lua_script_get_user_ranks, lua_script_get_users_rank, lua_script_offload_board, lua_script_check_scores, lua_script_import_entries, \
+    lua_script_import_swap, INVALID_SCORE_ERROR
+from leaderboard_exceptions import InvalidRequestException
+
+
+class LuaScript:
+    def __init__(self, registry, source: str):
+        self.registry = registry
+        self.source = source
+        self.sha = hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+    def __call__(self, client, keys=(), args=()):
+        return self.registry.evalsha(client, self, keys, args)
+
+
+# 컨테이너 단위로 script를 한번만 SCRIPT LOAD 하고 이후에는 EVALSHA로 호출
+# failover나 SCRIPT FLUSH로 script cache가 비워진 경우 NOSCRIPT 에러를 받으면 다시 load 후 재시도
+class ScriptRegistry:
+    def __init__(self):
+        self.scripts = []
+        self.loaded_clients = set()
+        self.noscript_fallback_count = 0
+
+    def register(self, source: str) -> LuaScript:
+        script = LuaScript(self, source)
+        self.scripts.append(script)
+        return script
+
+    def load(self, client):
+        if RedisCluster is not None and isinstance(client, RedisCluster):
+            # cluster client는 SCRIPT LOAD를 모든 master node로 전달하지만 pipeline으로는 보낼 수 없음
+            for script in self.scripts:
+                client.script_load(script.source)
+        else:
+            pipe = client.pipeline(transaction=False)
+            for script in self.scripts:
+                pipe.script_load(script.source)
+            pipe.execute()
+        self.loaded_clients.add(id(client))
+
+    # script가 기록할 수 없는 점수로 반환한 error는 잘못된 요청으로 전달
+    def evalsha(self, client, script: LuaScript, keys, args):
+        try:
+            return self.execute(client, script, keys, args)
+        except ResponseError as error:
+            if str(error).startswith(INVALID_SCORE_ERROR + " "):
+                raise InvalidRequestException(str(error)[len(INVALID_SCORE_ERROR) + 1:])
+            raise
+
+    def execute(self, client, script: LuaScript, keys, args):
+        if id(client) not in self.loaded_clients:
+            self.load(client)
+
+        try:
+            return client.evalsha(script.sha, len(keys), *keys, *args)
+        except NoScriptError:
+            # script cache 전체가 유실된 상황이므로 등록된 모든 script를 다시 load
+            self.noscript_fallback_count += 1
+            print(f"NOSCRIPT fallback for {script.sha}, reloading {len(self.scripts)} scripts "
+                  f"(fallback count: {self.noscript_fallback_count})")
+            self.load(client)
+            return client.evalsha(script.sha, len(keys), *keys, *args)
+
+
+script_registry = ScriptRegistry()
+
+script_get_my_rank = script_registry.register(lua_script_get_my_rank)
+script_get_top = script_registry.register(lua_script_get_top)
+script_get_around = script_registry.register(lua_script_get_around)
+script_put_score = script_registry.register(lua_script_put_score)
+script_put_scores = script_registry.register(lua_script_put_scores)
+script_delete_score = script_registry.register(lua_script_delete_score)
+script_list_boards = script_registry.register(lua_script_list_boards)
+script_get_properties = script_registry.register(lua_script_get_properties)
+script_get_percentile = script_registry.register(lua_script_get_percentile)
+script_remove_orphan_timestamps = script_registry.register(lua_script_remove_orphan_timestamps)
+script_get_user_ranks = script_registry.register(lua_script_get_user_ranks)
+script_get_users_rank = script_registry.register(lua_script_get_users_rank)
+script_offload_board = script_registry.register(lua_script_offload_board)
+script_check_scores = script_registry.register(lua_script_check_scores)
+script_import_entries = script_registry.register(lua_script_import_entries)
+script_import_swap = script_registry.register(lua_script_import_swap)
@@ -0,0 +1,257 @@
+import heapq
+import zlib
+from itertools import islice
+from timestamp import MAX_TIMESTAMP, TIE_BREAK_FACTOR
+from leaderboard_keys import leaderboard_shard_str, leaderboard_shard_timestamp_str, leaderboard_version_str, leaderboard_index_str, \
+    leaderboard_index_created_str, user_properties_key_str
+from script_registry import script_put_score, script_put_scores, script_delete_score, script_get_properties, script_check_scores
+from score_histogram import histogram_key
+from score_policy import changes_score
+
+# 샤드 리더보드는 유저를 user id hash로 N개의 sorted set에 나누어 저장
+#
+# - 샤드는 항상 score 방식(score에 tie-break 포함)으로 저장하므로 샤드 사이에서도 score만으로 순위를 비교할 수 있음
+# - 유저의 전체 순위는 각 샤드에서 유저보다 높은 score를 가진 유저 수의 합
+# - 상위 N개는 각 샤드의 상위 offset+limit 개를 k-way merge
+# - version, index 등 리더보드 단위 정보는 샤드가 아닌 리더보드 key에 기록
+
+
+def shard_of(user_id: str, shard_count: int):
+    return zlib.crc32(user_id.encode("utf-8")) % shard_count
+
+
+def shard_keys(service_id: str, leader_board_id: str, shard: int):
+    return [leaderboard_shard_str(service_id, leader_board_id, shard), leaderboard_shard_timestamp_str(service_id, leader_board_id, shard)]
+
+
+# min 정책 리더보드는 부호를 바꾸어 기록하므로 절대값
+def decode_score(encoded_score):
+    return abs(int(encoded_score // TIE_BREAK_FACTOR))
+
+
+# redis ZREVRANGE와 같은 순서 (score 내림차순, 같은 score는 member 사전 역순)
+def entry_order(entry):
+    return entry[1], entry[0].encode("utf-8")
+
+
+def cardinality(redis_client, service_id: str, leader_board_id: str, shard_count: int):
+    pipe = redis_client.pipeline(transaction=False)
+    for shard in range(shard_count):
+        pipe.zcard(leaderboard_shard_str(service_id, leader_board_id, shard))
+    return sum(pipe.execute())
+
+
+def has_data(redis_client, service_id: str, leader_board_id: str, shard_count: int):
+    return cardinality(redis_client, service_id, leader_board_id, shard_count) > 0
+
+
+# 각 샤드에서 encoded score보다 높은 유저 수와 같은 score의 유저 목록을 조회하는 명령을 pipeline에 추가
+def queue_rank_counts(pipe, service_id: str, leader_board_id: str, shard_count: int, encoded_score):
+    bound = format(encoded_score, ".0f")
+    for shard in range(shard_count):
+        key = leaderboard_shard_str(service_id, leader_board_id, shard)
+        pipe.zcount(key, f"({bound}", "+inf")
+        pipe.zrangebyscore(key, bound, bound)
+
+
+# 샤드별 조회 결과로 전체 순위(1부터 시작)를 계산, 같은 score는 member 사전 역순
+def rank_of(user_id: str, results: list):
+    member_order = user_id.encode("utf-8")
+    return sum(results[0::2]) + sum(1 for members in results[1::2] for member in members if member.encode("utf-8") > member_order) + 1
+
+
+# 유저의 전체 순위(1부터 시작)와 encoded score, 샤드별 동점 유저 목록을 반환, 기록이 없으면 None
+def locate(redis_client, service_id: str, leader_board_id: str, shard_count: int, user_id: str):
+    own_shard = leaderboard_shard_str(service_id, leader_board_id, shard_of(user_id, shard_count))
+    encoded_score = redis_client.zscore(own_shard, user_id)
+    if encoded_score is None:
+        return None
+
+    pipe = redis_client.pipeline(transaction=False)
+    queue_rank_counts(pipe, service_id, leader_board_id, shard_count, encoded_score)
+    results = pipe.execute()
+    return rank_of(user_id, results), encoded_score, results[1::2]
+
+
+def get_rank(redis_client, service_id: str, leader_board_id: str, shard_count: int, user_id: str):
+    located = locate(redis_client, service_id, leader_board_id, shard_count, user_id)
+    if located is None:
+        return None
+
+    rank, encoded_score, _ = located
+    return [rank, user_id, decode_score(encoded_score)]
+
+
+# 여러 유저의 전체 순위를 순위 순서의 rank, user_id, score 목록으로 반환, 기록이 없는 유저는 제외
+# 유저 수와 관계없이 점수 조회와 순위 계산 두번의 pipeline으로 처리
+def get_ranks(redis_client, service_id: str, leader_board_id: str, shard_count: int, user_ids: list):
+    pipe = redis_client.pipeline(transaction=False)
+    for user_id in user_ids:
+        pipe.zscore(leaderboard_shard_str(service_id, leader_board_id, shard_of(user_id, shard_count)), user_id)
+    located = [(user_id, encoded_score) for user_id, encoded_score in zip(user_ids, pipe.execute()) if encoded_score is not None]
+    if not located:
+        return []
+
+    pipe = redis_client.pipeline(transaction=False)
+    for _, encoded_score in located:
+        queue_rank_counts(pipe, service_id, leader_board_id, shard_count, encoded_score)
+    results = pipe.execute()
+
+    step = shard_count * 2
+    ranked = sorted((rank_of(user_id, results[i*step:(i+1)*step]), user_id, decode_score(encoded_score))
+                    for i, (user_id, encoded_score) in enumerate(located))
+    return [value for entry in ranked for value in entry]
+
+
+def get_top(redis_client, service_id: str, leader_board_id: str, shard_count: int, offset: int, limit: int):
+    pipe = redis_client.pipeline(transaction=False)
+    for shard in range(shard_count):
+        pipe.zrevrange(leaderboard_shard_str(service_id, leader_board_id, shard), 0, offset+limit-1, withscores=True)
+
+    merged = heapq.merge(*pipe.execute(), key=entry_order, reverse=True)
+
+    data = []
+    for rank, (user_id, encoded_score) in enumerate(islice(merged, offset, offset+limit), start=offset+1):
+        data += [rank, user_id, decode_score(encoded_score)]
+    return data
+
+
+def get_around(redis_client, service_id: str, leader_board_id: str, shard_count: int, user_id: str, limit: int):
+    located = locate(redis_client, service_id, leader_board_id, shard_count, user_id)
+    if located is None:
+        return None
+
+    rank, encoded_score, ties = located
+    bound = format(encoded_score, ".0f")
+
+    # 각 샤드에서 유저 바로 위, 아래의 limit 개 후보를 가져옴 (동점 유저는 위, 아래 어느쪽인지 score만으로 알 수 없으므로 추가로 가져옴)
+    pipe = redis_client.pipeline(transaction=False)
+    for shard in range(shard_count):
+        key = leaderboard_shard_str(service_id, leader_board_id, shard)
+        pipe.zrangebyscore(key, bound, "+inf", start=0, num=limit+len(ties[shard]), withscores=True)
+        pipe.zrevrangebyscore(key, bound, "-inf", start=0, num=limit+len(ties[shard]), withscores=True)
+
+    candidates = {}
+    for entries in pipe.execute():
+        candidates.update(entries)
+    window = sorted(candidates.items(), key=entry_order, reverse=True)
+
+    position = next(i for i, entry in enumerate(window) if entry[0] == user_id)
+    first = max(0, position-limit)
+
+    data = []
+    for i, (member, member_score) in enumerate(window[first:position+limit+1], start=first):
+        data += [rank + i - position, member, decode_score(member_score)]
+    return data
+
+
+# 유저의 점수와 샤드별 점수 분포 histogram, 기록이 없으면 None
+def get_score_histograms(redis_client, service_id: str, leader_board_id: str, shard_count: int, user_id: str):
+    own_shard = leaderboard_shard_str(service_id, leader_board_id, shard_of(user_id, shard_count))
+    encoded_score = redis_client.zscore(own_shard, user_id)
+    if encoded_score is None:
+        return None
+
+    pipe = redis_client.pipeline(transaction=False)
+    for shard in range(shard_count):
+        pipe.hgetall(histogram_key(leaderboard_shard_str(service_id, leader_board_id, shard)))
+    return decode_score(encoded_score), pipe.execute()
+
+
+# rank, user_id, score 목록의 각 유저 뒤에 property를 덧붙여 조회 script와 같은 형태로 반환
+def join_properties(redis_client, service_id: str, data: list, fields: list):
+    if not data:
+        return data
+
+    user_ids = data[1::3]
+    properties = script_get_properties(redis_client,
+                                       keys=[user_properties_key_str(service_id, user_id) for user_id in user_ids],
+                                       args=fields)
+
+    joined = []
+    for i, user_properties in enumerate(properties):
+        joined += [*data[i*3:(i+1)*3], user_properties]
+    return joined
+
+
+# 샤드에 기록이 바뀐 경우 리더보드 단위의 version, index를 갱신
+def touch_board(redis_client, service_id: str, leader_board_id: str, timestamp: int):
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.incr(leaderboard_version_str(service_id, leader_board_id))
+    pipe.zadd(leaderboard_index_str(service_id), {leader_board_id: 0}, nx=True)
+    pipe.hsetnx(leaderboard_index_created_str(service_id), leader_board_id, MAX_TIMESTAMP - timestamp)
+    pipe.execute()
+
+
+def put_score(redis_client, service_id: str, leader_board_id: str, shard_count: int, user_id: str, score, timestamp: int, policy: str):
+    prev_score = script_put_score(redis_client,
+                                  keys=shard_keys(service_id, leader_board_id, shard_of(user_id, shard_count)),
+                                  args=[user_id, score, timestamp, "score", leader_board_id, policy])
+
+    if changes_score(policy, prev_score, score):
+        touch_board(redis_client, service_id, leader_board_id, timestamp)
+
+    return prev_score
+
+
+# 같은 샤드의 유저끼리 묶어서 샤드마다 한번의 script 호출로 갱신
+# 합산한 점수는 기록된 점수에 따라 표현 가능한 범위를 넘을 수 있으므로, 일부 샤드에만 기록되지 않도록 모든 샤드를 먼저 확인
+def put_scores(redis_client, service_id: str, leader_board_id: str, shard_count: int, scores: list, timestamp: int, policy: str):
+    shard_entries = {}
+    for i, entry in enumerate(scores):
+        shard_entries.setdefault(shard_of(entry["userId"], shard_count), []).append(i)
+
+    shard_args = {}
+    for shard, indexes in shard_entries.items():
+        shard_args[shard] = []
+        for i in indexes:
+            shard_args[shard] += [scores[i]["userId"], scores[i]["score"]]
+        if policy == "sum" and len(shard_entries) > 1:
+            script_check_scores(redis_client, keys=shard_keys(service_id, leader_board_id, shard), args=["score", policy, *shard_args[shard]])
+
+    prev_scores = [0] * len(scores)
+    changed = False
+    for shard, indexes in shard_entries.items():
+        shard_prev_scores = script_put_scores(redis_client,
+                                              keys=shard_keys(service_id, leader_board_id, shard),
+                                              args=[timestamp, "score", leader_board_id, policy, 0, *shard_args[shard]])
+
+        for i, prev_score in zip(indexes, shard_prev_scores):
+            prev_scores[i] = prev_score
+            changed = changed or changes_score(policy, prev_score, scores[i]["score"])
+
+    if changed:
+        touch_board(redis_client, service_id, leader_board_id, timestamp)
+
+    return prev_scores
+
+
+# 모든 샤드가 비어있으면 샤드가 아닌 리더보드와 같이 index에서 제거
+# 샤드 사이에는 원자성이 없으므로 제거한 뒤 다른 요청이 기록한 점수가 확인되면 다시 등록
+def unregister_empty_board(redis_client, service_id: str, leader_board_id: str, shard_count: int, timestamp: int):
+    if has_data(redis_client, service_id, leader_board_id, shard_count):
+        return
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zrem(leaderboard_index_str(service_id), leader_board_id)
+    pipe.hdel(leaderboard_index_created_str(service_id), leader_board_id)
+    pipe.execute()
+
+    if has_data(redis_client, service_id, leader_board_id, shard_count):
+        touch_board(redis_client, service_id, leader_board_id, timestamp)
+
+
+def delete_score(redis_client, service_id: str, leader_board_id: str, shard_count: int, user_id: str, timestamp: int):
+    deleted = script_delete_score(redis_client,
+                                  keys=shard_keys(service_id, leader_board_id, shard_of(user_id, shard_count)),
+                                  args=[user_id, leader_board_id])
+    if deleted:
+        touch_board(redis_client, service_id, leader_board_id, timestamp)
+        unregister_empty_board(redis_client, service_id, leader_board_id, shard_count, timestamp)
+
+
+def shard_key_list(service_id: str, leader_board_id: str, shard_count: int):
+    keys = []
+    for shard in range(shard_count):
+        keys += [*shard_keys(service_id, leader_board_id, shard), histogram_key(leaderboard_shard_str(service_id, leader_board_id, shard))]
+    return keys
@@ -20,3 +20,9 @@ def get_now_timestamp():
 # 이를 위해서는 충분히 큰 timestamp 값에서 현재 timestamp를 빼서 그 차이를 이용
 def get_reverse_timestamp():
     return int(MAX_TIMESTAMP-get_now_timestamp())
+
+
+# score 방식 저장에서는 sorted set score의 상위 bit에 점수를, 하위 32bit에 reverse timestamp를 기록
+# redis score는 double 이므로 정밀도(53bit)를 넘지 않도록 점수는 21bit 정수로 제한
+TIE_BREAK_FACTOR = 2 ** 32
+MAX_ENCODED_SCORE = 2 ** 21 - 1
@@ -0,0 +1,31 @@
+import json
+
+
+# property는 field 단위로 json 인코딩하여 hash에 저장하므로 필요한 field만 조회/디코딩할 수 있음
+def encode_properties(properties: dict):
+    return {field: json.dumps(value) for field, value in properties.items()}
+
+
+# get_properties script가 반환한 (key type, 값 목록)을 property dict로 변환, property가 없으면 None
+def decode_properties(key_type: str, values: list, fields: list):
+    if key_type == "hash":
+        if fields:
+            return {field: json.loads(value) for field, value in zip(fields, values) if value is not None}
+        return {values[i]: json.loads(values[i+1]) for i in range(0, len(values), 2)}
+
+    if key_type == "string":
+        properties = json.loads(values[0])
+        # object가 아닌 이전 방식의 property는 field를 조회할 수 없으므로 field 조회 결과는 비어있음
+        if fields and not isinstance(properties, dict):
+            return {}
+        if fields:
+            return {field: properties[field] for field in fields if field in properties}
+        return properties
+
+    return None
+
+
+# fields=nickname,avatarId 형태의 query parameter, 지정하지 않으면 전체 field를 조회
+def parse_fields(event):
+    fields = (event.get("queryStringParameters") or {}).get("fields", "")
+    return [field.strip() for field in fields.split(",") if field.strip()]
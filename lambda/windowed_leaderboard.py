@@ -0,0 +1,115 @@
+import json
+import datetime as pydatetime
+from leaderboard_keys import leaderboard_str, leaderboard_timestamp_str, leaderboard_version_str, leaderboard_archive_str, leaderboard_index_str
+from board_config import read_board_config
+from leaderboard_exceptions import InvalidRequestException
+from script_registry import script_get_top
+from score_histogram import histogram_key
+
+# 기간별(일간, 주간, 월간) 리더보드
+#
+# 기간별 리더보드는 "{leaderBoardId}:{window}:{period}" id를 가지는 일반 리더보드로 저장되며, 전체 기간 리더보드의
+# 점수 갱신 script가 설정된 모든 기간의 리더보드를 함께 갱신합니다. 기간이 끝난 리더보드는 retention 기간이 지나면 만료되고,
+# 주기 작업이 만료 전에 최종 상위 랭킹을 archive로 남깁니다.
+WINDOWS = ("daily", "weekly", "monthly")
+
+
+# 기간의 경계는 서비스 지역의 자정 기준
+def window_now(utc_offset_hours: int):
+    return pydatetime.datetime.now(pydatetime.timezone(pydatetime.timedelta(hours=utc_offset_hours)))
+
+
+def period_start(window: str, now: pydatetime.datetime):
+    day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if window == "daily":
+        return day
+    if window == "weekly":
+        return day - pydatetime.timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def next_period_start(window: str, start: pydatetime.datetime):
+    if window == "daily":
+        return start + pydatetime.timedelta(days=1)
+    if window == "weekly":
+        return start + pydatetime.timedelta(days=7)
+    return (start + pydatetime.timedelta(days=32)).replace(day=1)
+
+
+def previous_period_start(window: str, start: pydatetime.datetime):
+    return period_start(window, start - pydatetime.timedelta(days=1))
+
+
+def period_str(window: str, start: pydatetime.datetime):
+    if window == "daily":
+        return start.strftime("%Y%m%d")
+    if window == "weekly":
+        year, week, _ = start.isocalendar()
+        return f"{year}W{week:02d}"
+    return start.strftime("%Y%m")
+
+
+def window_board_id(leader_board_id: str, window: str, period: str):
+    return f"{leader_board_id}:{window}:{period}"
+
+
+def current_window_board_id(leader_board_id: str, window: str, now: pydatetime.datetime):
+    return window_board_id(leader_board_id, window, period_str(window, period_start(window, now)))
+
+
+# 현재 기간의 리더보드 id와 만료 시각 (기간이 끝난 뒤 retention_periods 만큼 더 유지)
+def window_write_targets(leader_board_id: str, windows: list, now: pydatetime.datetime, retention_periods: int):
+    targets = []
+    for window in windows:
+        start = period_start(window, now)
+        end = next_period_start(window, start)
+        for _ in range(retention_periods):
+            end = next_period_start(window, end)
+        targets.append((window_board_id(leader_board_id, window, period_str(window, start)), int(end.timestamp())))
+
+    return targets
+
+
+def validate_windows(windows):
+    if not isinstance(windows, list) or any(window not in WINDOWS for window in windows):
+        raise InvalidRequestException(f"'windows' parameter must be list of {', '.join(WINDOWS)}")
+
+
+# 기간이 끝난 리더보드의 상위 랭킹을 archive로 남김, 이미 archive 된 기간은 건너뜀
+def archive_closed_windows(redis_client, service_id: str, now: pydatetime.datetime, top_count: int, retention_seconds: int):
+    archived = 0
+    for leader_board_id, _ in redis_client.zscan_iter(leaderboard_index_str(service_id)):
+        for window in read_board_config(redis_client, service_id, leader_board_id)["windows"]:
+            start = previous_period_start(window, period_start(window, now))
+            board_id = window_board_id(leader_board_id, window, period_str(window, start))
+            archive_key = leaderboard_archive_str(service_id, board_id)
+
+            if redis_client.exists(archive_key) or not redis_client.exists(leaderboard_str(service_id, board_id)):
+                continue
+
+            rank_data = script_get_top(redis_client,
+                                       keys=[leaderboard_str(service_id, board_id), leaderboard_timestamp_str(service_id, board_id)],
+                                       args=[0, top_count, "", ""])
+            ranks = [{"userId": rank_data[i+1], "rank": rank_data[i], "score": rank_data[i+2]} for i in range(0, len(rank_data), 3)]
+            redis_client.set(archive_key, json.dumps(ranks), ex=retention_seconds)
+            archived += 1
+            print(f"[{service_id}] archived {board_id} ({len(ranks)} ranks)")
+
+    return archived
+
+
+def read_archive(redis_client, service_id: str, board_id: str):
+    archive = redis_client.get(leaderboard_archive_str(service_id, board_id))
+    return json.loads(archive) if archive is not None else None
+
+
+def window_key_list(service_id: str, leader_board_id: str, windows: list, now: pydatetime.datetime):
+    keys = []
+    for window in windows:
+        start = period_start(window, now)
+        for period in (period_str(window, start), period_str(window, previous_period_start(window, start))):
+            board_id = window_board_id(leader_board_id, window, period)
+            keys += [leaderboard_str(service_id, board_id), leaderboard_timestamp_str(service_id, board_id),
+                     leaderboard_version_str(service_id, board_id), leaderboard_archive_str(service_id, board_id),
+                     histogram_key(leaderboard_str(service_id, board_id))]
+    return keys
@@ -0,0 +1,72 @@
+import os
+import sys
+import json
+import lupa.lua51
+import fakeredis
+import redis
+import pytest
+
+# redis와 같은 Lua 5.1로 script를 실행하도록 fakeredis가 사용하는 lupa를 Lua 5.1 runtime으로 지정
+sys.modules["lupa"] = lupa.lua51
+
+# handler가 만드는 client는 모두 하나의 fakeredis server에 접속
+SERVER = fakeredis.FakeServer()
+
+
+class FakeStrictRedis(fakeredis.FakeStrictRedis):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("server", SERVER)
+        super().__init__(*args, **kwargs)
+
+
+redis.StrictRedis = FakeStrictRedis
+redis.Redis = FakeStrictRedis
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda"))
+os.environ.update({
+    "ADMIN_SECRET_TOKEN": "admin-token",
+    "DEFAULT_FETCH_COUNT": "50",
+    "MAX_FETCH_COUNT": "100",
+    "MAX_BATCH_COUNT": "100",
+    "REDIS_HOST": "localhost",
+    "REDIS_PORT": "6379",
+    "SCORE_QUEUE": "memory",
+})
+
+import lambda_handler  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def redis_client(monkeypatch, tmp_path):
+    lambda_handler.redis_client.flushall()
+    lambda_handler.board_config_cache.entries.clear()
+    lambda_handler.top_rank_cache.entries.clear()
+    lambda_handler.activity.recorded.clear()
+    monkeypatch.setattr(lambda_handler, "BACKUP_LOCATION", str(tmp_path / "backup"))
+    return lambda_handler.redis_client
+
+
+# 새로 생성되는 리더보드의 저장 방식을 바꿔가며 같은 테스트를 실행
+@pytest.fixture(params=["timestamp", "score"])
+def storage_mode(request, monkeypatch):
+    monkeypatch.setattr(lambda_handler, "STORAGE_MODE", request.param)
+    monkeypatch.setattr(lambda_handler.backend, "storage_mode", request.param)
+    return request.param
+
+
+class Api:
+    def __call__(self, method: str, path: str, body=None, query: dict = None, headers: dict = None):
+        event = {"httpMethod": method.upper(), "path": path, "headers": headers or {},
+                 "queryStringParameters": {name: str(value) for name, value in query.items()} if query else None,
+                 "body": json.dumps(body) if body is not None else None}
+        response = lambda_handler.handler(event, None)
+        payload = json.loads(response["body"]) if response.get("body") else None
+        return int(response["statusCode"]), payload, response.get("headers") or {}
+
+    def admin(self, method: str, path: str, body=None, query: dict = None):
+        return self(method, path, body, query, {"X-Auth": os.environ["ADMIN_SECRET_TOKEN"]})
+
+
+@pytest.fixture
+def api():
+    return Api()
@@ -0,0 +1,76 @@
+import json
+import lambda_handler
+import board_backup
+from backup_storage import create_backup_storage
+from leaderboard_keys import leaderboard_str, leaderboard_timestamp_str
+from score_histogram import histogram_key
+
+
+def top(api, board):
+    return [(entry["userId"], entry["score"]) for entry in api("get", f"/svc/leaderboards/{board}/top")[1]]
+
+
+def histogram(redis_client, board):
+    return {bucket: int(count) for bucket, count in redis_client.hgetall(histogram_key(leaderboard_str("svc", board))).items()}
+
+
+def export_and_import(redis_client, board="board", target="restored", chunk_size=2):
+    storage = create_backup_storage(lambda_handler.BACKUP_LOCATION)
+    exported = board_backup.export_board(redis_client, storage, "svc", board, "backup", chunk_size)
+    return board_backup.import_board(redis_client, storage, exported["backup"], "svc", target, 2)
+
+
+def test_export_and_import(api, redis_client, storage_mode):
+    api.admin("put", "/svc/leaderboards/board", {"policy": "sum"})
+    for i in range(5):
+        api("put", f"/svc/leaderboards/board/user{i}", {"score": (i + 1) * 10})
+
+    assert export_and_import(redis_client)["members"] == 5
+    assert top(api, "restored") == top(api, "board")
+    assert histogram(redis_client, "restored") == histogram(redis_client, "board")
+    assert api("get", "/svc/leaderboards/restored")[1]["policy"] == "sum"
+
+
+def test_export_writes_only_sorted_set_chunks(api, redis_client, storage_mode):
+    for i in range(5):
+        api("put", f"/svc/leaderboards/board/user{i}", {"score": (i + 1) * 10})
+
+    storage = create_backup_storage(lambda_handler.BACKUP_LOCATION)
+    exported = board_backup.export_board(redis_client, storage, "svc", "board", "backup", 2)
+    manifest = json.loads(storage.read(exported["backup"] + "manifest.json"))
+    assert [chunk["type"] for chunk in manifest["chunks"]] == ["zset"] * 3
+    assert exported["members"] == 5 and exported["chunks"] == 3
+    assert manifest["parts"] == [{"layout": storage_mode}]
+
+
+def test_import_keeps_one_entry_per_user(api, redis_client, storage_mode, monkeypatch):
+    for i in range(4):
+        api("put", f"/svc/leaderboards/board/user{i}", {"score": (i + 1) * 10})
+    expected = top(api, "board")
+
+    # ZSCAN이 같은 항목을 다시 반환한 경우
+    scan_pages = board_backup.scan_pages
+    monkeypatch.setattr(board_backup, "scan_pages", lambda scan, key, count: [*scan_pages(scan, key, count)] * 2)
+    # timestamp 방식은 export 하는 동안 갱신되어 자리를 옮긴 유저의 이전 member도 함께 읽힌 경우
+    board_key = leaderboard_str("svc", "board")
+    if storage_mode == "timestamp":
+        timestamp = redis_client.hget(leaderboard_timestamp_str("svc", "board"), "user0")
+        redis_client.zadd(board_key, {f"{int(timestamp) - 100}:user0": 100})
+
+    assert export_and_import(redis_client)["members"] == 4
+    assert top(api, "restored") == expected
+    assert redis_client.zcard(leaderboard_str("svc", "restored")) == 4
+    assert sum(histogram(redis_client, "restored").values()) == 4
+    if storage_mode == "timestamp":
+        assert redis_client.hlen(leaderboard_timestamp_str("svc", "restored")) == 4
+
+
+def test_import_replaces_existing_board(api, redis_client, storage_mode):
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    api("put", "/svc/leaderboards/restored/bob", {"score": 20})
+    api("put", "/svc/leaderboards/restored/carol", {"score": 30})
+
+    export_and_import(redis_client)
+    lambda_handler.board_config_cache.entries.clear()
+    assert top(api, "restored") == [("alice", 10)]
+    assert not redis_client.keys("*:import")
@@ -0,0 +1,89 @@
+import pytest
+import lambda_handler
+from leaderboard_keys import leaderboard_index_str, leaderboard_timestamp_str
+
+
+@pytest.fixture
+def timestamp_mode(monkeypatch):
+    monkeypatch.setattr(lambda_handler, "STORAGE_MODE", "timestamp")
+    monkeypatch.setattr(lambda_handler.backend, "storage_mode", "timestamp")
+
+
+def test_deleted_user_is_removed_from_timestamp_hash(api, redis_client, timestamp_mode):
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    api("put", "/svc/leaderboards/board/bob", {"score": 20})
+    timestamp_key = leaderboard_timestamp_str("svc", "board")
+    assert redis_client.hexists(timestamp_key, "alice")
+
+    assert api("delete", "/svc/leaderboards/board/alice")[0] == 200
+    assert not redis_client.hexists(timestamp_key, "alice")
+    assert redis_client.hexists(timestamp_key, "bob")
+
+
+def test_cleanup_job_removes_orphaned_timestamps(api, redis_client, timestamp_mode):
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    timestamp_key = leaderboard_timestamp_str("svc", "board")
+    # 이전 배포의 HDEL 오류로 남은 항목
+    redis_client.hset(timestamp_key, "ghost", 3000000000)
+
+    lambda_handler.handler({"job": "cleanup_timestamps", "services": ["svc"]}, None)
+    assert redis_client.hkeys(timestamp_key) == ["alice"]
+    assert api("get", "/svc/leaderboards/board/alice")[1] == {"userId": "alice", "rank": 1, "score": 10}
+
+    # 정리된 hash는 CLEANUP_INTERVAL_SECONDS 동안 다시 검사하지 않음
+    redis_client.hset(timestamp_key, "ghost", 3000000000)
+    lambda_handler.handler({"job": "cleanup_timestamps", "services": ["svc"]}, None)
+    assert redis_client.hexists(timestamp_key, "ghost")
+
+
+def test_cleanup_job_skips_score_layout_boards(api, redis_client, monkeypatch):
+    monkeypatch.setattr(lambda_handler, "STORAGE_MODE", "score")
+    monkeypatch.setattr(lambda_handler.backend, "storage_mode", "score")
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+
+    lambda_handler.handler({"job": "cleanup_timestamps", "services": ["svc"]}, None)
+    assert not redis_client.exists(leaderboard_timestamp_str("svc", "board"))
+    assert api("get", "/svc/leaderboards/board/alice")[1] == {"userId": "alice", "rank": 1, "score": 10}
+
+
+def service_keys(redis_client, service_id):
+    return [key for key in redis_client.keys() if key.lstrip("{").startswith(f"{service_id}:")]
+
+
+def fill_services(api):
+    for service_id in ["svc", "other"]:
+        assert api.admin("put", f"/{service_id}/leaderboards/sharded", {"shards": 3})[0] == 200
+        for i in range(4):
+            api("put", f"/{service_id}/leaderboards/board/user{i}", {"score": i + 1})
+            api("put", f"/{service_id}/leaderboards/sharded/user{i}", {"score": i + 1})
+            api("put", f"/{service_id}/users/user{i}", {"properties": {"name": f"user{i}"}})
+
+
+def test_purge_job_deletes_every_key_of_service(api, redis_client):
+    fill_services(api)
+    other_keys = sorted(service_keys(redis_client, "other"))
+    assert service_keys(redis_client, "svc")
+
+    result = lambda_handler.handler({"job": "purge_service", "service": "svc"}, None)
+    assert result["complete"]
+    assert service_keys(redis_client, "svc") == []
+    assert sorted(service_keys(redis_client, "other")) == other_keys
+    assert api.admin("get", "/svc/leaderboards")[1]["leaderboards"] == []
+    assert api("get", "/svc/leaderboards/board/user1")[0] == 404
+
+
+def test_interrupted_purge_keeps_index_until_complete(api, redis_client, monkeypatch):
+    fill_services(api)
+    monkeypatch.setattr(lambda_handler, "CLEANUP_BATCH_SIZE", 1)
+    monkeypatch.setattr(lambda_handler, "CLEANUP_SECONDS", -1)
+
+    # 실행 시간이 지나면 중단하고 리더보드 목록은 남겨서 같은 event로 다시 실행
+    result = lambda_handler.handler({"job": "purge_service", "service": "svc"}, None)
+    assert not result["complete"] and result["deleted"] == 1
+    assert redis_client.exists(leaderboard_index_str("svc"))
+
+    for _ in range(100):
+        if lambda_handler.handler({"job": "purge_service", "service": "svc"}, None)["complete"]:
+            break
+    assert service_keys(redis_client, "svc") == []
+    assert service_keys(redis_client, "other")
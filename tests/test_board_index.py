@@ -0,0 +1,48 @@
+def list_page(api, limit, cursor=None):
+    query = {"limit": limit}
+    if cursor is not None:
+        query["cursor"] = cursor
+    status, body, _ = api.admin("get", "/svc/leaderboards", query=query)
+    assert status == 200
+    return [(board["leaderBoardId"], board["cardinality"]) for board in body["leaderboards"]], body["cursor"]
+
+
+def test_list_pages_with_cursor(api):
+    # 숫자 형태의 리더보드 id도 cursor로 그대로 사용
+    for board in ["10", "2", "alpha", "beta", "gamma"]:
+        api("put", f"/svc/leaderboards/{board}/alice", {"score": 10})
+    api("put", "/svc/leaderboards/beta/bob", {"score": 20})
+    api("put", "/other/leaderboards/delta/alice", {"score": 10})
+
+    boards, cursor = list_page(api, 2)
+    assert boards == [("10", 1), ("2", 1)] and cursor == "2"
+    boards, cursor = list_page(api, 2, cursor)
+    assert boards == [("alpha", 1), ("beta", 2)] and cursor == "beta"
+    boards, cursor = list_page(api, 2, cursor)
+    assert boards == [("gamma", 1)] and cursor == ""
+
+    assert list_page(api, 10) == ([("10", 1), ("2", 1), ("alpha", 1), ("beta", 2), ("gamma", 1)], "")
+
+
+def test_list_page_after_full_last_page_is_empty(api):
+    for board in ["alpha", "beta"]:
+        api("put", f"/svc/leaderboards/{board}/alice", {"score": 10})
+
+    # 마지막 페이지가 limit 만큼 채워지면 다음 페이지가 비어있는 것을 조회해야 알 수 있음
+    assert list_page(api, 2) == ([("alpha", 1), ("beta", 1)], "beta")
+    assert list_page(api, 2, "beta") == ([], "")
+
+
+def test_list_sums_cardinality_of_shards_and_skips_removed_boards(api):
+    assert api.admin("put", "/svc/leaderboards/sharded", {"shards": 4})[0] == 200
+    for i in range(6):
+        api("put", f"/svc/leaderboards/sharded/user{i}", {"score": i + 1})
+    api("put", "/svc/leaderboards/removed/alice", {"score": 10})
+    assert api.admin("delete", "/svc/leaderboards/removed")[0] == 200
+
+    assert list_page(api, 10) == ([("sharded", 6)], "")
+
+
+def test_list_requires_admin_token(api):
+    assert api("get", "/svc/leaderboards")[0] == 403
+    assert api.admin("get", "/svc/leaderboards", query={"limit": 0})[0] == 400
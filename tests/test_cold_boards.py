@@ -0,0 +1,70 @@
+import time
+import pytest
+import lambda_handler
+import cold_boards
+from backup_storage import create_backup_storage
+from leaderboard_keys import leaderboard_config_str
+from leaderboard_exceptions import ServiceUnavailableException
+
+
+def offload(api, redis_client, users: int = 3):
+    for i in range(users):
+        api("put", f"/svc/leaderboards/board/user{i}", {"score": (i + 1) * 10})
+    storage = create_backup_storage(lambda_handler.BACKUP_LOCATION)
+    assert cold_boards.offload_board(redis_client, storage, "svc", "board", int(time.time()), 2) is not None
+    assert redis_client.hexists(leaderboard_config_str("svc", "board"), "offloaded")
+    # 옮겨지는 리더보드는 container에 cache된 설정이 만료된 뒤에 접근됨
+    lambda_handler.board_config_cache.entries.clear()
+    return storage
+
+
+def test_offloaded_board_is_restored_on_access(api, redis_client, storage_mode):
+    offload(api, redis_client)
+
+    status, body, _ = api("get", "/svc/leaderboards/board/top")
+    assert status == 200
+    assert [(entry["userId"], entry["score"]) for entry in body] == [("user2", 30), ("user1", 20), ("user0", 10)]
+    assert not redis_client.hexists(leaderboard_config_str("svc", "board"), "offloaded")
+
+
+def test_request_waiting_for_restore_gets_503(api, redis_client, monkeypatch):
+    offload(api, redis_client)
+    lock_key = cold_boards.restore_lock_key(leaderboard_config_str("svc", "board"))
+    redis_client.set(lock_key, 1)
+    monkeypatch.setattr(lambda_handler, "COLD_RESTORE_WAIT_SECONDS", 0.1)
+
+    status, body, headers = api("get", "/svc/leaderboards/board/top")
+    assert status == 503
+    assert headers["Retry-After"] == "1"
+    assert redis_client.hexists(leaderboard_config_str("svc", "board"), "offloaded")
+
+    redis_client.delete(lock_key)
+    assert api("get", "/svc/leaderboards/board/user0")[1]["score"] == 10
+
+
+def test_restore_keeps_the_lock_while_importing(api, redis_client):
+    storage = offload(api, redis_client, users=6)
+    lock_key = cold_boards.restore_lock_key(leaderboard_config_str("svc", "board"))
+    read = storage.read
+    lock_ttls = []
+
+    # chunk를 읽을 때마다 lock이 곧 만료되도록 줄이고, 다음 chunk에서 연장되었는지 확인
+    def read_and_expire(name):
+        if "chunk" in name:
+            lock_ttls.append(redis_client.pttl(lock_key))
+            redis_client.pexpire(lock_key, 10)
+        return read(name)
+
+    storage.read = read_and_expire
+    assert cold_boards.restore_board(redis_client, storage, "svc", "board", 100, 0)["members"] == 6
+    assert len(lock_ttls) > 1
+    assert all(ttl > 10 for ttl in lock_ttls)
+    assert not redis_client.exists(lock_key)
+
+
+def test_restore_board_raises_when_wait_times_out(api, redis_client):
+    storage = offload(api, redis_client)
+    redis_client.set(cold_boards.restore_lock_key(leaderboard_config_str("svc", "board")), 1)
+
+    with pytest.raises(ServiceUnavailableException):
+        cold_boards.restore_board(redis_client, storage, "svc", "board", 100, 0.1)
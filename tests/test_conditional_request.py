@@ -0,0 +1,57 @@
+import datetime as pydatetime
+import lambda_handler
+import windowed_leaderboard as windowed
+
+
+def get_top(api, etag=None, query=None, board="board"):
+    return api("get", f"/svc/leaderboards/{board}/top", query=query, headers={"If-None-Match": etag} if etag else None)
+
+
+def test_unchanged_board_is_not_modified(api):
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    status, _, headers = get_top(api)
+    assert status == 200
+
+    assert get_top(api, headers["ETag"])[0] == 304
+
+    api("put", "/svc/leaderboards/board/bob", {"score": 20})
+    assert get_top(api, headers["ETag"])[0] == 200
+
+
+def test_etag_depends_on_properties_selection(api):
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    etag = get_top(api)[2]["ETag"]
+    properties_etag = get_top(api, query={"properties": "true"})[2]["ETag"]
+    fields_etag = get_top(api, query={"properties": "true", "fields": "name"})[2]["ETag"]
+
+    assert len({etag, properties_etag, fields_etag}) == 3
+    assert get_top(api, etag, query={"properties": "true"})[0] == 200
+    assert get_top(api, properties_etag, query={"properties": "true", "fields": "name"})[0] == 200
+
+
+def test_etag_differs_between_window_periods(api, monkeypatch):
+    api.admin("put", "/svc/leaderboards/board", {"windows": ["daily"]})
+
+    today = windowed.window_now(0)
+    monkeypatch.setattr(windowed, "window_now", lambda offset: today)
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    etag = get_top(api, query={"window": "daily"})[2]["ETag"]
+
+    monkeypatch.setattr(windowed, "window_now", lambda offset: today + pydatetime.timedelta(days=1))
+    api("put", "/svc/leaderboards/board/bob", {"score": 20})
+    status, body, _ = get_top(api, etag, query={"window": "daily"})
+
+    assert status == 200
+    assert [entry["userId"] for entry in body] == ["bob"]
+
+
+def test_etag_differs_for_recreated_board(api, monkeypatch):
+    monkeypatch.setattr(lambda_handler, "get_reverse_timestamp", lambda: 3000000000)
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    etag = get_top(api)[2]["ETag"]
+
+    lambda_handler.run_job({"job": "purge_service", "service": "svc"})
+    monkeypatch.setattr(lambda_handler, "get_reverse_timestamp", lambda: 2999999000)
+    api("put", "/svc/leaderboards/board/bob", {"score": 10})
+
+    assert get_top(api, etag)[0] == 200
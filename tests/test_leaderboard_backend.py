@@ -0,0 +1,60 @@
+import time
+import random
+import pytest
+from leaderboard_backend import MemoryBackend, RedisBackend
+from score_policy import SCORE_POLICIES
+
+
+# 같은 요청을 memory backend와 redis backend에 보내고 응답이 같은지 비교
+class Both:
+    def __init__(self, redis_client, storage_mode: str):
+        self.backends = [MemoryBackend(), RedisBackend(redis_client, storage_mode)]
+
+    def __getattr__(self, name):
+        def call(*args):
+            results = [getattr(backend, name)(*args) for backend in self.backends]
+            assert results[0] == results[1], (name, args)
+            return results[0]
+        return call
+
+
+@pytest.fixture
+def both(redis_client, storage_mode):
+    return Both(redis_client, storage_mode)
+
+
+@pytest.mark.parametrize("policy", SCORE_POLICIES)
+def test_memory_backend_matches_redis_backend(both, policy):
+    generator = random.Random(policy)
+    users = [f"user{i}" for i in range(12)]
+    windows = [("board:daily:20270101", int(time.time()) + 86400)]
+    timestamp = 3000000000
+
+    for step in range(120):
+        user_id = generator.choice(users)
+        operation = generator.random()
+        if operation < 0.4:
+            both.put_score("svc", "board", user_id, generator.randint(1, 20), timestamp, policy, windows)
+        elif operation < 0.6:
+            scores = [{"userId": generator.choice(users), "score": generator.randint(1, 20)} for _ in range(4)]
+            both.put_scores("svc", "board", scores, timestamp, policy, windows)
+        elif operation < 0.7:
+            both.delete_score("svc", "board", user_id, windows)
+        elif operation < 0.75:
+            both.put_properties("svc", user_id, {"name": user_id.upper(), "level": step})
+
+        # 같은 timestamp로 기록된 동점자가 생기도록 timestamp는 가끔씩만 감소
+        if generator.random() < 0.3:
+            timestamp -= 1
+
+        if step % 4 != 3:
+            continue
+        for board_id, _ in [("board", None), *windows]:
+            both.get_range("svc", board_id, 0, 20)
+            both.get_range("svc", board_id, generator.randint(0, 10), generator.randint(1, 5), ["name"])
+            both.get_rank("svc", board_id, user_id)
+            both.get_around("svc", board_id, user_id, 2, [])
+            both.get_ranks("svc", board_id, generator.sample(users, 5))
+            both.cardinality("svc", board_id)
+        both.get_user_ranks("svc", ["board", windows[0][0], "missing"], user_id, ["level"])
+        both.list_boards("svc", "", 10)
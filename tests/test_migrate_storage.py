@@ -0,0 +1,51 @@
+import pytest
+import lambda_handler
+import migrate_storage
+from leaderboard_keys import leaderboard_str, leaderboard_timestamp_str, leaderboard_staging_str, leaderboard_migrating_str
+
+
+def top(api, board="board"):
+    status, body, _ = api("get", f"/svc/leaderboards/{board}/top")
+    assert status == 200
+    return [(entry["userId"], entry["score"]) for entry in body]
+
+
+def test_orphaned_timestamp_entries_are_removed_while_migrating(api, redis_client):
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    # 이전 버전의 점수 삭제가 sorted set member만 제거하고 남긴 timestamp hash 항목
+    redis_client.hset(leaderboard_timestamp_str("svc", "board"), "ghost", 3000000000)
+
+    migrate_storage.migrate_board(redis_client, "svc", "board", 100, 0)
+
+    assert not redis_client.exists(leaderboard_timestamp_str("svc", "board"))
+    assert not redis_client.exists(leaderboard_migrating_str("svc", "board"))
+    assert top(api) == [("alice", 10)]
+
+
+def test_failed_migration_is_aborted(api, redis_client, monkeypatch):
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    monkeypatch.setattr(migrate_storage, "script_migrate_swap", lambda client, keys: 0)
+
+    with pytest.raises(RuntimeError, match="aborted"):
+        migrate_storage.migrate_board(redis_client, "svc", "board", 100, 0)
+
+    assert not redis_client.exists(leaderboard_migrating_str("svc", "board"))
+    assert not redis_client.exists(leaderboard_staging_str("svc", "board"))
+    api("put", "/svc/leaderboards/board/bob", {"score": 20})
+    assert not redis_client.exists(leaderboard_staging_str("svc", "board"))
+    assert top(api) == [("bob", 20), ("alice", 10)]
+
+
+def test_migrated_window_board_keeps_expiry(api, redis_client):
+    assert api.admin("put", "/svc/leaderboards/board", {"windows": ["daily"]})[0] == 200
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    window_board, _ = lambda_handler.window_targets("svc", "board")[0]
+    ttl = redis_client.pttl(leaderboard_str("svc", window_board))
+    assert ttl > 0
+
+    assert window_board in set(migrate_storage.find_timestamp_boards(redis_client, "svc"))
+    migrate_storage.migrate_board(redis_client, "svc", window_board, 100, 0)
+
+    assert not redis_client.exists(leaderboard_timestamp_str("svc", window_board))
+    assert 0 < redis_client.pttl(leaderboard_str("svc", window_board)) <= ttl
+    assert top(api, window_board) == [("alice", 10)]
@@ -0,0 +1,71 @@
+import pytest
+
+
+def percentile(api, user_id, board="board", query=None):
+    status, body, _ = api("get", f"/svc/leaderboards/{board}/{user_id}/percentile", query=query)
+    assert status == 200
+    return body
+
+
+def put_scores(api, board="board", count=10):
+    for i in range(count):
+        api("put", f"/svc/leaderboards/{board}/user{i}", {"score": (i + 1) * 100})
+
+
+@pytest.mark.parametrize("shards", [1, 3])
+def test_max_policy_percentile_counts_higher_scores(api, storage_mode, shards):
+    assert api.admin("put", "/svc/leaderboards/board", {"shards": shards})[0] == 200
+    put_scores(api)
+
+    body = percentile(api, "user8")
+    assert body["score"] == 900 and body["rank"] == 2
+    assert body["rankBucket"] == {"min": 2, "max": 2}
+    assert body["percentile"] == 20.0 and body["cardinality"] == 10
+
+    # 기록된 점수보다 낮은 점수는 반영되지 않으므로 histogram도 그대로
+    api("put", "/svc/leaderboards/board/user8", {"score": 50})
+    assert percentile(api, "user8")["rank"] == 2
+    api("put", "/svc/leaderboards/board/user8", {"score": 5000})
+    assert percentile(api, "user8")["rank"] == 1
+    assert percentile(api, "user9")["rank"] == 2
+
+
+def test_sum_policy_percentile_uses_accumulated_score(api, storage_mode):
+    assert api.admin("put", "/svc/leaderboards/board", {"policy": "sum"})[0] == 200
+    put_scores(api)
+
+    # 더한 점수의 bucket으로 옮겨지고 유저 수는 그대로
+    api("put", "/svc/leaderboards/board/user0", {"score": 850})
+    api("post", "/svc/leaderboards/board/scores", {"scores": [{"userId": "user1", "score": 900}, {"userId": "user1", "score": 100}]})
+
+    body = percentile(api, "user0")
+    assert body["score"] == 950 and body["rank"] == 3 and body["cardinality"] == 10
+    body = percentile(api, "user1")
+    assert body["score"] == 1200 and body["rank"] == 1 and body["percentile"] == 10.0
+
+
+def test_latest_policy_percentile_follows_lowered_score(api, storage_mode):
+    assert api.admin("put", "/svc/leaderboards/board", {"policy": "latest"})[0] == 200
+    put_scores(api)
+
+    api("put", "/svc/leaderboards/board/user9", {"score": 150})
+    body = percentile(api, "user9")
+    assert body["score"] == 150 and body["rank"] == 9 and body["percentile"] == 90.0
+
+
+def test_percentile_after_delete_and_of_unknown_user(api, storage_mode):
+    put_scores(api)
+    assert api("delete", "/svc/leaderboards/board/user9")[0] == 200
+
+    body = percentile(api, "user8")
+    assert body["rank"] == 1 and body["cardinality"] == 9
+    assert api("get", "/svc/leaderboards/board/user9/percentile")[0] == 404
+    assert api("get", "/svc/leaderboards/nothing/user0/percentile")[0] == 404
+
+
+def test_window_board_percentile(api, storage_mode):
+    assert api.admin("put", "/svc/leaderboards/board", {"windows": ["daily"]})[0] == 200
+    put_scores(api, count=4)
+
+    body = percentile(api, "user1", query={"window": "daily"})
+    assert body["score"] == 200 and body["rank"] == 3 and body["cardinality"] == 4
@@ -0,0 +1,79 @@
+import pytest
+import lambda_handler
+import response_cache
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ResponseCache(2, 60)
+    monkeypatch.setattr(lambda_handler, "TOP_CACHE_MAX_ENTRIES", 2)
+    monkeypatch.setattr(lambda_handler, "top_rank_cache", cache)
+    return cache
+
+
+def top(api, limit=10):
+    status, body, _ = api("get", "/svc/leaderboards/board/top", query={"limit": limit})
+    assert status == 200
+    return [(entry["userId"], entry["score"]) for entry in body]
+
+
+def test_repeated_top_read_is_served_from_cache(api, cache, storage_mode):
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+
+    assert top(api) == [("alice", 10)]
+    assert top(api) == [("alice", 10)]
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_write_invalidates_cached_top(api, cache, storage_mode):
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    top(api)
+    top(api)
+
+    # 쓰기로 리더보드 version이 바뀌면 cache 된 응답을 사용하지 않음
+    api("put", "/svc/leaderboards/board/alice", {"score": 30})
+    assert top(api) == [("alice", 30)]
+    api("post", "/svc/leaderboards/board/scores", {"scores": [{"userId": "bob", "score": 20}]})
+    assert top(api) == [("alice", 30), ("bob", 20)]
+    api("delete", "/svc/leaderboards/board/alice")
+    assert top(api) == [("bob", 20)]
+    assert cache.stats()["hits"] == 1
+
+
+def test_least_recently_used_page_is_evicted(api, cache):
+    for i in range(3):
+        api("put", f"/svc/leaderboards/board/user{i}", {"score": i})
+
+    top(api, 1)
+    top(api, 2)
+    top(api, 1)
+    top(api, 3)
+    assert cache.stats() == {"entries": 2, "hits": 1, "misses": 3, "evictions": 1}
+
+    # 가장 오래 사용되지 않은 limit=2 페이지가 제거됨
+    top(api, 1)
+    top(api, 3)
+    assert cache.stats()["hits"] == 3
+    assert top(api, 2) == [("user2", 2), ("user1", 1)]
+    assert cache.stats()["misses"] == 4
+
+
+def test_expired_entry_is_not_used(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(2, 1)
+    cache.put("key", "version", ["value"])
+
+    assert cache.get("key", "version") == ["value"]
+    assert cache.get("key", "other version") is None
+    cache.put("key", "version", ["value"])
+    now[0] += 1
+    assert cache.get("key", "version") is None
+    assert cache.stats() == {"entries": 0, "hits": 1, "misses": 2, "evictions": 0}
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResponseCache(0, 1)
+    cache.put("key", "version", ["value"])
+    assert cache.get("key", "version") is None
@@ -0,0 +1,77 @@
+import json
+import lambda_handler
+from router import Router
+
+
+def test_static_segment_takes_priority_over_parameter(api):
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    # PUT에는 /top route가 없으므로 "top"은 사용자 ID로 처리
+    assert api("put", "/svc/leaderboards/board/top", {"score": 20})[0] == 200
+
+    status, body, _ = api("get", "/svc/leaderboards/board/top")
+    assert status == 200
+    assert [entry["userId"] for entry in body] == ["top", "alice"]
+    assert api("get", "/svc/leaderboards/board/alice")[1] == {"userId": "alice", "rank": 2, "score": 10}
+
+
+def test_unknown_path_is_not_found(api):
+    assert api("get", "/svc/unknown")[:2] == (404, {"message": "Not Found"})
+    assert api("get", "/svc/leaderboards/board/alice/around/more")[0] == 404
+    assert api("get", "/svc/leaderboards//alice")[0] == 404
+
+
+def test_other_method_of_known_path_is_not_allowed(api):
+    status, body, headers = api("delete", "/svc/leaderboards/board/alice/around")
+    assert (status, body) == (405, {"message": "Method Not Allowed"})
+    assert headers["Allow"] == "GET"
+
+    status, _, headers = api("post", "/svc/leaderboards/board")
+    assert status == 405
+    assert headers["Allow"] == "DELETE, GET, PUT"
+
+
+def test_path_parameters_are_passed_verbatim(api):
+    for user_id in ["유저", "alice.smith@example.com", "a+b"]:
+        assert api("put", f"/svc/leaderboards/board/{user_id}", {"score": 10})[0] == 200
+        assert api("get", f"/svc/leaderboards/board/{user_id}")[1]["userId"] == user_id
+
+
+def test_proxy_path_parameter_is_preferred_over_path(api):
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    # custom domain의 base path가 포함된 path 대신 {proxy+} path를 사용
+    event = {"httpMethod": "GET", "path": "/v1/svc/leaderboards/board/alice", "headers": {},
+             "pathParameters": {"proxy": "svc/leaderboards/board/alice"}, "queryStringParameters": None, "body": None}
+    response = lambda_handler.handler(event, None)
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["userId"] == "alice"
+
+
+def test_query_parameters_are_parsed_as_json(api):
+    for i in range(5):
+        api("put", f"/svc/leaderboards/board/user{i}", {"score": i})
+
+    # 숫자는 json으로 해석하고, 조회하지 않는 parameter는 해석할 수 없는 값이어도 무시
+    status, body, _ = api("get", "/svc/leaderboards/board/top", query={"offset": "1", "limit": "2", "unused": "{"})
+    assert status == 200
+    assert [entry["userId"] for entry in body] == ["user3", "user2"]
+
+    # json으로 해석할 수 없는 값은 문자열 그대로 사용
+    status, body, _ = api("get", "/svc/users/user1/ranks", query={"boards": "board"})
+    assert status == 200
+    assert body["ranks"] == [{"leaderBoardId": "board", "rank": 4, "score": 1}]
+
+
+def test_query_parameters_are_parsed_only_when_read():
+    router = Router()
+    seen = {}
+
+    @router.handle("get", "/<string:name>")
+    def route(event, name):
+        query = event["json"]["query"]
+        seen.update(limit=query.get("limit"), missing=query.get("missing", 7), text=query.get("text"))
+        return {"name": name}
+
+    event = {"httpMethod": "GET", "path": "/board", "queryStringParameters": {"limit": "10", "text": "top", "unused": "{"}}
+    assert router(event) == {"statusCode": 200, "headers": {}, "body": json.dumps({"name": "board"})}
+    assert seen == {"limit": 10, "missing": 7, "text": "top"}
+    assert event["json"]["query"].parsed == {"limit": 10, "text": "top"}
@@ -0,0 +1,101 @@
+import lambda_handler
+import migrate_storage
+
+
+def top(api, board="board", query=None):
+    status, body, _ = api("get", f"/svc/leaderboards/{board}/top", query=query)
+    assert status == 200
+    return [(entry["userId"], entry["score"]) for entry in body]
+
+
+def min_board(api, board="board", **config):
+    assert api.admin("put", f"/svc/leaderboards/{board}", {"policy": "min", **config})[0] == 200
+
+
+def test_min_policy_ranks_lowest_score_first(api, storage_mode):
+    min_board(api)
+    api("put", "/svc/leaderboards/board/alice", {"score": 30})
+    api("put", "/svc/leaderboards/board/bob", {"score": 10})
+    api("post", "/svc/leaderboards/board/scores", {"scores": [{"userId": "carol", "score": 20}, {"userId": "alice", "score": 25}]})
+
+    assert top(api) == [("bob", 10), ("carol", 20), ("alice", 25)]
+    assert api("get", "/svc/leaderboards/board/alice")[1] == {"userId": "alice", "rank": 3, "score": 25}
+    assert api("put", "/svc/leaderboards/board/bob", {"score": 15})[1] == {"prevScore": 10}
+
+    status, body, _ = api("get", "/svc/leaderboards/board/carol/around", query={"limit": 1})
+    assert status == 200
+    assert [entry["userId"] for entry in body] == ["bob", "carol", "alice"]
+
+    status, body, _ = api("get", "/svc/users/alice/ranks", query={"boards": "board"})
+    assert status == 200
+    assert body["ranks"] == [{"leaderBoardId": "board", "rank": 3, "score": 25}]
+
+
+def test_min_policy_ranks_earlier_update_first_on_ties(api, storage_mode, monkeypatch):
+    min_board(api)
+    timestamps = iter([3000000002, 3000000001])
+    monkeypatch.setattr(lambda_handler, "get_reverse_timestamp", lambda: next(timestamps))
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    api("put", "/svc/leaderboards/board/bob", {"score": 10})
+
+    assert top(api) == [("alice", 10), ("bob", 10)]
+
+
+def test_min_policy_percentile_counts_lower_scores(api, storage_mode):
+    min_board(api)
+    for i in range(10):
+        api("put", f"/svc/leaderboards/board/user{i}", {"score": (i + 1) * 100})
+
+    status, body, _ = api("get", "/svc/leaderboards/board/user1/percentile")
+    assert status == 200
+    assert body["rank"] == 2 and body["score"] == 200
+
+
+def test_sharded_min_policy_ranks_lowest_score_first(api):
+    min_board(api, shards=3)
+    for i in range(8):
+        api("put", f"/svc/leaderboards/board/user{i}", {"score": 80 - i * 10})
+
+    assert top(api) == [(f"user{i}", 80 - i * 10) for i in reversed(range(8))]
+    assert api("get", "/svc/leaderboards/board/user6")[1] == {"userId": "user6", "rank": 2, "score": 20}
+
+
+def test_window_board_follows_min_policy(api, storage_mode):
+    min_board(api, windows=["daily"])
+    api("put", "/svc/leaderboards/board/alice", {"score": 30})
+    api("put", "/svc/leaderboards/board/bob", {"score": 10})
+
+    assert top(api, query={"window": "daily"}) == [("bob", 10), ("alice", 30)]
+
+
+def test_migrated_min_board_keeps_order(api, redis_client, monkeypatch):
+    monkeypatch.setattr(lambda_handler, "STORAGE_MODE", "timestamp")
+    monkeypatch.setattr(lambda_handler.backend, "storage_mode", "timestamp")
+    min_board(api)
+    api("put", "/svc/leaderboards/board/alice", {"score": 30})
+    api("put", "/svc/leaderboards/board/bob", {"score": 10})
+
+    migrate_storage.migrate_board(redis_client, "svc", "board", 100, 0)
+    assert top(api) == [("bob", 10), ("alice", 30)]
+
+
+def test_min_policy_can_not_be_switched_on_board_with_scores(api, storage_mode):
+    api("put", "/svc/leaderboards/board/alice", {"score": 30})
+
+    assert api.admin("put", "/svc/leaderboards/board", {"policy": "min"})[0] == 400
+    assert api.admin("put", "/svc/leaderboards/board", {"policy": "sum"})[0] == 200
+
+    min_board(api, "other")
+    api("put", "/svc/leaderboards/other/alice", {"score": 30})
+    assert api.admin("put", "/svc/leaderboards/other", {"policy": "max"})[0] == 400
+
+
+def test_sum_policy_rejects_negative_delta(api, storage_mode):
+    assert api.admin("put", "/svc/leaderboards/board", {"policy": "sum"})[0] == 200
+    api("put", "/svc/leaderboards/board/alice", {"score": 30})
+
+    # 누적 점수는 증가만 가능하고, 감소 요청은 batch 전체를 기록하지 않음
+    assert api("put", "/svc/leaderboards/board/alice", {"score": -10})[0] == 400
+    scores = [{"userId": "bob", "score": 5}, {"userId": "alice", "score": -10}]
+    assert api("post", "/svc/leaderboards/board/scores", {"scores": scores})[0] == 400
+    assert top(api) == [("alice", 30)]
@@ -0,0 +1,64 @@
+import json
+import pytest
+import lambda_handler
+from redis.exceptions import ConnectionError
+from score_queue import score_event, batch_score_messages
+
+
+def sqs_event(messages: dict):
+    return {"Records": [{"eventSource": "aws:sqs", "messageId": message_id, "body": json.dumps(events)}
+                        for message_id, events in messages.items()]}
+
+
+def scores(api, board="board"):
+    status, body, _ = api("get", f"/svc/leaderboards/{board}/top")
+    assert status == 200
+    return {entry["userId"]: entry["score"] for entry in body}
+
+
+def test_queued_scores_are_merged_by_policy(api, storage_mode):
+    assert api.admin("put", "/svc/leaderboards/board", {"policy": "sum"})[0] == 200
+    result = lambda_handler.handler(sqs_event({
+        "m1": [score_event("svc", "board", "alice", 10), score_event("svc", "board", "bob", 5)],
+        "m2": [score_event("svc", "board", "alice", 20)],
+    }), None)
+
+    assert result == {"batchItemFailures": []}
+    assert scores(api) == {"alice": 30, "bob": 5}
+
+
+def test_only_messages_of_failed_batch_are_redelivered(api, storage_mode, monkeypatch):
+    assert api.admin("put", "/svc/leaderboards/board", {"policy": "sum"})[0] == 200
+    write_scores = lambda_handler.write_scores
+
+    def failing_write_scores(service_id, leader_board_id, batch, shards):
+        if leader_board_id == "broken":
+            raise ConnectionError("connection lost")
+        return write_scores(service_id, leader_board_id, batch, shards)
+
+    monkeypatch.setattr(lambda_handler, "write_scores", failing_write_scores)
+    result = lambda_handler.handler(sqs_event({
+        "m1": [score_event("svc", "board", "alice", 10)],
+        "m2": [score_event("svc", "broken", "alice", 10)],
+        "m3": [score_event("svc", "board", "alice", 5)],
+    }), None)
+
+    assert result == {"batchItemFailures": [{"itemIdentifier": "m2"}]}
+    assert scores(api) == {"alice": 15}
+    assert scores(api, "broken") == {}
+
+
+def test_messages_are_not_split_across_batches():
+    messages = [(str(i), [score_event("svc", "board", f"user{i}-{j}", 1) for j in range(3)]) for i in range(4)]
+    messages.append(("other", [score_event("svc", "other", "alice", 1)]))
+
+    batches = batch_score_messages(messages, 7)
+
+    assert [(board, message_ids, len(events)) for board, message_ids, events in batches] == [
+        (("svc", "board"), ["0", "1"], 6), (("svc", "board"), ["2", "3"], 6), (("svc", "other"), ["other"], 1)]
+
+
+def test_drain_requires_memory_queue(monkeypatch):
+    monkeypatch.setattr(lambda_handler, "score_queue", None)
+    with pytest.raises(ValueError, match="SCORE_QUEUE=memory"):
+        lambda_handler.run_job({"job": "drain_score_queue"})
@@ -0,0 +1,100 @@
+import pytest
+import lambda_handler
+
+
+def top(api, board="board"):
+    status, body, _ = api("get", f"/svc/leaderboards/{board}/top")
+    assert status == 200
+    return [(entry["userId"], entry["score"]) for entry in body]
+
+
+def test_put_score_keeps_highest_score(api, storage_mode):
+    assert api("put", "/svc/leaderboards/board/alice", {"score": 10})[1] == {"prevScore": 0}
+    assert api("put", "/svc/leaderboards/board/bob", {"score": 20})[1] == {"prevScore": 0}
+    assert api("put", "/svc/leaderboards/board/alice", {"score": 5})[1] == {"prevScore": 10}
+
+    assert top(api) == [("bob", 20), ("alice", 10)]
+    status, body, _ = api("get", "/svc/leaderboards/board/alice")
+    assert (status, body) == (200, {"userId": "alice", "rank": 2, "score": 10})
+
+
+def test_equal_scores_rank_earlier_update_first(api, storage_mode, monkeypatch):
+    timestamps = iter([3000000002, 3000000001])
+    monkeypatch.setattr(lambda_handler, "get_reverse_timestamp", lambda: next(timestamps))
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    api("put", "/svc/leaderboards/board/bob", {"score": 10})
+
+    assert top(api) == [("alice", 10), ("bob", 10)]
+
+
+def test_put_scores_returns_previous_scores(api, storage_mode):
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    status, body, _ = api("post", "/svc/leaderboards/board/scores",
+                          {"scores": [{"userId": "alice", "score": 30}, {"userId": "bob", "score": 20}]})
+
+    assert status == 200
+    assert body == [{"userId": "alice", "prevScore": 10}, {"userId": "bob", "prevScore": 0}]
+    assert top(api) == [("alice", 30), ("bob", 20)]
+
+
+def test_put_scores_rejects_too_many_entries(api, storage_mode):
+    scores = [{"userId": f"user{i}", "score": i + 1} for i in range(101)]
+    status, _, _ = api("post", "/svc/leaderboards/board/scores", {"scores": scores})
+
+    assert status == 400
+    assert top(api) == []
+
+
+def test_delete_score(api, storage_mode):
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    api("put", "/svc/leaderboards/board/bob", {"score": 20})
+
+    assert api("delete", "/svc/leaderboards/board/alice")[0] == 200
+    assert api("get", "/svc/leaderboards/board/alice")[0] == 404
+    assert top(api) == [("bob", 20)]
+    assert api("get", "/svc/leaderboards/board")[1]["cardinality"] == 1
+
+
+def test_around(api, storage_mode):
+    for i, user_id in enumerate(["a", "b", "c", "d", "e"]):
+        api("put", f"/svc/leaderboards/board/{user_id}", {"score": 50 - i * 10})
+
+    status, body, _ = api("get", "/svc/leaderboards/board/c/around", query={"limit": 1})
+    assert status == 200
+    assert [(entry["rank"], entry["userId"]) for entry in body] == [(2, "b"), (3, "c"), (4, "d")]
+
+
+def test_delete_leader_board_requires_admin_token(api, storage_mode):
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+
+    assert api("delete", "/svc/leaderboards/board")[0] == 403
+    assert api.admin("delete", "/svc/leaderboards/board")[0] == 200
+    assert top(api) == []
+    assert api.admin("get", "/svc/leaderboards")[1]["leaderboards"] == []
+
+
+def test_negative_score_is_rejected(api, storage_mode):
+    assert api("put", "/svc/leaderboards/board/alice", {"score": -1})[0] == 400
+
+
+@pytest.mark.parametrize("body", [
+    [{"userId": "alice", "score": 10}],
+    {"scores": {"userId": "alice", "score": 10}},
+    {"scores": ["alice"]},
+    {"scores": [{"userId": "alice"}]},
+    {"scores": [{"userId": "alice", "score": "10"}]},
+    {"scores": [{"userId": "alice", "score": True}]},
+    {"scores": [{"userId": "alice", "score": float("nan")}]},
+    {"scores": [{"userId": 7, "score": 10}]},
+])
+def test_put_scores_rejects_malformed_body(api, body):
+    status, _, _ = api("post", "/svc/leaderboards/board/scores", body)
+
+    assert status == 400
+    assert top(api) == []
+
+
+def test_put_score_rejects_non_numeric_score(api):
+    assert api("put", "/svc/leaderboards/board/alice", {"score": "10"})[0] == 400
+    assert api("put", "/svc/leaderboards/board/alice", [10])[0] == 400
+    assert top(api) == []
@@ -0,0 +1,17 @@
+from script_registry import script_registry
+
+
+def test_scripts_are_reloaded_after_script_flush(api, redis_client):
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    fallback_count = script_registry.noscript_fallback_count
+
+    # failover 등으로 script cache가 비워져도 다시 load 후 한번만 재시도하여 응답
+    redis_client.script_flush()
+    assert api("put", "/svc/leaderboards/board/bob", {"score": 20})[0] == 200
+    assert script_registry.noscript_fallback_count == fallback_count + 1
+
+    # 모든 script가 다시 load 되었으므로 다른 script 호출은 fallback 없이 실행
+    assert api("delete", "/svc/leaderboards/board/alice")[0] == 200
+    assert api("put", "/svc/leaderboards/board/carol", {"score": 30})[0] == 200
+    assert script_registry.noscript_fallback_count == fallback_count + 1
+    assert [entry["userId"] for entry in api("get", "/svc/leaderboards/board/top")[1]] == ["carol", "bob"]
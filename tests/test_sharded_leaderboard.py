@@ -0,0 +1,82 @@
+import random
+import itertools
+import pytest
+import lambda_handler
+
+
+def board_ids(api):
+    status, body, _ = api.admin("get", "/svc/leaderboards")
+    assert status == 200
+    return [board["leaderBoardId"] for board in body["leaderboards"]]
+
+
+def test_sharded_board_is_removed_from_index_when_emptied(api):
+    assert api.admin("put", "/svc/leaderboards/board", {"shards": 4})[0] == 200
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    api("put", "/svc/leaderboards/board/bob", {"score": 20})
+
+    assert api("delete", "/svc/leaderboards/board/alice")[0] == 200
+    assert board_ids(api) == ["board"]
+
+    assert api("delete", "/svc/leaderboards/board/bob")[0] == 200
+    assert board_ids(api) == []
+    assert api("get", "/svc/leaderboards/board")[1]["shards"] == 4
+
+    api("put", "/svc/leaderboards/board/carol", {"score": 5})
+    assert board_ids(api) == ["board"]
+
+
+def test_sharded_top_offset_is_capped(api, monkeypatch):
+    monkeypatch.setattr(lambda_handler, "MAX_SHARDED_TOP_OFFSET", 10)
+    assert api.admin("put", "/svc/leaderboards/sharded", {"shards": 4})[0] == 200
+    api("put", "/svc/leaderboards/sharded/alice", {"score": 10})
+    api("put", "/svc/leaderboards/single/alice", {"score": 10})
+
+    assert api("get", "/svc/leaderboards/sharded/top", query={"offset": 10})[:2] == (200, [])
+    assert api("get", "/svc/leaderboards/sharded/top", query={"offset": 11})[0] == 400
+    assert api("get", "/svc/leaderboards/single/top", query={"offset": 11})[:2] == (200, [])
+
+
+# 같은 점수를 기록한 샤드 리더보드와 샤드가 아닌 score 방식 리더보드의 조회 결과를 비교
+@pytest.fixture(params=["max", "min", "sum"])
+def boards(request, api, monkeypatch):
+    monkeypatch.setattr(lambda_handler, "STORAGE_MODE", "score")
+    monkeypatch.setattr(lambda_handler.backend, "storage_mode", "score")
+    assert api.admin("put", "/svc/leaderboards/sharded", {"shards": 4, "policy": request.param})[0] == 200
+    assert api.admin("put", "/svc/leaderboards/single", {"policy": request.param})[0] == 200
+
+    # 같은 timestamp로 기록되는 batch를 포함하여 점수와 timestamp가 모두 같은 동점자도 만듦
+    timestamps = itertools.count(3000000000, -1)
+    timestamp = next(timestamps)
+    monkeypatch.setattr(lambda_handler, "get_reverse_timestamp", lambda: timestamp)
+
+    generator = random.Random(7)
+    for batch in range(6):
+        scores = [{"userId": f"user{generator.randrange(40)}", "score": generator.randint(1, 6)} for _ in range(15)]
+        for board in ["sharded", "single"]:
+            assert api("post", f"/svc/leaderboards/{board}/scores", {"scores": scores})[0] == 200
+        if batch % 2:
+            timestamp = next(timestamps)
+    return sorted(entry["userId"] for entry in api("get", "/svc/leaderboards/single/top", query={"limit": 100})[1])
+
+
+def read_both(api, method, path, body=None, query=None):
+    results = [api(method, path.format(board=board), body, query)[:2] for board in ["sharded", "single"]]
+    assert results[0] == results[1]
+    return results[0]
+
+
+def test_sharded_top_matches_single_board(api, boards):
+    status, body = read_both(api, "get", "/svc/leaderboards/{board}/top", query={"limit": 100})
+    assert status == 200 and len(body) == len(boards)
+
+    for offset, limit in [(0, 1), (3, 7), (10, 15), (len(boards) - 2, 5), (len(boards), 3)]:
+        read_both(api, "get", "/svc/leaderboards/{board}/top", query={"offset": offset, "limit": limit})
+
+
+def test_sharded_rank_and_around_match_single_board(api, boards):
+    for user_id in boards + ["nobody"]:
+        read_both(api, "get", f"/svc/leaderboards/{{board}}/{user_id}")
+        read_both(api, "get", f"/svc/leaderboards/{{board}}/{user_id}/around", query={"limit": 3})
+
+    read_both(api, "post", "/svc/leaderboards/{board}/ranks", {"userIds": boards[::3] + ["nobody"]})
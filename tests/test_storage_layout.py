@@ -0,0 +1,93 @@
+import lambda_handler
+import migrate_storage
+from timestamp import MAX_ENCODED_SCORE
+
+
+def scores(api, board="board"):
+    return {entry["userId"]: entry["score"] for entry in api("get", f"/svc/leaderboards/{board}/top")[1]}
+
+
+def test_fractional_score_follows_layout_of_new_board(api, storage_mode):
+    status, body, _ = api("put", "/svc/leaderboards/board/alice", {"score": 1.5})
+
+    if storage_mode == "score":
+        assert status == 400
+        assert "integer" in body["message"]
+        assert scores(api) == {}
+    else:
+        assert status == 200
+
+
+def test_score_is_checked_against_layout_of_migrated_board(api, redis_client):
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    migrate_storage.migrate_board(redis_client, "svc", "board", 100, 0)
+
+    assert api("put", "/svc/leaderboards/board/bob", {"score": 1.5})[0] == 400
+    assert api("post", "/svc/leaderboards/board/scores", {"scores": [{"userId": "bob", "score": 2.5}]})[0] == 400
+    assert scores(api) == {"alice": 10}
+
+
+def test_existing_timestamp_board_accepts_fractional_score(api, monkeypatch):
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    monkeypatch.setattr(lambda_handler.backend, "storage_mode", "score")
+
+    assert api("put", "/svc/leaderboards/board/bob", {"score": 1.5})[0] == 200
+    assert api("put", "/svc/leaderboards/board/carol", {"score": MAX_ENCODED_SCORE + 1})[0] == 200
+
+
+def test_sum_over_encodable_score_is_rejected(api, storage_mode):
+    api.admin("put", "/svc/leaderboards/board", {"policy": "sum"})
+    api("put", "/svc/leaderboards/board/alice", {"score": MAX_ENCODED_SCORE - 1})
+
+    status, _, _ = api("put", "/svc/leaderboards/board/alice", {"score": 2})
+    if storage_mode == "score":
+        assert status == 400
+        assert scores(api) == {"alice": MAX_ENCODED_SCORE - 1}
+    else:
+        assert status == 200
+        assert scores(api) == {"alice": MAX_ENCODED_SCORE + 1}
+
+
+def test_bulk_sum_is_rejected_without_partial_writes(api, storage_mode):
+    api.admin("put", "/svc/leaderboards/board", {"policy": "sum"})
+    batch = [{"userId": "bob", "score": 5}, {"userId": "alice", "score": MAX_ENCODED_SCORE - 1}, {"userId": "alice", "score": 2}]
+
+    status, _, _ = api("post", "/svc/leaderboards/board/scores", {"scores": batch})
+    if storage_mode == "score":
+        assert status == 400
+        assert scores(api) == {}
+    else:
+        assert status == 200
+        assert scores(api) == {"alice": MAX_ENCODED_SCORE + 1, "bob": 5}
+
+
+def test_window_board_layout_is_checked_before_writing(api, redis_client, monkeypatch):
+    api.admin("put", "/svc/leaderboards/board", {"windows": ["daily"], "policy": "sum"})
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    # 원본 리더보드만 timestamp 방식으로 남기고 기간별 리더보드를 score 방식으로 변환
+    window_board = lambda_handler.window_targets("svc", "board")[0][0]
+    migrate_storage.migrate_board(redis_client, "svc", window_board, 100, 0)
+
+    assert api("put", "/svc/leaderboards/board/alice", {"score": 0.5})[0] == 400
+    assert scores(api) == {"alice": 10}
+
+
+def test_sharded_sum_is_rejected_without_partial_writes(api):
+    api.admin("put", "/svc/leaderboards/board", {"shards": 4, "policy": "sum"})
+    users = [f"user{i}" for i in range(8)]
+    api("post", "/svc/leaderboards/board/scores", {"scores": [{"userId": user_id, "score": 1} for user_id in users]})
+    api("put", "/svc/leaderboards/board/user7", {"score": MAX_ENCODED_SCORE - 1})
+
+    status, _, _ = api("post", "/svc/leaderboards/board/scores", {"scores": [{"userId": user_id, "score": 1} for user_id in users]})
+    assert status == 400
+    assert scores(api) == {**{user_id: 1 for user_id in users}, "user7": MAX_ENCODED_SCORE}
+
+
+def test_queued_scores_that_can_not_be_stored_are_dropped(api, storage_mode):
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+    assert api("put", "/svc/leaderboards/board/bob", {"score": 1.5}, query={"async": "true"})[0] == 202
+    assert api("put", "/svc/leaderboards/other/bob", {"score": 7}, query={"async": "true"})[0] == 202
+
+    lambda_handler.run_job({"job": "drain_score_queue"})
+    assert scores(api, "other") == {"bob": 7}
+    assert ("bob" in scores(api)) == (storage_mode == "timestamp")
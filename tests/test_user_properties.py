@@ -0,0 +1,56 @@
+import json
+import pytest
+from leaderboard_keys import user_properties_key_str
+
+
+def top_properties(api, board="board", fields=None):
+    query = {"properties": "true", **({"fields": fields} if fields else {})}
+    status, body, _ = api("get", f"/svc/leaderboards/{board}/top", query=query)
+    assert status == 200
+    return {entry["userId"]: entry.get("properties") for entry in body}
+
+
+@pytest.fixture
+def board(api, storage_mode):
+    api("put", "/svc/leaderboards/board/alice", {"score": 20})
+    api("put", "/svc/leaderboards/board/bob", {"score": 10})
+    assert api("put", "/svc/users/alice", {"properties": {"nickname": "Alice", "level": 3, "tags": ["a"]}})[0] == 200
+
+
+def test_properties_are_joined_to_ranks(api, board):
+    assert top_properties(api) == {"alice": {"nickname": "Alice", "level": 3, "tags": ["a"]}, "bob": None}
+
+    status, body, _ = api("get", "/svc/leaderboards/board/bob/around", query={"properties": "true", "fields": "nickname"})
+    assert status == 200
+    assert [entry.get("properties") for entry in body] == [{"nickname": "Alice"}, None]
+
+
+def test_fields_project_stored_properties(api, board):
+    assert top_properties(api, fields="level,missing") == {"alice": {"level": 3}, "bob": None}
+    assert top_properties(api, fields="tags, nickname") == {"alice": {"tags": ["a"], "nickname": "Alice"}, "bob": None}
+
+
+def test_properties_are_replaced_as_a_whole(api, board):
+    top_properties(api)
+    assert api("put", "/svc/users/alice", {"properties": {"level": 4}})[0] == 200
+    assert top_properties(api)["alice"] == {"level": 4}
+
+    assert api("put", "/svc/users/alice", {"properties": {}})[0] == 200
+    assert top_properties(api)["alice"] is None
+
+
+def test_legacy_string_properties_are_decoded(api, redis_client, board):
+    redis_client.set(user_properties_key_str("svc", "bob"), json.dumps({"nickname": "Bob", "level": 1}))
+
+    assert top_properties(api)["bob"] == {"nickname": "Bob", "level": 1}
+    assert top_properties(api, fields="level")["bob"] == {"level": 1}
+
+    redis_client.set(user_properties_key_str("svc", "bob"), json.dumps("Bob"))
+    assert top_properties(api)["bob"] == "Bob"
+    assert top_properties(api, fields="nickname")["bob"] == {}
+
+
+@pytest.mark.parametrize("body", [{"properties": ["Alice"]}, {"properties": "Alice"}, {"properties": 3}, ["Alice"]])
+def test_properties_must_be_object(api, board, body):
+    assert api("put", "/svc/users/alice", body)[0] == 400
+    assert top_properties(api)["alice"] == {"nickname": "Alice", "level": 3, "tags": ["a"]}
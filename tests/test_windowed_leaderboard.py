@@ -0,0 +1,66 @@
+import time
+import datetime as pydatetime
+import pytest
+import lambda_handler
+import windowed_leaderboard as windowed
+from leaderboard_keys import leaderboard_str, leaderboard_timestamp_str, leaderboard_version_str, leaderboard_archive_str
+from score_histogram import histogram_key
+
+UTC = pydatetime.timezone.utc
+
+
+def top(api, query=None):
+    status, body, _ = api("get", "/svc/leaderboards/board/top", query=query)
+    assert status == 200
+    return [(entry["userId"], entry["score"]) for entry in body]
+
+
+@pytest.fixture
+def now(monkeypatch):
+    clock = {"now": windowed.window_now(0)}
+    monkeypatch.setattr(windowed, "window_now", lambda offset: clock["now"])
+    return clock
+
+
+@pytest.mark.parametrize("window, moment, period, expires", [
+    ("daily", pydatetime.datetime(2026, 12, 31, 23, 0, tzinfo=UTC), "20261231", pydatetime.datetime(2027, 1, 2, tzinfo=UTC)),
+    ("weekly", pydatetime.datetime(2027, 1, 1, tzinfo=UTC), "2026W53", pydatetime.datetime(2027, 1, 11, tzinfo=UTC)),
+    ("monthly", pydatetime.datetime(2027, 1, 31, tzinfo=UTC), "202701", pydatetime.datetime(2027, 3, 1, tzinfo=UTC)),
+])
+def test_window_targets_expire_after_retention_period(window, moment, period, expires):
+    assert windowed.window_write_targets("board", [window], moment, 1) == [(f"board:{window}:{period}", int(expires.timestamp()))]
+
+
+def test_window_boards_expire_and_main_board_does_not(api, redis_client, storage_mode, now):
+    assert api.admin("put", "/svc/leaderboards/board", {"windows": ["daily", "weekly"]})[0] == 200
+    api("put", "/svc/leaderboards/board/alice", {"score": 10})
+
+    assert redis_client.ttl(leaderboard_str("svc", "board")) == -1
+    for board_id, expire_at in windowed.window_write_targets("board", ["daily", "weekly"], now["now"], 1):
+        keys = [leaderboard_str("svc", board_id), leaderboard_version_str("svc", board_id), histogram_key(leaderboard_str("svc", board_id))]
+        if storage_mode == "timestamp":
+            keys.append(leaderboard_timestamp_str("svc", board_id))
+        for key in keys:
+            assert abs(redis_client.ttl(key) - (expire_at - time.time())) <= 2, key
+
+
+def test_closed_window_is_archived_and_served_after_expiry(api, redis_client, storage_mode, now):
+    assert api.admin("put", "/svc/leaderboards/board", {"windows": ["daily"], "policy": "min"})[0] == 200
+    api("put", "/svc/leaderboards/board/alice", {"score": 30})
+    api("put", "/svc/leaderboards/board/bob", {"score": 10})
+    period = windowed.period_str("daily", now["now"])
+
+    now["now"] += pydatetime.timedelta(days=1)
+    api("put", "/svc/leaderboards/board/carol", {"score": 5})
+    assert top(api, {"window": "daily"}) == [("carol", 5)]
+    assert top(api, {"window": "daily", "period": period}) == [("bob", 10), ("alice", 30)]
+
+    lambda_handler.run_job({"job": "rollover", "services": ["svc"]})
+    board_id = windowed.window_board_id("board", "daily", period)
+    assert redis_client.ttl(leaderboard_archive_str("svc", board_id)) > 0
+    assert windowed.archive_closed_windows(redis_client, "svc", now["now"], 100, 60) == 0
+
+    # 만료된 기간은 archive 된 최종 랭킹으로 응답
+    redis_client.delete(leaderboard_str("svc", board_id), leaderboard_timestamp_str("svc", board_id))
+    assert top(api, {"window": "daily", "period": period, "offset": 1}) == [("alice", 30)]
+    assert top(api, {"window": "daily", "period": period}) == [("bob", 10), ("alice", 30)]